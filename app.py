@@ -5,6 +5,39 @@ import pyodbc
 from dotenv import load_dotenv
 import os
 
+from db_pool import get_pool, MissingConnectionError
+from disk_cache import get_disk_cache, canonical_params
+from eventlog_store import get_eventlog_store, eventlog_source_version, eventlog_version, stamp_eventlog_version
+from eventlog_filter import restrict_to_aggregate_range
+from subset_cache import get_superset_cache
+from dfg_engine import compute_dfg, prune_dfg, PRUNE_MODES
+from kpi_engine import compute_kpis, get_kpi_validation, query_shape
+from kpi_cube import get_kpi_cube_cache
+from kpi_ampel import ampel_column
+from sollwerte import changed_sollwerte, save_sollwerte, get_sollwert_cache
+from cache_dependencies import (
+    depends_on,
+    get_cache_dependencies,
+    invalidate_tables,
+    TABLE_EVENTLOG,
+    TABLE_LOV_CUSTOMER,
+    TABLE_LOV_MATERIAL,
+    TABLE_TARGET_TIMES,
+)
+from orchestrator import build_orchestrator_query, fetch_bundle, fetch_output
+from compaction import compact_dtypes, COMPACTION_ATTR
+from memory_cache import memory_cached
+from cache_warmer import get_cache_warmer
+from parallel_loader import submit_datasets, resolve_dataset
+from eventlog_preview import (
+    page_count,
+    preview_page,
+    sort_order,
+    PREVIEW_DEFAULT_PAGE_SIZE,
+    PREVIEW_NO_SORT,
+    PREVIEW_PAGE_SIZES,
+)
+
 # NEU: Import der Login-Funktionen
 from login import (
     show_login_page,
@@ -36,6 +69,54 @@ user_info = get_user_info()
 DEFAULT_START_DATE = date(2025, 1, 1)
 DEFAULT_END_DATE = date.today()
 
+# Lademodus fÃ¼r Eventlog, KPI und DFG nach "Filter anwenden":
+# 'parallel' = drei Orchestrator-Aufrufe gleichzeitig auf eigenen Pool-Verbindungen
+#              (Wartezeit = langsamste Abfrage, Seite baut sich pro Datensatz auf)
+# 'bundle' = ein Batch mit drei Ergebnismengen (ein Roundtrip, ein Cache-Key)
+# 'einzeln' = drei getrennte Orchestrator-Aufrufe nacheinander
+DATA_LOAD_MODE = 'parallel'
+
+# Eventlog nach dem Laden kompaktieren (Categoricals für wiederholte Texte, kleinere Zahlentypen):
+# verkleinert jede Session-Kopie, den In-Memory- und den Obermengen-Cache
+EVENTLOG_COMPACT_DTYPES = True
+
+# Eventlog als lokale Kopie pro Filter-Scope halten und nur neue Events nachladen (High-Watermark auf 'Datum')
+EVENTLOG_INCREMENTAL_SYNC = True
+
+# DFG lokal aus dem geladenen Eventlog berechnen statt über @output = 'dfg'
+# (fehlen dafür Spalten im Eventlog, wird automatisch die Datenbank gefragt)
+DFG_FROM_EVENTLOG = True
+
+# KPIs lokal aus dem Eventlog berechnen statt über @output = 'kpi'. Pro Abfrageform (Kunden-/Produktfilter)
+# wird das erste Datenbank-Ergebnis mit der lokalen Berechnung abgeglichen; nur bei Übereinstimmung entfällt
+# die KPI-Abfrage danach, bis der Abgleich abläuft (KPI_VALIDATION_TTL in kpi_engine.py).
+KPI_FROM_EVENTLOG = True
+
+# KPIs aus einem voraggregierten Würfel des Standard-Eventlogs (alle Kunden und Produkte, Zeitraum 'Gesamt')
+# beantworten, wenn das Eventlog der Anfrage daraus abgeleitet wurde. Der Würfel liefert dasselbe wie die
+# lokale Berechnung (kpi_cube.py), wird im Cache-Warmer gebaut und nur für bestätigte Abfrageformen genutzt.
+KPI_CUBE_ENABLED = True
+
+# DFG-Kanten gebündelt zeichnen: alle Linien in einem Trace, Pfeilspitzen als Marker-Trace und
+# alle Hover-Punkte der Knoten in einem Trace statt je einem Trace/einer Annotation pro Kante und Knoten
+DFG_BATCHED_TRACES = True
+
+# Ab dieser Knoten- bzw. Kantenzahl wird der DFG mit WebGL (Scattergl) statt SVG gezeichnet
+DFG_WEBGL_MIN_NODES = 60
+DFG_WEBGL_MIN_EDGES = 300
+
+# Gültigkeitsdauer der Caches in Sekunden: Abfrageergebnisse (In-Memory- und Parquet-Cache) bzw. Auswahllisten (LOVs)
+QUERY_CACHE_TTL = 600
+LOV_CACHE_TTL = 3600
+
+# LOVs und die Standardabfrage ('Gesamt', alle Kunden und Produkte) im Hintergrund vorladen:
+# ab dem ersten Seitenaufruf nach der Anmeldung und erneut direkt nach jedem Ablauf des Caches.
+# Die vorgeladenen Loader cachen über memory_cached, dessen Ablaufzeitpunkte der Warmer kennt.
+CACHE_WARMUP_ENABLED = True
+
+# Anzeigenamen der Datensätze für Fehlermeldungen beim parallelen Laden
+DATASET_LABELS = {'eventlog': 'Eventlog', 'kpi': 'KPI', 'dfg': 'DFG'}
+
 # Initialisiere alle Filter-Keys im Session State
 # UI State Keys (von Widgets gelesen)
 if 'zeitraum_input' not in st.session_state: st.session_state['zeitraum_input'] = 'Gesamt'
@@ -131,199 +212,398 @@ def update_dates_on_period_change():
 
 def _get_db_connection():
     """
-    Stellt die Datenbankverbindung her mit User-Credentials (wird NICHT gecached).
-    Verwendet die Credentials des angemeldeten Users aus dem Session State.
+    Liefert den Connection-String für die Datenbankverbindung (wird NICHT gecached).
+    Die eigentlichen Verbindungen werden über den geteilten Pool aus db_pool.py
+    ausgeliehen: get_pool(connection_string).connection()
+
+    Läuft auch in Worker-Threads (paralleles Laden, Cache-Warmer) und meldet deshalb nichts
+    über die Oberfläche: Fehlt die Verbindung, wird MissingConnectionError (ein pyodbc.Error)
+    geworfen und vom Aufrufer im Haupt-Thread angezeigt.
     """
     # Verwende die Funktion aus login.py
     connection_string = get_connection_string()
 
     if not connection_string:
-        st.error("Fehler: Keine gültige Datenbankverbindung. Bitte melden Sie sich erneut an.")
-        return None
+        raise MissingConnectionError("Keine gültige Datenbankverbindung. Bitte melden Sie sich erneut an.")
 
     return connection_string
 
 
-@st.cache_data(ttl=600)
-def load_eventlog_data(customer_ids, start_date, end_date, material_ids, is_strict_inclusion, _username=None):
-    """LÃ¤dt die Eventlog-Daten, Cache-Key ist die Liste der Argumente."""
-    connection_string = _get_db_connection()
-    if not connection_string:
-        return pd.DataFrame()
+# Prozessweite Eventlog-Caches hängen ebenfalls an den Orchestrator-Tabellen (gezielte Invalidierung)
+get_cache_dependencies().register(get_disk_cache(), TABLE_EVENTLOG)
+get_cache_dependencies().register(get_superset_cache(), TABLE_EVENTLOG)
+get_cache_dependencies().register(get_kpi_cube_cache(), TABLE_EVENTLOG)
+
 
-    # --- Parameter formatieren (liest direkt von den Funktionsargumenten) ---
-    customer_id_param = f"'{','.join(map(str, customer_ids))}'" if customer_ids else "NULL"
-    start_date_param = f"'{start_date.strftime('%Y-%m-%d')}'"
-    end_date_param = f"'{end_date.strftime('%Y-%m-%d')} 23:59:59'"
-    material_ids_list = [str(p).replace("'", "''") for p in material_ids]
-    material_ids_param = f"'{','.join(material_ids_list)}'" if material_ids_list else "NULL"
-    material_filter_mode_param = 1 if is_strict_inclusion else 0
-
-    SQL_QUERY = f"""
-    EXEC stored_proc.sp_process_analyzer_orchestrator
-        @output = 'eventlog',
-        @customer_id = {customer_id_param},
-        @start_date = {start_date_param},
-        @end_date = {end_date_param},
-        @material_ids = {material_ids_param},
-        @material_filter_mode = {material_filter_mode_param};
+def _prepare_eventlog(df):
     """
-    try:
-        with pyodbc.connect(connection_string) as connection:
-            df = pd.read_sql(SQL_QUERY, connection)
-        if 'Datum' in df.columns:
-            df['Datum'] = pd.to_datetime(df['Datum'])
+    Kompaktiert das Eventlog nach dem Laden (compaction.py), sofern EVENTLOG_COMPACT_DTYPES aktiv ist,
+    und legt den Fingerabdruck für die Cache-Keys abgeleiteter Ergebnisse ab (eventlog_store.py).
+    """
+    if EVENTLOG_COMPACT_DTYPES:
+        df = compact_dtypes(df)
+    return stamp_eventlog_version(df)
+
+
+@depends_on(TABLE_EVENTLOG)
+@memory_cached(ttl=QUERY_CACHE_TTL)
+def fetch_orchestrator_output(output, customer_ids, start_date, end_date, material_ids, is_strict_inclusion,
+                              _username=None):
+    """
+    Führt eine Orchestrator-Abfrage ('eventlog', 'kpi' oder 'dfg') aus, Cache-Key ist die Liste der Argumente.
+    Datenbankfehler werden NICHT abgefangen: So werden sie nicht gecacht und der Aufrufer
+    kann sie pro Datensatz melden.
+
+    Reihenfolge: In-Memory-Cache (memory_cache.py, Speicherbudget) -> lokal ableitbar aus einem geladenen Obermengen-Eventlog
+    -> Parquet-Cache auf der Festplatte -> Datenbank
+    """
+    filter_args = (customer_ids, start_date, end_date, material_ids, is_strict_inclusion)
+
+    # Engere Filter (Zeitraum, Kunde, Produkt) werden lokal aus einem bereits geladenen Eventlog bedient
+    if output == 'eventlog':
+        df = get_superset_cache().lookup(*filter_args)
+        if df is not None:
+            # Die Teilmenge erbt df.attrs der Obermenge, braucht aber einen eigenen Fingerabdruck
+            return stamp_eventlog_version(df)
+
+    cache_params = canonical_params(output, *filter_args)
+    df = get_disk_cache().get(cache_params)
+    if df is not None:
+        if output == 'eventlog':
+            df = _prepare_eventlog(df)
+            get_superset_cache().add(*filter_args, df)
         return df
+
+    connection_string = _get_db_connection()
+
+    def fetch_range(range_start, range_end):
+        SQL_QUERY = build_orchestrator_query(
+            output, customer_ids, range_start, range_end, material_ids, is_strict_inclusion
+        )
+        # Spaltenweises Einlesen mit deklariertem Schema (Datum/Umsatz kommen bereits typisiert an)
+        with get_pool(connection_string).connection() as connection:
+            return fetch_output(connection, output, SQL_QUERY)
+
+    if output == 'eventlog' and EVENTLOG_INCREMENTAL_SYNC:
+        # Lokale Kopie abgleichen: Nach Ablauf des Caches werden nur neue Events geladen
+        df = get_eventlog_store().get(
+            customer_ids, start_date, end_date, material_ids, is_strict_inclusion, fetch_range
+        )
+    else:
+        df = fetch_range(start_date, end_date)
+
+    if output == 'eventlog':
+        df = _prepare_eventlog(df)
+    get_disk_cache().put(cache_params, df, QUERY_CACHE_TTL)
+    if output == 'eventlog':
+        get_superset_cache().add(*filter_args, df)
+    return df
+
+
+def load_eventlog_data(customer_ids, start_date, end_date, material_ids, is_strict_inclusion, _username=None):
+    """Lädt die Eventlog-Daten (gecacht über fetch_orchestrator_output)."""
+    try:
+        return fetch_orchestrator_output(
+            'eventlog', customer_ids, start_date, end_date, material_ids, is_strict_inclusion, _username=_username
+        )
     except pyodbc.Error as ex:
         st.error(f"Fehler bei der Eventlog-Datenbankabfrage: {ex}")
         return pd.DataFrame()
 
 
-@st.cache_data(ttl=300)
+# Sollwerte sessionübergreifend cachen, eigene Schreibzugriffe leeren den Cache sofort
+get_cache_dependencies().register(get_sollwert_cache(), TABLE_TARGET_TIMES)
+
+
 def load_sollwerte(_username=None):
-    sql = """
-        SELECT ATTRIBUTE_NAME, TARGET_VALUE
-        FROM dbo.T_PROCESS_TO_BE_TIME
     """
-    with pyodbc.connect(_get_db_connection()) as conn:
-        df = pd.read_sql(sql, conn)
-
-    return dict(zip(df["ATTRIBUTE_NAME"], df["TARGET_VALUE"]))
+    Lädt die Sollwerte {ATTRIBUTE_NAME: TARGET_VALUE} über den versionierten Cache (sollwerte.py).
+    Im Normalfall ohne Datenbankzugriff, sonst mit Versionsprobe und nur bei Änderung neu geladen.
+    """
+    try:
+        connection_string = _get_db_connection()
+    except MissingConnectionError as ex:
+        st.error(f"Fehler: {ex}")
+        return {}
+    return get_sollwert_cache().get(lambda: get_pool(connection_string).connection())
 
 
-@st.cache_data(ttl=600)
 def load_kpi_data(customer_ids, start_date, end_date, material_ids, is_strict_inclusion, _username=None):
-    """LÃ¤dt die KPI-Daten, Cache-Key ist die Liste der Argumente."""
-    connection_string = _get_db_connection()
-    if not connection_string:
-        return pd.DataFrame()
-
-    # --- Parameter formatieren (liest direkt von den Funktionsargumenten) ---
-    customer_id_param = f"'{','.join(map(str, customer_ids))}'" if customer_ids else "NULL"
-    start_date_param = f"'{start_date.strftime('%Y-%m-%d')}'"
-    end_date_param = f"'{end_date.strftime('%Y-%m-%d')}'"
-    material_ids_list = [str(p).replace("'", "''") for p in material_ids]
-    material_ids_param = f"'{','.join(material_ids_list)}'" if material_ids_list else "NULL"
-    material_filter_mode_param = 1 if is_strict_inclusion else 0
-
-    SQL_QUERY = f"""
-    EXEC stored_proc.sp_process_analyzer_orchestrator
-        @output = 'kpi',
-        @customer_id = {customer_id_param},
-        @start_date = {start_date_param},
-        @end_date = {end_date_param},
-        @material_ids = {material_ids_param},
-        @material_filter_mode = {material_filter_mode_param};
-    """
+    """Lädt die KPI-Daten (gecacht über fetch_orchestrator_output)."""
     try:
-        with pyodbc.connect(connection_string) as connection:
-            df = pd.read_sql(SQL_QUERY, connection)
-        return df
+        return fetch_orchestrator_output(
+            'kpi', customer_ids, start_date, end_date, material_ids, is_strict_inclusion, _username=_username
+        )
     except pyodbc.Error as ex:
         # st.error(f"Fehler bei der KPI-Datenbankabfrage: {ex}")
         return pd.DataFrame()
 
 
-@st.cache_data(ttl=600)
 def load_dfg_data(customer_ids, start_date, end_date, material_ids, is_strict_inclusion, _username=None):
-    """LÃ¤dt die DFG-Daten (Directly-Follows Graph), Cache-Key ist die Liste der Argumente."""
-    connection_string = _get_db_connection()
-    if not connection_string:
+    """Lädt die DFG-Daten (Directly-Follows Graph, gecacht über fetch_orchestrator_output)."""
+    try:
+        return fetch_orchestrator_output(
+            'dfg', customer_ids, start_date, end_date, material_ids, is_strict_inclusion, _username=_username
+        )
+    except pyodbc.Error as ex:
+        st.error(f"Fehler bei der DFG-Datenbankabfrage: {ex}")
         return pd.DataFrame()
 
-    # --- Parameter formatieren (liest direkt von den Funktionsargumenten) ---
-    customer_id_param = f"'{','.join(map(str, customer_ids))}'" if customer_ids else "NULL"
-    start_date_param = f"'{start_date.strftime('%Y-%m-%d')}'"
-    end_date_param = f"'{end_date.strftime('%Y-%m-%d')}'"
-    material_ids_list = [str(p).replace("'", "''") for p in material_ids]
-
-    material_ids_param = f"'{','.join(material_ids_list)}'" if material_ids_list else "NULL"
-    material_filter_mode_param = 1 if is_strict_inclusion else 0
-
-    SQL_QUERY = f"""
-    EXEC stored_proc.sp_process_analyzer_orchestrator
-        @output = 'dfg',
-        @customer_id = {customer_id_param},
-        @start_date = {start_date_param},
-        @end_date = {end_date_param},
-        @material_ids = {material_ids_param},
-        @material_filter_mode = {material_filter_mode_param};
+
+@depends_on(TABLE_EVENTLOG)
+@memory_cached(ttl=QUERY_CACHE_TTL)
+def fetch_filtered_data(customer_ids, start_date, end_date, material_ids, is_strict_inclusion, _username=None):
+    """
+    Lädt Eventlog, KPI- und DFG-Daten in EINEM Roundtrip (ein Batch, mehrere Ergebnismengen).
+    Das Ergebnis-Bundle wird unter einem gemeinsamen Cache-Key abgelegt.
+    Datenbankfehler werden NICHT abgefangen: So wird kein leeres Bundle gecacht.
+    Rückgabe: Dictionary {'eventlog': df, 'kpi': df, 'dfg': df}
     """
+    empty_bundle = {'eventlog': pd.DataFrame(), 'kpi': pd.DataFrame(), 'dfg': pd.DataFrame()}
+
+    # Parquet-Cache: Nur wenn alle drei Ausgaben vorhanden sind, entfällt die Abfrage
+    disk_cache = get_disk_cache()
+    cache_params = {
+        output: canonical_params(output, customer_ids, start_date, end_date, material_ids, is_strict_inclusion)
+        for output in empty_bundle
+    }
+    cached_bundle = {output: disk_cache.get(params) for output, params in cache_params.items()}
+    if all(df is not None for df in cached_bundle.values()):
+        cached_bundle['eventlog'] = _prepare_eventlog(cached_bundle['eventlog'])
+        return cached_bundle
+
+    with get_pool(_get_db_connection()).connection() as connection:
+        bundle = fetch_bundle(
+            connection, customer_ids, start_date, end_date, material_ids, is_strict_inclusion
+        )
+
+    bundle['eventlog'] = _prepare_eventlog(bundle['eventlog'])
+    for output, df in bundle.items():
+        disk_cache.put(cache_params[output], df, QUERY_CACHE_TTL)
+    return bundle
+
+
+def load_filtered_data(customer_ids, start_date, end_date, material_ids, is_strict_inclusion, _username=None):
+    """Lädt das Bundle aus Eventlog, KPI und DFG (gecacht über fetch_filtered_data), Fehler werden angezeigt."""
     try:
-        with pyodbc.connect(connection_string) as connection:
-            df = pd.read_sql(SQL_QUERY, connection)
-        return df
+        return fetch_filtered_data(
+            customer_ids, start_date, end_date, material_ids, is_strict_inclusion, _username=_username
+        )
     except pyodbc.Error as ex:
-        st.error(f"Fehler bei der DFG-Datenbankabfrage: {ex}")
+        st.error(f"Fehler bei der kombinierten Datenbankabfrage: {ex}")
+        return {'eventlog': pd.DataFrame(), 'kpi': pd.DataFrame(), 'dfg': pd.DataFrame()}
+
+
+@depends_on(TABLE_EVENTLOG)
+@memory_cached(ttl=QUERY_CACHE_TTL)
+def derive_dfg_data(customer_ids, start_date, end_date, material_ids, is_strict_inclusion, eventlog_version,
+                    _df_eventlog=None):
+    """
+    Berechnet den DFG lokal aus dem bereits geladenen Eventlog (dfg_engine.py).
+    Cache-Key sind die Filterargumente und der Fingerabdruck des Eventlogs (eventlog_version());
+    das Eventlog selbst wird nicht gehasht. Wird es hinter denselben Filtern neu geladen
+    (Ablauf, inkrementeller Abgleich), entsteht ein neuer Eintrag statt eines veralteten DFG.
+    Der DFG endet wie beim Orchestrator am Enddatum 00:00 (eventlog_filter.restrict_to_aggregate_range).
+    Rückgabe: DataFrame im Schema des Orchestrators oder None, wenn Eventlog-Spalten fehlen oder
+    der Zeitraum bei strikter Inklusion lokal nicht nachgebildet werden kann
+    """
+    df_range = restrict_to_aggregate_range(_df_eventlog, end_date, material_ids, is_strict_inclusion)
+    if df_range is None:
+        return None
+    return compute_dfg(df_range)
+
+
+def _local_dfg(df_eventlog, filter_args):
+    """DFG aus dem Eventlog, sofern aktiviert und möglich - sonst None (-> Datenbank)."""
+    if not DFG_FROM_EVENTLOG:
+        return None
+    if df_eventlog.empty:
         return pd.DataFrame()
+    return derive_dfg_data(*filter_args, eventlog_version(df_eventlog), _df_eventlog=df_eventlog)
 
 
-@st.cache_data(ttl=3600)
-def load_lov_customers_data(_username=None):
+@depends_on(TABLE_EVENTLOG)
+@memory_cached(ttl=QUERY_CACHE_TTL)
+def derive_kpi_data(customer_ids, start_date, end_date, material_ids, is_strict_inclusion, eventlog_version,
+                    kpi_names, _df_eventlog=None):
+    """
+    Berechnet die Durchlaufzeit-KPIs lokal aus dem bereits geladenen Eventlog (kpi_engine.py).
+    Cache-Key sind die Filterargumente, der Fingerabdruck des Eventlogs und die KPI_NAME-Werte des Orchestrators.
+    KPIs enden wie beim Orchestrator am Enddatum 00:00 (eventlog_filter.restrict_to_aggregate_range).
+    Rückgabe: DataFrame mit KPI_NAME, AVG_VALUE oder None, wenn Eventlog-Spalten fehlen oder
+    der Zeitraum bei strikter Inklusion lokal nicht nachgebildet werden kann
+    """
+    df_range = restrict_to_aggregate_range(_df_eventlog, end_date, material_ids, is_strict_inclusion)
+    if df_range is None:
+        return None
+    return compute_kpis(df_range, kpi_names)
+
+
+@depends_on(TABLE_EVENTLOG)
+@memory_cached(ttl=QUERY_CACHE_TTL)
+def eventlog_sort_order(customer_ids, start_date, end_date, material_ids, is_strict_inclusion, eventlog_version,
+                        sort_column, ascending, _df_eventlog=None):
+    """
+    Sortierreihenfolge der Eventlog-Vorschau (eventlog_preview.py), einmal pro Eventlog-Version und Sortierung.
+    Die Positionen gelten nur für genau dieses Eventlog - deshalb gehört sein Fingerabdruck zum Cache-Key.
+    Rückgabe: Zeilenpositionen, aus denen jede Seite nur noch ausgeschnitten wird
+    """
+    return sort_order(_df_eventlog, sort_column, ascending)
+
+
+def _kpi_shape(filter_args):
+    """Abfrageform für den KPI-Abgleich (Kundenfilter, Anzahl Materialien, strikte Inklusion)."""
+    customer_ids, _, _, material_ids, is_strict_inclusion = filter_args
+    return query_shape(customer_ids, material_ids, is_strict_inclusion)
+
+
+def _kpi_from_eventlog(filter_args):
+    """True, wenn die KPIs für diese Abfrageform lokal berechnet werden (aktiviert und bestätigt)."""
+    return KPI_FROM_EVENTLOG and get_kpi_validation().status(_kpi_shape(filter_args)) is True
+
+
+def _local_kpi(df_eventlog, filter_args):
+    """KPIs aus dem Eventlog, sofern aktiviert und gegen den Orchestrator bestätigt - sonst None (-> Datenbank)."""
+    if not KPI_FROM_EVENTLOG:
+        return None
+    kpi_names = get_kpi_validation().validated_names(_kpi_shape(filter_args))
+    if kpi_names is None:
+        return None
+    if df_eventlog.empty:
+        return pd.DataFrame()
+    if KPI_CUBE_ENABLED:
+        cube = get_kpi_cube_cache().get(eventlog_source_version(df_eventlog), kpi_names)
+        if cube is not None and cube.covers(*filter_args):
+            customer_ids, start_date, end_date, material_ids, _ = filter_args
+            return cube.query(customer_ids, start_date, end_date, material_ids)
+    return derive_kpi_data(*filter_args, eventlog_version(df_eventlog), kpi_names, _df_eventlog=df_eventlog)
+
+
+def _validate_local_kpi(df_eventlog, df_kpi, filter_args):
+    """Gleicht die lokale KPI-Berechnung mit dem Ergebnis der Datenbank ab (einmal pro Abfrageform und ttl)."""
+    shape = _kpi_shape(filter_args)
+    validation = get_kpi_validation()
+    if not KPI_FROM_EVENTLOG or validation.status(shape) is not None or df_eventlog.empty:
+        return
+    if df_kpi is None or df_kpi.empty:
+        return
+    kpi_names = tuple(str(name) for name in df_kpi['KPI_NAME'])
+    df_local = derive_kpi_data(*filter_args, eventlog_version(df_eventlog), kpi_names, _df_eventlog=df_eventlog)
+    if df_local is None:
+        # Für diese Anfrage nicht lokal berechenbar - sagt nichts über die Abfrageform aus
+        return
+    validation.record(shape, df_local, df_kpi)
+
+
+@depends_on(TABLE_LOV_CUSTOMER)
+@memory_cached(ttl=LOV_CACHE_TTL)
+def fetch_lov_customers_data(_username=None):
     """
     LÃ¤dt Kunden-IDs und Namen.
+    Datenbankfehler werden NICHT abgefangen: So wird keine leere Liste gecacht (auch nicht im Cache-Warmer).
     RÃ¼ckgabe: (Liste der IDs, Dictionary {ID: Name})
     """
-    connection_string = _get_db_connection()
-    if not connection_string:
-        return [], {}
-
     # SQL angepasst auf Select *
     SQL_QUERY = "SELECT CUSTOMER_ID, CUSTOMER_LONG FROM LOV_CUSTOMER"
 
-    try:
-        with pyodbc.connect(connection_string) as connection:
-            df = pd.read_sql(SQL_QUERY, connection)
+    with get_pool(_get_db_connection()).connection() as connection:
+        df = pd.read_sql(SQL_QUERY, connection)
+
+    if df.empty:
+        return [], {}
 
-        if df.empty:
-            return [], {}
+    # 1. Liste aller IDs fÃ¼r die Auswahl-Optionen
+    ids = df['CUSTOMER_ID'].tolist()
 
-        # 1. Liste aller IDs fÃ¼r die Auswahl-Optionen
-        ids = df['CUSTOMER_ID'].tolist()
+    # 2. Dictionary fÃ¼r die Ãœbersetzung ID -> Name
+    # Ergebnis: {1: '01 / BikePro...', 2: '02 / BikePro...'}
+    mapping = pd.Series(df.CUSTOMER_LONG.values, index=df.CUSTOMER_ID).to_dict()
 
-        # 2. Dictionary fÃ¼r die Ãœbersetzung ID -> Name
-        # Ergebnis: {1: '01 / BikePro...', 2: '02 / BikePro...'}
-        mapping = pd.Series(df.CUSTOMER_LONG.values, index=df.CUSTOMER_ID).to_dict()
+    return ids, mapping
 
-        return ids, mapping
 
+def load_lov_customers_data(_username=None):
+    """Lädt die Kunden-Liste (gecacht über fetch_lov_customers_data) und meldet Fehler in der Oberfläche."""
+    try:
+        return fetch_lov_customers_data(_username=_username)
     except Exception as ex:
         st.error(f"Fehler beim Laden der Kunden-Liste: {ex}")
         return [], {}
 
 
-@st.cache_data(ttl=3600)
-def load_lov_products_data(_username=None):
+@depends_on(TABLE_LOV_MATERIAL)
+@memory_cached(ttl=LOV_CACHE_TTL)
+def fetch_lov_products_data(_username=None):
     """
     LÃ¤dt Material-IDs und Beschreibungen.
+    Datenbankfehler werden NICHT abgefangen: So wird keine leere Liste gecacht (auch nicht im Cache-Warmer).
     RÃ¼ckgabe: (Liste der IDs, Dictionary {ID: Name})
     """
-    connection_string = _get_db_connection()
-    if not connection_string:
-        return [], {}
-
     SQL_QUERY = "exec stored_proc.sp_process_analyzer_orchestrator @output = 'material'"
 
-    try:
-        with pyodbc.connect(connection_string) as connection:
-            df = pd.read_sql(SQL_QUERY, connection)
+    with get_pool(_get_db_connection()).connection() as connection:
+        df = pd.read_sql(SQL_QUERY, connection)
 
-        if df.empty:
-            return [], {}
+    if df.empty:
+        return [], {}
+
+    # Spaltennamen basierend auf deiner Info: ID_MAT und MAT_DESCR
+    ids = df['ID_MAT'].tolist()
 
-        # Spaltennamen basierend auf deiner Info: ID_MAT und MAT_DESCR
-        ids = df['ID_MAT'].tolist()
+    # Dictionary: {2: 'Cube Aim Disc', 3: 'Bulls Copperhead 3'}
+    mapping = pd.Series(df.MAT_DESCR.values, index=df.ID_MAT).to_dict()
 
-        # Dictionary: {2: 'Cube Aim Disc', 3: 'Bulls Copperhead 3'}
-        mapping = pd.Series(df.MAT_DESCR.values, index=df.ID_MAT).to_dict()
+    return ids, mapping
 
-        return ids, mapping
 
+def load_lov_products_data(_username=None):
+    """Lädt die Produkt-Liste (gecacht über fetch_lov_products_data) und meldet Fehler in der Oberfläche."""
+    try:
+        return fetch_lov_products_data(_username=_username)
     except Exception as ex:
         st.error(f"Fehler beim Laden der Produkt-Liste: {ex}")
         return [], {}
 
 
+def _build_kpi_cube(df_eventlog, filter_args):
+    """Baut den KPI-Würfel des Standard-Eventlogs, sobald die lokalen KPIs bestätigt sind (kpi_cube.py)."""
+    if not KPI_CUBE_ENABLED or not KPI_FROM_EVENTLOG or df_eventlog.empty:
+        return
+    kpi_names = get_kpi_validation().validated_names(_kpi_shape(filter_args))
+    if kpi_names is None:
+        return
+    _, start_date, end_date, _, _ = filter_args
+    get_kpi_cube_cache().build(eventlog_source_version(df_eventlog), df_eventlog, start_date, end_date, kpi_names)
+
+
+def warm_default_queries():
+    """
+    Lädt die Standardabfrage vor - dieselben Aufrufe wie beim ersten "Filter anwenden"
+    ohne Kunden-/Produktfilter im Zeitraum 'Gesamt' (läuft im Cache-Warmer-Thread).
+    """
+    filter_args = ([], DEFAULT_START_DATE, date.today(), [], False)
+    if DATA_LOAD_MODE == 'bundle':
+        _build_kpi_cube(fetch_filtered_data(*filter_args)['eventlog'], filter_args)
+        return
+
+    df_eventlog = fetch_orchestrator_output('eventlog', *filter_args)
+    df_kpi = _local_kpi(df_eventlog, filter_args)
+    if df_kpi is None:
+        df_kpi = fetch_orchestrator_output('kpi', *filter_args)
+        _validate_local_kpi(df_eventlog, df_kpi, filter_args)
+    if _local_dfg(df_eventlog, filter_args) is None:
+        fetch_orchestrator_output('dfg', *filter_args)
+    _build_kpi_cube(df_eventlog, filter_args)
+
+
+# Cache-Warmer erst für angemeldete Benutzer starten: Die Login-Seite selbst löst keine Datenbankabfragen aus
+if CACHE_WARMUP_ENABLED:
+    cache_warmer = get_cache_warmer()
+    cache_warmer.register('lov_customers', fetch_lov_customers_data, LOV_CACHE_TTL)
+    cache_warmer.register('lov_products', fetch_lov_products_data, LOV_CACHE_TTL)
+    cache_warmer.register('default_queries', warm_default_queries, QUERY_CACHE_TTL)
+    cache_warmer.start()
+
 ########################################################################################################################
 # SQL - RÃ¼ckgabe
 ########################################################################################################################
@@ -335,6 +615,29 @@ df_eventlog = pd.DataFrame()
 df_kpi = pd.DataFrame()
 df_dfg = pd.DataFrame()
 
+# Laufende Ladevorgänge im Modus 'parallel' (Name -> Future)
+dataset_futures = {}
+
+
+def _resolve_dataset(name):
+    """
+    Holt einen parallel geladenen Datensatz ab. Wird erst dort aufgerufen, wo der Datensatz
+    gebraucht wird, damit die übrige Seite schon angezeigt wird, solange er noch lädt.
+    Fehler werden pro Datensatz gemeldet; die Seite rendert mit einem leeren DataFrame weiter.
+    """
+    future = dataset_futures.pop(name, None)
+    if future is None:
+        return pd.DataFrame()
+
+    with st.spinner(f"{DATASET_LABELS[name]}-Daten werden geladen..."):
+        df, error = resolve_dataset(future)
+
+    if error is not None:
+        st.error(f"Fehler bei der {DATASET_LABELS[name]}-Datenbankabfrage: {error}")
+        return pd.DataFrame()
+    return df
+
+
 # Bedingte AusfÃ¼hrung: FÃ¼hre SQL-Abfrage nur aus, wenn der Button gedrÃ¼ckt wurde
 if st.session_state.get('data_applied', False):
 
@@ -353,31 +656,85 @@ if st.session_state.get('data_applied', False):
     applied_material_ids = st.session_state.get('applied_produkt_input', [])
     applied_is_strict_inclusion = st.session_state.get('applied_produkt_filter_exklusiv', False)
 
+    filter_args = (applied_customer_ids, applied_start_date, applied_end_date, applied_material_ids,
+                   applied_is_strict_inclusion)
+    filter_kwargs = {'_username': user_info['username'] if user_info else None}
+
     # DATEN LADEN: Alle DatensÃ¤tze werden geladen
-    df_eventlog = load_eventlog_data(
-        customer_ids=applied_customer_ids, # Hier wird jetzt [ID] übergeben
-        start_date=applied_start_date,
-        end_date=applied_end_date,
-        material_ids=applied_material_ids,
-        is_strict_inclusion=applied_is_strict_inclusion,
-        _username=user_info['username'] if user_info else None
-    )
-    df_kpi = load_kpi_data(
-        customer_ids=applied_customer_ids,
-        start_date=applied_start_date,
-        end_date=applied_end_date,
-        material_ids=applied_material_ids,
-        is_strict_inclusion=applied_is_strict_inclusion,
-        _username=user_info['username'] if user_info else None
-    )
-    df_dfg = load_dfg_data(
-        customer_ids=applied_customer_ids,
-        start_date=applied_start_date,
-        end_date=applied_end_date,
-        material_ids=applied_material_ids,
-        is_strict_inclusion=applied_is_strict_inclusion,
-        _username=user_info['username'] if user_info else None
-    )
+    if DATA_LOAD_MODE == 'parallel':
+        # Abfragen gleichzeitig starten; KPI und DFG werden erst in col3 abgeholt.
+        # KPI und DFG werden bevorzugt lokal aus dem Eventlog berechnet und dann gar nicht erst abgefragt.
+        kpi_from_eventlog = _kpi_from_eventlog(filter_args)
+        outputs = ['eventlog']
+        if not kpi_from_eventlog:
+            outputs.append('kpi')
+        if not DFG_FROM_EVENTLOG:
+            outputs.append('dfg')
+        dataset_futures = submit_datasets({
+            output: (fetch_orchestrator_output, (output,) + filter_args, filter_kwargs)
+            for output in outputs
+        })
+        df_eventlog = _resolve_dataset('eventlog')
+
+        # Lokale Berechnung nicht möglich (Spalten fehlen) -> doch die Datenbank fragen
+        fallback_outputs = []
+        if kpi_from_eventlog:
+            df_kpi = _local_kpi(df_eventlog, filter_args)
+            if df_kpi is None:
+                fallback_outputs.append('kpi')
+                df_kpi = pd.DataFrame()
+        if DFG_FROM_EVENTLOG:
+            df_dfg = _local_dfg(df_eventlog, filter_args)
+            if df_dfg is None:
+                fallback_outputs.append('dfg')
+                df_dfg = pd.DataFrame()
+        if fallback_outputs:
+            dataset_futures.update(submit_datasets({
+                output: (fetch_orchestrator_output, (output,) + filter_args, filter_kwargs)
+                for output in fallback_outputs
+            }))
+    elif DATA_LOAD_MODE == 'bundle':
+        data_bundle = load_filtered_data(
+            customer_ids=applied_customer_ids,
+            start_date=applied_start_date,
+            end_date=applied_end_date,
+            material_ids=applied_material_ids,
+            is_strict_inclusion=applied_is_strict_inclusion,
+            _username=user_info['username'] if user_info else None
+        )
+        df_eventlog = data_bundle['eventlog']
+        df_kpi = data_bundle['kpi']
+        df_dfg = data_bundle['dfg']
+    else:
+        df_eventlog = load_eventlog_data(
+            customer_ids=applied_customer_ids, # Hier wird jetzt [ID] übergeben
+            start_date=applied_start_date,
+            end_date=applied_end_date,
+            material_ids=applied_material_ids,
+            is_strict_inclusion=applied_is_strict_inclusion,
+            _username=user_info['username'] if user_info else None
+        )
+        df_kpi = _local_kpi(df_eventlog, filter_args)
+        if df_kpi is None:
+            df_kpi = load_kpi_data(
+                customer_ids=applied_customer_ids,
+                start_date=applied_start_date,
+                end_date=applied_end_date,
+                material_ids=applied_material_ids,
+                is_strict_inclusion=applied_is_strict_inclusion,
+                _username=user_info['username'] if user_info else None
+            )
+            _validate_local_kpi(df_eventlog, df_kpi, filter_args)
+        df_dfg = _local_dfg(df_eventlog, filter_args)
+        if df_dfg is None:
+            df_dfg = load_dfg_data(
+                customer_ids=applied_customer_ids,
+                start_date=applied_start_date,
+                end_date=applied_end_date,
+                material_ids=applied_material_ids,
+                is_strict_inclusion=applied_is_strict_inclusion,
+                _username=user_info['username'] if user_info else None
+            )
 
     # Sicherstellen, dass die App bei leeren Eventlog-Daten nicht stoppt, sondern eine Warnung ausgibt
     if df_eventlog.empty:
@@ -385,8 +742,13 @@ if st.session_state.get('data_applied', False):
             "Es konnten keine Eventlog-Daten geladen werden (aufgrund zu restriktiver Filter).")
 
     # Sicherstellen, dass Umsatz numerisch ist, um Summen berechnen zu kÃ¶nnen
+    # (kommt über das Arrow-Schema bereits als float64 an - dann nur Fehlwerte auffüllen).
+    # Die Zuweisung trifft nur die Copy-on-Write-Sicht dieser Session, nicht den geteilten Cache-Eintrag
     if 'Umsatz' in df_eventlog.columns:
-        df_eventlog['Umsatz'] = pd.to_numeric(df_eventlog['Umsatz'], errors='coerce').fillna(0)
+        if pd.api.types.is_numeric_dtype(df_eventlog['Umsatz']):
+            df_eventlog['Umsatz'] = df_eventlog['Umsatz'].fillna(0)
+        else:
+            df_eventlog['Umsatz'] = pd.to_numeric(df_eventlog['Umsatz'], errors='coerce').fillna(0)
 
 ########################################################################################################################
 
@@ -518,8 +880,8 @@ with col1:
 
 # --- 5. Filter-Anwendungslogik (ENTFERNT, DA IN DB AUSGEFÃœHRT) ---
 
-# filtered_df ist nun df_eventlog
-filtered_df = df_eventlog.copy()
+# filtered_df ist nun df_eventlog (nur ein weiterer Name - keine zweite Kopie im Speicher)
+filtered_df = df_eventlog
 
 ########################################################################################################################
 
@@ -535,48 +897,65 @@ with col2:
         delta_color="off"
     )
 
+    # Bericht der Kompaktierung (beim Laden ermittelt; Teilmengen aus dem Obermengen-Cache erben ihn)
+    compaction_report = filtered_df.attrs.get(COMPACTION_ATTR)
+    if compaction_report and compaction_report['bytes_before'] > compaction_report['bytes_after']:
+        st.caption(
+            f"Eventlog im Speicher: {filtered_df.memory_usage(deep=True).sum() / 1024 ** 2:,.1f} MB "
+            f"(Kompaktierung beim Laden: {compaction_report['bytes_before'] / 1024 ** 2:,.1f} MB → "
+            f"{compaction_report['bytes_after'] / 1024 ** 2:,.1f} MB)"
+        )
+
     with st.expander("Eventlog-Vorschau"):
-        # Der DataFrame ist nun optional aufklappbar
+        # Seitenweise Vorschau: An den Browser geht nur die sichtbare Seite, unabhängig von der Größe des Eventlogs.
+        # Die Seiten werden aus dem lokal gecachten Eventlog geschnitten (der Orchestrator kennt kein OFFSET/FETCH).
+        preview_col_sort, preview_col_order, preview_col_size = st.columns([2, 1, 1])
+        with preview_col_sort:
+            sort_column = st.selectbox(
+                "Sortieren nach",
+                options=[PREVIEW_NO_SORT] + list(filtered_df.columns),
+                key='preview_sort_column'
+            )
+        with preview_col_order:
+            sort_ascending = st.radio(
+                "Reihenfolge", options=["Aufsteigend", "Absteigend"], key='preview_sort_order'
+            ) == "Aufsteigend"
+        with preview_col_size:
+            page_size = st.selectbox(
+                "Zeilen pro Seite",
+                options=PREVIEW_PAGE_SIZES,
+                index=PREVIEW_PAGE_SIZES.index(PREVIEW_DEFAULT_PAGE_SIZE),
+                key='preview_page_size'
+            )
+
+        preview_pages = page_count(len(filtered_df), page_size)
+        # Nach Filter- oder Seitengrößenwechsel auf den gültigen Bereich begrenzen
+        if st.session_state.get('preview_page', 1) > preview_pages:
+            st.session_state['preview_page'] = preview_pages
+        page = st.number_input(
+            f"Seite (von {preview_pages:,})", min_value=1, max_value=preview_pages, step=1, key='preview_page'
+        )
+
+        sort_column = None if sort_column == PREVIEW_NO_SORT else sort_column
+        if filtered_df.empty or sort_column is None:
+            order = sort_order(filtered_df)
+        else:
+            order = eventlog_sort_order(
+                *filter_args, eventlog_version(filtered_df), sort_column, sort_ascending, _df_eventlog=filtered_df
+            )
+        df_page, first_row, last_row = preview_page(filtered_df, order, page, page_size)
+
         st.dataframe(
-            filtered_df,  # Zeigt nun den gesamten DataFrame an
+            df_page,
             width='stretch',
             hide_index=True
         )
+        st.caption(f"Zeilen {first_row:,}–{last_row:,} von {len(filtered_df):,}")
 
     # SchlieÃŸt den zentrierten Container fÃ¼r col2
     st.markdown("</div>", unsafe_allow_html=True)
 
 
-########################################################################################################################
-
-@st.cache_data(ttl=300)
-def load_sollwerte(_username=None):
-    sql = """
-        SELECT ATTRIBUTE_NAME, TARGET_VALUE
-        FROM dbo.T_PROCESS_TO_BE_TIME
-    """
-    with pyodbc.connect(_get_db_connection()) as conn:
-        df = pd.read_sql(sql, conn)
-
-    return dict(zip(df["ATTRIBUTE_NAME"], df["TARGET_VALUE"]))
-
-
-def update_sollwert(attribute_name, target_value, user_name):
-    sql = """
-        UPDATE dbo.T_PROCESS_TO_BE_TIME
-        SET TARGET_VALUE = ?,
-            INS_USER = ?,
-            EVENT_TIME = GETDATE()
-        WHERE ATTRIBUTE_NAME = ?
-    """
-    with pyodbc.connect(_get_db_connection()) as conn:
-        cur = conn.cursor()
-        cur.execute(sql, target_value, user_name, attribute_name)
-        conn.commit()
-
-    st.cache_data.clear()
-
-
 ########################################################################################################
 with col3:
     st.markdown("<div class='center-col-content'>", unsafe_allow_html=True)
@@ -594,40 +973,16 @@ with col3:
         st.warning(f"⚠️ **Eingeschränkte Berechtigung:** Sie können Soll-Werte nur anzeigen, aber nicht bearbeiten.")
 
 
-    # -----------------------------
-    # SOLLWERTE AUS DB LADEN
-    # -----------------------------
-    def load_sollwerte(_username=None):
-        conn = pyodbc.connect(_get_db_connection())
-        df = pd.read_sql(
-            "SELECT ATTRIBUTE_NAME, TARGET_VALUE FROM dbo.T_PROCESS_TO_BE_TIME",
-            conn
-        )
-        conn.close()
-        return dict(zip(df["ATTRIBUTE_NAME"], df["TARGET_VALUE"]))
-
-
-    # -----------------------------
-    # SOLLWERT SPEICHERN (Stored Proc)
-    # -----------------------------
-    def save_sollwert(kpi_name, value):
-        conn = pyodbc.connect(_get_db_connection())
-        cur = conn.cursor()
-        cur.execute(
-            "EXEC stored_proc.sp_set_process_target_time ?, ?, ?",
-            kpi_name,
-            float(value),
-            user_info['username'] if user_info else "unknown"  # Username aus Login-Maske
-        )
-        conn.commit()
-        conn.close()
-
-
     # -----------------------------
     # DATEN VERARBEITEN
     # -----------------------------
     sollwerte = load_sollwerte(_username=user_info['username'] if user_info else None)
 
+    # Im Modus 'parallel' wurde die KPI-Abfrage nur gestartet - hier wird sie abgeholt
+    if 'kpi' in dataset_futures:
+        df_kpi = _resolve_dataset('kpi')
+        _validate_local_kpi(df_eventlog, df_kpi, filter_args)
+
     if df_kpi is None or df_kpi.empty:
         st.warning("Keine KPI-Daten vorhanden.")
     else:
@@ -643,18 +998,9 @@ with col3:
 
 
         # -----------------------------
-        # AMPELLOGIK
+        # AMPELLOGIK (vektorisiert, Toleranz für Gelb pro KPI in kpi_ampel.AMPEL_TOLERANCES)
         # -----------------------------
-        def ampel(row):
-            if row["IST (Durchschnitt)"] <= row["SOLL"]:
-                return "🟢"
-            elif row["IST (Durchschnitt)"] <= row["SOLL"] * 1.1:
-                return "🟡"
-            else:
-                return "🔴"
-
-
-        df["Ampel"] = df.apply(ampel, axis=1)
+        df["Ampel"] = ampel_column(df, "IST (Durchschnitt)", "SOLL")
 
         # -----------------------------
         # ORIGINALE WERTE SPEICHERN (für Änderungserkennung)
@@ -696,24 +1042,16 @@ with col3:
                     f"Ihre aktuelle Berechtigung: Stufe {user_security_level}")
             else:
                 try:
-                    # Zähler für geänderte Werte
+                    # Nur geänderte Werte speichern - alle in einer Transaktion (Stored Proc per executemany)
+                    changes = changed_sollwerte(original_soll_values, edited_df)
                     changed_count = 0
-
-                    # Nur geänderte Werte speichern
-                    for idx, row in edited_df.iterrows():
-                        kpi_name = row["KPI_NAME"]
-                        new_soll = row["SOLL"]
-
-                        # Finde den ursprünglichen Wert
-                        original_row = original_soll_values[original_soll_values["KPI_NAME"] == kpi_name]
-
-                        if not original_row.empty:
-                            original_soll = original_row.iloc[0]["SOLL"]
-
-                            # Nur speichern wenn sich der Wert geändert hat
-                            if abs(new_soll - original_soll) > 0.001:  # Toleranz für Fließkomma-Vergleich
-                                save_sollwert(kpi_name, new_soll)
-                                changed_count += 1
+                    if not changes.empty:
+                        with get_pool(_get_db_connection()).connection() as conn:
+                            changed_count = save_sollwerte(
+                                conn, changes,
+                                user_info['username'] if user_info else "unknown"  # Username aus Login-Maske
+                            )
+                        invalidate_tables(TABLE_TARGET_TIMES)
 
                     if changed_count > 0:
                         st.success(f"✅ {changed_count} SOLLWERT(E) erfolgreich gespeichert.")
@@ -732,627 +1070,64 @@ with col3:
     # 2. DFG-Visualisierung (NUR GRAPH, KEINE TABELLE)
     st.markdown("<h3 style='text-align: center;'>DFG - Prozessfluss</h3>", unsafe_allow_html=True)
 
+    if 'dfg' in dataset_futures:
+        df_dfg = _resolve_dataset('dfg')
+
     if not df_dfg.empty:
         # Netzwerkdiagramm mit Plotly
         try:
-            import plotly.graph_objects as go
-
-            # Kategorien und Farben definieren
-            categories = ['SALESOFFER', 'SALESORDER', 'DELIVERY', 'INVOICE', 'PAYMENT']
-            category_colors = {
-                'SALESOFFER': '#4A90E2',  # Blau
-                'SALESORDER': '#7ED321',  # GrÃ¼n
-                'DELIVERY': '#F5A623',  # Orange
-                'INVOICE': '#BD10E0',  # Lila
-                'PAYMENT': '#50E3C2'  # TÃ¼rkis
-            }
-
-
-            # Funktion zum Extrahieren der Kategorie aus dem Activity-Namen
-            def get_category(activity):
-                for cat in categories:
-                    if activity.startswith(cat):
-                        return cat
-                return 'UNKNOWN'
-
-
-            # Funktion zum Extrahieren des Status aus dem Activity-Namen
-            def get_status(activity):
-                parts = activity.split('_')
-                if len(parts) > 1:
-                    return '_'.join(parts[1:])
-                return ''
-
-
-            # Hilfsfunktion zur Berechnung des Randpunkts eines Rechtecks
-            def calculate_edge_intersection(x_center, y_center, x_target, y_target, node_width, node_height):
-                """
-                Berechnet den Punkt am Rand eines Rechtecks, wo die Linie vom Zentrum
-                zum Zielpunkt das Rechteck verlÃ¤sst bzw. eintritt.
-                """
-                # Richtungsvektor
-                dx = x_target - x_center
-                dy = y_target - y_center
-
-                # SpezialfÃ¤lle: keine Bewegung
-                if dx == 0 and dy == 0:
-                    return x_center, y_center
-
-                # Berechne t-Werte fÃ¼r horizontale und vertikale Kanten
-                if dx == 0:
-                    # Vertikale Linie
-                    edge_x = x_center
-                    edge_y = y_center + (node_height / 2 if dy > 0 else -node_height / 2)
-                elif dy == 0:
-                    # Horizontale Linie
-                    edge_x = x_center + (node_width / 2 if dx > 0 else -node_width / 2)
-                    edge_y = y_center
-                else:
-                    # Berechne das VerhÃ¤ltnis fÃ¼r beide Achsen
-                    t_x = (node_width / 2) / abs(dx)
-                    t_y = (node_height / 2) / abs(dy)
-
-                    # Nimm das kleinere t (das ist der erste Schnittpunkt mit dem Rechteck)
-                    t = min(t_x, t_y)
-
-                    edge_x = x_center + t * dx
-                    edge_y = y_center + t * dy
-
-                return edge_x, edge_y
-
-
-            def line_intersects_rectangle(x1, y1, x2, y2, rect_x, rect_y, rect_width, rect_height):
-                """
-                PrÃ¼ft, ob eine Linie von (x1,y1) nach (x2,y2) durch ein Rechteck geht.
-                Rechteck ist definiert durch Mittelpunkt (rect_x, rect_y) und Dimensionen.
-                """
-                # Erweitere Rechteck leicht fÃ¼r bessere Erkennung
-                margin = 5
-                rect_left = rect_x - rect_width / 2 - margin
-                rect_right = rect_x + rect_width / 2 + margin
-                rect_top = rect_y - rect_height / 2 - margin
-                rect_bottom = rect_y + rect_height / 2 + margin
-
-                # PrÃ¼fe ob Liniensegment das Rechteck schneidet (Liang-Barsky Algorithmus vereinfacht)
-                # PrÃ¼fe ob mindestens ein Endpunkt im Rechteck liegt
-                def point_in_rect(px, py):
-                    return rect_left <= px <= rect_right and rect_top <= py <= rect_bottom
-
-                # Wenn einer der Endpunkte im Rechteck ist, gibt es eine Kollision
-                # (auÃŸer es ist der Ziel- oder Start-Knoten selbst)
-                if point_in_rect(x1, y1) or point_in_rect(x2, y2):
-                    # PrÃ¼fe ob es der Mittelpunkt des Rechtecks selbst ist
-                    tolerance = rect_width / 2 + 1
-                    if (abs(x1 - rect_x) < tolerance and abs(y1 - rect_y) < tolerance):
-                        return False  # Startknoten
-                    if (abs(x2 - rect_x) < tolerance and abs(y2 - rect_y) < tolerance):
-                        return False  # Zielknoten
-                    return True
-
-                # PrÃ¼fe ob Linie durch Rechteck geht (vereinfachte Version)
-                # Berechne parametrische Form der Linie: P = P1 + t*(P2-P1)
-                dx = x2 - x1
-                dy = y2 - y1
-
-                # PrÃ¼fe Schnittpunkte mit allen vier Kanten
-                if dx != 0:
-                    # Linke Kante
-                    t = (rect_left - x1) / dx
-                    if 0 < t < 1:
-                        y = y1 + t * dy
-                        if rect_top <= y <= rect_bottom:
-                            return True
-                    # Rechte Kante
-                    t = (rect_right - x1) / dx
-                    if 0 < t < 1:
-                        y = y1 + t * dy
-                        if rect_top <= y <= rect_bottom:
-                            return True
-
-                if dy != 0:
-                    # Obere Kante
-                    t = (rect_top - y1) / dy
-                    if 0 < t < 1:
-                        x = x1 + t * dx
-                        if rect_left <= x <= rect_right:
-                            return True
-                    # Untere Kante
-                    t = (rect_bottom - y1) / dy
-                    if 0 < t < 1:
-                        x = x1 + t * dx
-                        if rect_left <= x <= rect_right:
-                            return True
-
-                return False
-
-
-            def calculate_curved_path(x1, y1, x2, y2, all_obstacles, node_width, node_height):
-                """
-                Berechnet einen gebogenen Pfad, wenn die direkte Linie durch Knoten geht.
-                Gibt Kontrollpunkte fÃ¼r eine Bezier-Kurve zurÃ¼ck.
-                """
-                # PrÃ¼fe ob direkte Linie Knoten schneidet
-                has_collision = False
-                collision_points = []
-
-                for obs_node, (obs_x, obs_y) in all_obstacles.items():
-                    if line_intersects_rectangle(x1, y1, x2, y2, obs_x, obs_y, node_width, node_height):
-                        has_collision = True
-                        collision_points.append((obs_x, obs_y))
-
-                if not has_collision:
-                    # Keine Kollision - direkte Linie
-                    return None
-
-                # Berechne Kontrollpunkt fÃ¼r Kurve
-                # Mittelpunkt der Linie
-                mid_x = (x1 + x2) / 2
-                mid_y = (y1 + y2) / 2
-
-                # Richtung der Linie
-                dx = x2 - x1
-                dy = y2 - y1
-                length = (dx ** 2 + dy ** 2) ** 0.5
-
-                if length == 0:
-                    return None
-
-                # Normalisierter Vektor senkrecht zur Linie
-                perp_x = -dy / length
-                perp_y = dx / length
-
-                # Verschiebe Kontrollpunkt seitlich (30-50 Pixel)
-                offset = 50
-
-                # PrÃ¼fe beide Seiten und wÃ¤hle die mit weniger Kollisionen
-                ctrl1_x = mid_x + offset * perp_x
-                ctrl1_y = mid_y + offset * perp_y
-                ctrl2_x = mid_x - offset * perp_x
-                ctrl2_y = mid_y - offset * perp_y
-
-                # ZÃ¤hle Kollisionen fÃ¼r beide Optionen
-                collisions1 = sum(1 for obs_node, (obs_x, obs_y) in all_obstacles.items()
-                                  if line_intersects_rectangle(x1, y1, ctrl1_x, ctrl1_y, obs_x, obs_y, node_width,
-                                                               node_height)
-                                  or line_intersects_rectangle(ctrl1_x, ctrl1_y, x2, y2, obs_x, obs_y, node_width,
-                                                               node_height))
-
-                collisions2 = sum(1 for obs_node, (obs_x, obs_y) in all_obstacles.items()
-                                  if line_intersects_rectangle(x1, y1, ctrl2_x, ctrl2_y, obs_x, obs_y, node_width,
-                                                               node_height)
-                                  or line_intersects_rectangle(ctrl2_x, ctrl2_y, x2, y2, obs_x, obs_y, node_width,
-                                                               node_height))
-
-                # WÃ¤hle die Seite mit weniger Kollisionen
-                if collisions1 <= collisions2:
-                    ctrl_x, ctrl_y = ctrl1_x, ctrl1_y
-                else:
-                    ctrl_x, ctrl_y = ctrl2_x, ctrl2_y
-
-                return (ctrl_x, ctrl_y)
-
-
-            # Knoten sammeln und kategorisieren
-            nodes_by_category = {cat: [] for cat in categories}
-            all_nodes = set()
-
-            for _, row in df_dfg.iterrows():
-                all_nodes.add(row['FROM_ACTIVITY'])
-                all_nodes.add(row['TO_ACTIVITY'])
-
-            for node in all_nodes:
-                cat = get_category(node)
-                if cat in nodes_by_category:
-                    nodes_by_category[cat].append(node)
-
-            # Sortiere Knoten innerhalb jeder Kategorie
-            for cat in categories:
-                nodes_by_category[cat].sort()
-
-            # Berechne Positionen fÃ¼r optimale Raumnutzung
+            from dfg_figure import get_dfg_figure_cache
+
             # Horizontaler Abstand zwischen Kategorien
             h_spacing = 200
             # Vertikaler Abstand zwischen Status (angepasst fÃ¼r 100x50 Knoten)
             v_spacing = 90
-
-            # Finde maximale Anzahl von Status in einer Kategorie
-            max_statuses = max([len(nodes) for nodes in nodes_by_category.values()]) if any(
-                nodes_by_category.values()) else 1
-
-            # Positionierung der Knoten
-            node_positions = {}
-            for cat_idx, cat in enumerate(categories):
-                x = cat_idx * h_spacing
-                nodes_in_cat = nodes_by_category[cat]
-
-                # Zentriere vertikal wenn weniger Status als max
-                y_offset = (max_statuses - len(nodes_in_cat)) * v_spacing / 2
-
-                for node_idx, node in enumerate(nodes_in_cat):
-                    y = node_idx * v_spacing + y_offset
-                    node_positions[node] = (x, y)
-
-            # Erstelle Figure
-            fig = go.Figure()
-
             # Knotenabmessungen (Mittelweg fÃ¼r gute Balance)
             node_width = 100
             node_height = 50
 
-            # BIDIREKTIONALE PFEILE ERKENNEN
-            # Finde alle Paare (Aâ†’B und Bâ†’A), die Ã¼bereinander liegen wÃ¼rden
-            bidirectional_edges = set()
-            for _, row in df_dfg.iterrows():
-                from_node = row['FROM_ACTIVITY']
-                to_node = row['TO_ACTIVITY']
-
-                # PrÃ¼fe ob es auch einen Pfeil in die andere Richtung gibt
-                reverse_exists = df_dfg[
-                                     (df_dfg['FROM_ACTIVITY'] == to_node) &
-                                     (df_dfg['TO_ACTIVITY'] == from_node)
-                                     ].shape[0] > 0
-
-                if reverse_exists and from_node != to_node:  # Nicht bei Self-Loops
-                    # Speichere beide Richtungen als bidirektional
-                    bidirectional_edges.add((from_node, to_node))
-                    bidirectional_edges.add((to_node, from_node))
-
-            # Zeichne Edges (Pfeile) mit Frequency-Labels
-            annotations = []
-            for _, row in df_dfg.iterrows():
-                from_node = row['FROM_ACTIVITY']
-                to_node = row['TO_ACTIVITY']
-                frequency = row['FREQUENCY']
-
-                if from_node in node_positions and to_node in node_positions:
-                    x_from_center, y_from_center = node_positions[from_node]
-                    x_to_center, y_to_center = node_positions[to_node]
-
-                    # PrÃ¼fe ob dieser Edge bidirektional ist
-                    is_bidirectional = (from_node, to_node) in bidirectional_edges
-
-                    # SELF-LOOP: Task folgt auf sich selbst
-                    if from_node == to_node:
-                        # Zeichne GRÃ–ÃŸERE, RUNDE Schleife in der linken oberen Ecke
-                        loop_size = 30  # GrÃ¶ÃŸer fÃ¼r bessere Sichtbarkeit
-
-                        # WICHTIG: In Plotly sind GRÃ–SSERE Y-Werte OBEN!
-                        # Startpunkt: Links am OBEREN Rand
-                        start_x = x_from_center - node_width / 2
-                        start_y = y_from_center + node_height / 2 - 5
-
-                        # Endpunkt: OBEN am linken Rand
-                        end_x = x_from_center - node_width / 2 + 5
-                        end_y = y_from_center + node_height / 2
-
-                        # Kontrollpunkte fÃ¼r RUNDE Schleife (weiter weg = runder)
-                        ctrl1_x = start_x - loop_size * 0.8
-                        ctrl1_y = start_y + loop_size * 0.4  # Weniger steil fÃ¼r rundere Form
-
-                        ctrl2_x = end_x - loop_size * 0.4  # Weniger stark gekrÃ¼mmt
-                        ctrl2_y = end_y + loop_size * 0.8
-
-                        # Erzeuge Punkte fÃ¼r kubische Bezier-Kurve
-                        num_points = 50
-                        curve_x = []
-                        curve_y = []
-
-                        for i in range(num_points + 1):
-                            t = i / num_points
-                            # Kubische Bezier: B(t) = (1-t)Â³P0 + 3(1-t)Â²tP1 + 3(1-t)tÂ²P2 + tÂ³P3
-                            x = (1 - t) ** 3 * start_x + 3 * (1 - t) ** 2 * t * ctrl1_x + 3 * (
-                                    1 - t) * t ** 2 * ctrl2_x + t ** 3 * end_x
-                            y = (1 - t) ** 3 * start_y + 3 * (1 - t) ** 2 * t * ctrl1_y + 3 * (
-                                    1 - t) * t ** 2 * ctrl2_y + t ** 3 * end_y
-                            curve_x.append(x)
-                            curve_y.append(y)
-
-                        # Zeichne die Schleife
-                        fig.add_trace(go.Scatter(
-                            x=curve_x[:-3],
-                            y=curve_y[:-3],
-                            mode='lines',
-                            line=dict(
-                                width=1.5,
-                                color='rgba(100, 100, 100, 0.8)'
-                            ),
-                            showlegend=False,
-                            hoverinfo='skip'
-                        ))
-
-                        # Pfeil am Ende der Schleife
-                        annotations.append(dict(
-                            x=curve_x[-1],
-                            y=curve_y[-1],
-                            ax=curve_x[-6] if len(curve_x) > 6 else curve_x[-2],
-                            ay=curve_y[-6] if len(curve_y) > 6 else curve_y[-2],
-                            xref='x',
-                            yref='y',
-                            axref='x',
-                            ayref='y',
-                            showarrow=True,
-                            arrowhead=2,
-                            arrowsize=1.5,
-                            arrowwidth=1.5,
-                            arrowcolor='rgba(100, 100, 100, 0.8)'
-                        ))
-
-                        # Frequency-Label AUF dem Pfeil (am hÃ¶chsten Punkt der Kurve)
-                        mid_idx = len(curve_x) // 2
-                        label_x = curve_x[mid_idx]
-                        label_y = curve_y[mid_idx]
-
-                        annotations.append(dict(
-                            x=label_x,
-                            y=label_y,
-                            text=f'<b>{frequency}</b>',
-                            showarrow=False,
-                            font=dict(size=10, color='black'),
-                            bgcolor='rgba(255, 255, 255, 0.8)',
-                            bordercolor='rgba(0, 0, 0, 0.3)',
-                            borderwidth=1,
-                            borderpad=2
-                        ))
-
-                        # Springe zur nÃ¤chsten Edge (Self-Loop ist fertig)
-                        continue
-
-                    # NORMALE EDGES (nicht Self-Loop)
-                    # Berechne Start- und Endpunkte am Rand der Knoten
-                    x_from, y_from = calculate_edge_intersection(
-                        x_from_center, y_from_center,
-                        x_to_center, y_to_center,
-                        node_width, node_height
-                    )
-
-                    x_to, y_to = calculate_edge_intersection(
-                        x_to_center, y_to_center,
-                        x_from_center, y_from_center,
-                        node_width, node_height
-                    )
-
-                    # BIDIREKTIONALER OFFSET
-                    # Wenn Pfeile in beide Richtungen gehen, verschiebe sie parallel
-                    if is_bidirectional:
-                        # Berechne die Richtung der Verbindung
-                        dx = x_to_center - x_from_center
-                        dy = y_to_center - y_from_center
-                        length = (dx ** 2 + dy ** 2) ** 0.5
-
-                        if length > 0:
-                            # Senkrechter Vektor (nach rechts gedreht)
-                            perp_x = -dy / length
-                            perp_y = dx / length
-
-                            # Offset-Distanz (6 Pixel)
-                            offset = 6
-
-                            # Verschiebe beide Punkte senkrecht zur Verbindung
-                            x_from += perp_x * offset
-                            y_from += perp_y * offset
-                            x_to += perp_x * offset
-                            y_to += perp_y * offset
-
-                    # PrÃ¼fe auf Kollisionen mit anderen Knoten
-                    obstacles = {n: pos for n, pos in node_positions.items()
-                                 if n != from_node and n != to_node}
-
-                    control_point = calculate_curved_path(
-                        x_from, y_from, x_to, y_to,
-                        obstacles, node_width, node_height
-                    )
-
-                    if control_point is not None:
-                        # Zeichne gebogene Linie (quadratische Bezier-Kurve)
-                        ctrl_x, ctrl_y = control_point
-
-                        # Erzeuge Punkte entlang der Bezier-Kurve
-                        num_points = 50
-                        curve_x = []
-                        curve_y = []
-
-                        for i in range(num_points + 1):
-                            t = i / num_points
-                            # Quadratische Bezier-Formel: B(t) = (1-t)Â²P0 + 2(1-t)tP1 + tÂ²P2
-                            x = (1 - t) ** 2 * x_from + 2 * (1 - t) * t * ctrl_x + t ** 2 * x_to
-                            y = (1 - t) ** 2 * y_from + 2 * (1 - t) * t * ctrl_y + t ** 2 * y_to
-                            curve_x.append(x)
-                            curve_y.append(y)
-
-                        # Zeichne nur die Kurve ohne Pfeil (Pfeil kommt als Annotation)
-                        fig.add_trace(go.Scatter(
-                            x=curve_x[:-3],  # Stoppe kurz vor dem Ende
-                            y=curve_y[:-3],
-                            mode='lines',
-                            line=dict(
-                                width=1.5,  # Konstante Breite fÃ¼r alle Pfeile
-                                color='rgba(100, 100, 100, 0.8)'
-                            ),
-                            showlegend=False,
-                            hoverinfo='skip'
-                        ))
-
-                        # Pfeil-Annotation fÃ¼r das Ende der Kurve
-                        arrow_end_idx = -1
-                        arrow_start_idx = -5 if len(curve_x) > 5 else -2
-
-                        annotations.append(dict(
-                            x=curve_x[arrow_end_idx],
-                            y=curve_y[arrow_end_idx],
-                            ax=curve_x[arrow_start_idx],
-                            ay=curve_y[arrow_start_idx],
-                            xref='x',
-                            yref='y',
-                            axref='x',
-                            ayref='y',
-                            showarrow=True,
-                            arrowhead=2,
-                            arrowsize=1.5,
-                            arrowwidth=1.5,  # Konstante Breite fÃ¼r alle Pfeile
-                            arrowcolor='rgba(100, 100, 100, 0.8)'
-                        ))
-
-                        # Frequency-Label in der Mitte der Kurve
-                        mid_x = curve_x[len(curve_x) // 2]
-                        mid_y = curve_y[len(curve_y) // 2]
-
-                        # FÃ¼ge Frequency-Label hinzu
-                        annotations.append(dict(
-                            x=mid_x,
-                            y=mid_y,
-                            text=f'<b>{frequency}</b>',
-                            showarrow=False,
-                            font=dict(size=10, color='black'),
-                            bgcolor='rgba(255, 255, 255, 0.8)',
-                            bordercolor='rgba(0, 0, 0, 0.3)',
-                            borderwidth=1,
-                            borderpad=2
-                        ))
-
-                    else:
-                        # Zeichne geraden Pfeil (keine Kollision)
-                        # Verwende Arrow-Annotation als komplette Linie (kein separates Scatter)
-                        annotations.append(dict(
-                            x=x_to,
-                            y=y_to,
-                            ax=x_from,
-                            ay=y_from,
-                            xref='x',
-                            yref='y',
-                            axref='x',
-                            ayref='y',
-                            showarrow=True,
-                            arrowhead=2,
-                            arrowsize=1.5,
-                            arrowwidth=1.5,  # Konstante Breite fÃ¼r alle Pfeile
-                            arrowcolor='rgba(100, 100, 100, 0.8)'
-                        ))
-
-                        # Frequency-Label in der Mitte
-                        mid_x = (x_from + x_to) / 2
-                        mid_y = (y_from + y_to) / 2
-
-                        # FÃ¼ge Frequency-Label hinzu
-                        annotations.append(dict(
-                            x=mid_x,
-                            y=mid_y,
-                            text=f'<b>{frequency}</b>',
-                            showarrow=False,
-                            font=dict(size=10, color='black'),
-                            bgcolor='rgba(255, 255, 255, 0.8)',
-                            bordercolor='rgba(0, 0, 0, 0.3)',
-                            borderwidth=1,
-                            borderpad=2
-                        ))
-
-            # Zeichne Knoten als Rechtecke (Shapes) mit Text
-            shapes = []
-            for node, (x, y) in node_positions.items():
-                cat = get_category(node)
-                status = get_status(node)
-                color = category_colors.get(cat, '#999999')
-
-                # FÃ¼ge Rechteck als Shape hinzu (verwendet node_width und node_height von oben)
-                shapes.append(dict(
-                    type='rect',
-                    x0=x - node_width / 2,
-                    y0=y - node_height / 2,
-                    x1=x + node_width / 2,
-                    y1=y + node_height / 2,
-                    fillcolor=color,
-                    line=dict(color='white', width=2),
-                    layer='below'
-                ))
-
-
-                # FÃ¼ge Text-Annotation fÃ¼r jeden Knoten hinzu
-                # Kategorie (fett) Ã¼ber Status
-
-                # Dynamische SchriftgrÃ¶ÃŸe - SEHR KONSERVATIV fÃ¼r alle FenstergrÃ¶ÃŸen
-                def calculate_font_size(text, actual_node_width):
-                    """Berechnet optimale SchriftgrÃ¶ÃŸe fÃ¼r Text im Knoten."""
-                    if not text:
-                        return 7
-
-                    # Entferne HTML-Tags fÃ¼r LÃ¤ngenberechnung
-                    clean_text = text.replace('<b>', '').replace('</b>', '').replace('<br>', '\n')
-
-                    # Finde lÃ¤ngste Zeile
-                    lines = clean_text.split('\n')
-                    max_line_length = max(len(line) for line in lines)
-
-                    # SEHR KONSERVATIVE Berechnung mit groÃŸem Sicherheitspuffer
-                    # Da Plotly die Knoten skaliert, aber Schrift absolut ist,
-                    # mÃ¼ssen wir sehr vorsichtig sein
-
-                    # VerfÃ¼gbare Breite: nur 70% der Knotenbreite nutzen
-                    available_width = actual_node_width * 0.7
-
-                    # Berechne mit groÃŸem Sicherheitsfaktor (0.7 statt 0.6)
-                    optimal_size = available_width / (max_line_length * 0.7)
-
-                    # Sehr enge Grenzen fÃ¼r Sicherheit
-                    # Bei 80px: max 8pt (nicht mehr!)
-                    min_size = 5
-                    max_size = 8  # Reduziert von 9
-
-                    font_size = max(min_size, min(max_size, optimal_size))
-
-                    return int(font_size)
-
-
-                if status:
-                    display_text = f'<b>{cat}</b><br>{status}'
-                else:
-                    display_text = f'<b>{cat}</b>'
-
-                # Berechne optimale SchriftgrÃ¶ÃŸe
-                font_size = calculate_font_size(display_text, node_width)
-
-                annotations.append(dict(
-                    x=x,
-                    y=y,
-                    text=display_text,
-                    showarrow=False,
-                    font=dict(size=font_size, color='white', family='Arial'),
-                    xanchor='center',
-                    yanchor='middle'
-                ))
-
-                # Unsichtbarer Scatter-Point fÃ¼r Hover-Info
-                fig.add_trace(go.Scatter(
-                    x=[x],
-                    y=[y],
-                    mode='markers',
-                    marker=dict(size=node_width, color='rgba(0,0,0,0)', symbol='square'),
-                    showlegend=False,
-                    hovertemplate=f'<b>{node}</b><extra></extra>'
-                ))
-
-            # Update Layout
-            fig.update_layout(
-                height=600,
-                showlegend=False,
-                xaxis=dict(
-                    showgrid=False,
-                    showticklabels=False,
-                    zeroline=False,
-                    range=[-50, (len(categories) - 1) * h_spacing + 50]
-                ),
-                yaxis=dict(
-                    showgrid=False,
-                    showticklabels=False,
-                    zeroline=False,
-                    range=[-50, max_statuses * v_spacing + 50]
-                ),
-                margin=dict(l=20, r=20, t=40, b=20),
-                annotations=annotations,
-                shapes=shapes,
-                plot_bgcolor='rgba(240, 240, 245, 0.5)'
+            # Dichte DFGs vor dem Layout ausdünnen; Schieberegler arbeiten auf dem geladenen DFG (ohne neue Abfrage)
+            with st.expander("Kanten ausdünnen"):
+                prune_mode = st.selectbox('Kriterium', list(PRUNE_MODES), key='dfg_prune_mode')
+                prune_param = PRUNE_MODES[prune_mode]
+                prune_kwargs = {}
+                max_frequency = pd.to_numeric(df_dfg['FREQUENCY'], errors='coerce').max()
+                max_frequency = int(max_frequency) if pd.notna(max_frequency) else 1
+                if prune_param == 'min_frequency':
+                    prune_kwargs['min_frequency'] = st.slider(
+                        'Mindest-Frequenz', 1, max(max_frequency, 2), 1, key='dfg_prune_min_frequency')
+                elif prune_param == 'top_k':
+                    prune_kwargs['top_k'] = st.slider(
+                        'Anzahl Kanten', 1, max(len(df_dfg), 2), min(len(df_dfg), 50), key='dfg_prune_top_k')
+                elif prune_param == 'coverage':
+                    prune_kwargs['coverage'] = st.slider(
+                        'Abgedeckte Übergänge (%)', 50, 100, 90, key='dfg_prune_coverage') / 100
+
+            df_dfg_shown, prune_summary = prune_dfg(df_dfg, **prune_kwargs)
+            if prune_summary['dropped_edges']:
+                connecting = (f"; {prune_summary['connecting_edges']} seltenere Kanten halten den Graphen zusammen"
+                              if prune_summary['connecting_edges'] else "")
+                st.caption(f"{prune_summary['dropped_edges']} von {len(df_dfg)} Kanten ausgeblendet "
+                           f"({prune_summary['dropped_frequency']:,.0f} Übergänge, "
+                           f"{1 - prune_summary['kept_share']:.1%} aller Übergänge{connecting})")
+
+            # Große Graphen mit WebGL zeichnen, damit der Browser flüssig bleibt
+            shown_nodes = pd.unique(df_dfg_shown[['FROM_ACTIVITY', 'TO_ACTIVITY']].to_numpy().ravel())
+            use_webgl = len(shown_nodes) >= DFG_WEBGL_MIN_NODES or len(df_dfg_shown) >= DFG_WEBGL_MIN_EDGES
+
+            # Figur aus dem Cache: Reruns ohne Änderung am DFG berechnen kein Layout und kein Routing
+            fig, figure_payload = get_dfg_figure_cache().get(
+                df_dfg_shown, h_spacing, v_spacing, node_width, node_height,
+                batched=DFG_BATCHED_TRACES, webgl=use_webgl
             )
 
             st.plotly_chart(fig, use_container_width=True)
 
+            # Größe der an den Browser übertragenen Figur (JSON), um Änderungen am Rendering messen zu können
+            st.caption(f"Diagrammgröße: {figure_payload / 1024:,.0f} KB "
+                       f"({len(fig.data)} Traces, {len(fig.layout.annotations)} Annotationen, "
+                       f"{len(fig.layout.shapes)} Formen{', WebGL' if use_webgl else ''})")
+
 
         except ImportError:
             st.error("Plotly ist nicht installiert!")
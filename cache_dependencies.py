@@ -0,0 +1,121 @@
+import threading
+
+
+# ============================================================================
+# KONFIGURATION
+# ============================================================================
+
+# Tabellen bzw. Datenquellen, von denen gecachte Ergebnisse abhängen können
+TABLE_TARGET_TIMES = 'dbo.T_PROCESS_TO_BE_TIME'
+TABLE_EVENTLOG = 'EVENTLOG'           # Quelle des Orchestrators (Eventlog, KPI, DFG)
+TABLE_LOV_CUSTOMER = 'LOV_CUSTOMER'
+TABLE_LOV_MATERIAL = 'LOV_MATERIAL'
+
+
+# ============================================================================
+# ABHÄNGIGKEITS-REGISTER
+# ============================================================================
+
+def cache_name(cache):
+    """Stabiler Name eines Caches: Modul + qualifizierter Name der Funktion bzw. Klasse."""
+    module = getattr(cache, '__module__', None) or type(cache).__module__
+    qualname = getattr(cache, '__qualname__', None) or type(cache).__qualname__
+    return f"{module}.{qualname}"
+
+
+class CacheDependencies:
+    """
+    Ordnet Caches den Tabellen zu, aus denen sie lesen. Ein Schreibzugriff
+    invalidiert nur die abhängigen Caches statt aller (st.cache_data.clear()).
+
+    Ein Cache ist jedes Objekt mit clear(): mit @st.cache_data dekorierte
+    Funktionen ebenso wie die prozessweiten Caches (Parquet, Obermengen, ...).
+
+    Einträge werden unter einem stabilen Namen (Modul + qualifizierter Name) geführt:
+    Streamlit führt app.py bei jedem Rerun neu aus und dekoriert die Loader erneut -
+    die neue Funktion ersetzt dann die des vorherigen Laufs, statt sich anzuhängen.
+    """
+
+    def __init__(self):
+        self._dependents = {}  # Tabelle -> {Name: Cache}
+        self._lock = threading.Lock()
+        self._stats = {'invalidations': 0, 'cleared': 0}
+
+    def register(self, cache, *tables, name=None):
+        """
+        Trägt cache als abhängig von den angegebenen Tabellen ein.
+
+        Args:
+            cache: Objekt mit clear()
+            tables: Tabellen, aus denen der Cache liest
+            name: Stabiler Name; Standard ist Modul + qualifizierter Name der Funktion bzw. Klasse.
+                  Ein früher unter demselben Namen eingetragener Cache wird ersetzt.
+        """
+        if name is None:
+            name = cache_name(cache)
+        with self._lock:
+            for table in tables:
+                self._dependents.setdefault(table, {})[name] = cache
+        return cache
+
+    def dependents(self, *tables):
+        """Abhängige Caches der Tabellen, jeder nur einmal."""
+        with self._lock:
+            caches = {}
+            for table in tables:
+                caches.update(self._dependents.get(table, {}))
+        return list(caches.values())
+
+    def invalidate(self, *tables):
+        """
+        Leert alle Caches, die von mindestens einer der Tabellen abhängen.
+
+        Returns:
+            int: Anzahl geleerter Caches
+        """
+        caches = self.dependents(*tables)
+        for cache in caches:
+            cache.clear()
+        with self._lock:
+            self._stats['invalidations'] += 1
+            self._stats['cleared'] += len(caches)
+        return len(caches)
+
+    def metrics(self):
+        """Gibt die Anzahl der Invalidierungen und geleerten Caches zurück."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['tables'] = len(self._dependents)
+            stats['caches'] = len({name for dependents in self._dependents.values() for name in dependents})
+        return stats
+
+
+_dependencies = None
+_dependencies_lock = threading.Lock()
+
+
+def get_cache_dependencies():
+    """Gibt das prozessweit geteilte Abhängigkeits-Register zurück."""
+    global _dependencies
+    with _dependencies_lock:
+        if _dependencies is None:
+            _dependencies = CacheDependencies()
+        return _dependencies
+
+
+def depends_on(*tables):
+    """
+    Dekorator: Registriert einen Cache (z.B. eine @st.cache_data-Funktion) für die Tabellen.
+
+        @depends_on(TABLE_TARGET_TIMES)
+        @st.cache_data(ttl=300)
+        def load_sollwerte(...): ...
+    """
+    def decorator(cache):
+        return get_cache_dependencies().register(cache, *tables)
+    return decorator
+
+
+def invalidate_tables(*tables):
+    """Invalidiert alle Caches, die von den Tabellen abhängen (siehe CacheDependencies.invalidate)."""
+    return get_cache_dependencies().invalidate(*tables)
@@ -0,0 +1,157 @@
+import logging
+import threading
+import time
+
+from memory_cache import track_expiries
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================================
+# KONFIGURATION
+# ============================================================================
+
+# Sekunden nach Ablauf eines Cache-Eintrags, nach denen neu vorgeladen wird
+# (erst nach dem Ablauf trifft der Aufruf keinen alten Eintrag mehr, sondern lädt neu)
+WARMER_EXPIRY_MARGIN = 1
+
+# Wartezeit in Sekunden bis zum nächsten Versuch, wenn das Vorladen fehlgeschlagen ist
+WARMER_RETRY_DELAY = 60
+
+
+# ============================================================================
+# CACHE-WARMER
+# ============================================================================
+
+class _WarmupTask:
+    """Eine Vorlade-Aufgabe: Funktion, die gecachte Loader aufruft, und deren ttl."""
+
+    def __init__(self, name, func, interval):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.next_run = 0.0
+        self.last_run = None
+        self.last_duration = None
+        self.last_error = None
+
+
+class CacheWarmer:
+    """
+    Lädt Caches in einem Hintergrund-Thread vor: sofort beim Start und danach
+    jeweils direkt nach Ablauf der vorgeladenen Einträge, damit der erste Aufruf
+    einer Session bereits einen gefüllten Cache trifft.
+
+    Maßgeblich ist der tatsächliche Ablaufzeitpunkt im MemoryResultCache: Der ttl
+    eines Eintrags beginnt erst, wenn das Laden fertig ist - und ein Eintrag, den
+    eine Session zwischendurch neu geladen hat, läuft später ab als geplant.
+
+    Aufgaben werden über register() eingetragen; wiederholtes Eintragen unter
+    demselben Namen (z.B. bei jedem Rerun) aktualisiert nur Funktion und Intervall.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._stats = {'runs': 0, 'errors': 0}
+
+    def register(self, name, func, interval):
+        """
+        Trägt eine Vorlade-Aufgabe ein.
+
+        Args:
+            name: Eindeutiger Name der Aufgabe
+            func: Funktion ohne Argumente, die die gecachten Loader aufruft
+            interval: ttl der vorgeladenen Caches in Sekunden (nur, wenn kein Ablaufzeitpunkt
+                      ermittelt werden konnte, z.B. weil ein Eintrag das Speicherbudget übersteigt)
+        """
+        with self._lock:
+            task = self._tasks.get(name)
+            if task is None:
+                self._tasks[name] = _WarmupTask(name, func, interval)
+                self._wakeup.set()
+            else:
+                task.func = func
+                task.interval = interval
+
+    def start(self):
+        """Startet den Hintergrund-Thread (einmal pro Prozess, weitere Aufrufe sind wirkungslos)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='cache-warmer', daemon=True)
+            self._thread.start()
+
+    def _due_tasks(self):
+        """Fällige Aufgaben und Wartezeit bis zur nächsten."""
+        with self._lock:
+            now = time.time()
+            due = [task for task in self._tasks.values() if task.next_run <= now]
+            pending = [task.next_run for task in self._tasks.values() if task.next_run > now]
+            timeout = min(pending) - now if pending else None
+        return due, timeout
+
+    def _run_task(self, task):
+        started = time.time()
+        with track_expiries() as expiries:
+            try:
+                task.func()
+                error = None
+            except Exception as ex:
+                # Fehler (z.B. Datenbank nicht erreichbar) nur protokollieren - der Warmer-Thread hat keine
+                # Oberfläche, die Loader cachen den Fehler nicht, und die Sessions laden dann selbst
+                logger.warning("Vorladen von '%s' fehlgeschlagen: %s", task.name, ex)
+                error = ex
+        finished = time.time()
+
+        with self._lock:
+            task.last_run = started
+            task.last_duration = finished - started
+            task.last_error = error
+            self._stats['runs'] += 1
+            if error is None:
+                # Erneut laden, sobald der erste vorgeladene Eintrag abgelaufen ist
+                expires_at = min(expiries) if expiries else finished + task.interval
+                task.next_run = max(expires_at, finished) + WARMER_EXPIRY_MARGIN
+            else:
+                self._stats['errors'] += 1
+                task.next_run = time.time() + WARMER_RETRY_DELAY
+
+    def _run(self):
+        while True:
+            due, timeout = self._due_tasks()
+            for task in due:
+                self._run_task(task)
+            if not due:
+                self._wakeup.wait(timeout)
+                self._wakeup.clear()
+
+    def metrics(self):
+        """Gibt Läufe und Fehler sowie pro Aufgabe letzten Lauf, Dauer und Fehler zurück."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['tasks'] = {
+                task.name: {
+                    'last_run': task.last_run,
+                    'last_duration': task.last_duration,
+                    'last_error': repr(task.last_error) if task.last_error is not None else None,
+                    'next_run': task.next_run,
+                }
+                for task in self._tasks.values()
+            }
+        return stats
+
+
+_cache_warmer = None
+_cache_warmer_lock = threading.Lock()
+
+
+def get_cache_warmer():
+    """Gibt den prozessweit geteilten Cache-Warmer zurück."""
+    global _cache_warmer
+    with _cache_warmer_lock:
+        if _cache_warmer is None:
+            _cache_warmer = CacheWarmer()
+        return _cache_warmer
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from eventlog_columns import EVENTLOG_CASE_COLUMN, EVENTLOG_TIMESTAMP_COLUMN
+
+
+# ============================================================================
+# KONFIGURATION
+# ============================================================================
+
+# Textspalten werden zu Categoricals, wenn höchstens dieser Anteil der Werte verschieden ist
+# (Aktivitäten, Kunden- und Materialnamen wiederholen sich über viele Events)
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+# Spalten, die nie kategorisiert werden: Die Fall-ID wird gruppiert und sortiert,
+# als Categorical würde groupby auch nicht vorkommende Fälle liefern
+COMPACTION_EXCLUDE_COLUMNS = (EVENTLOG_CASE_COLUMN, EVENTLOG_TIMESTAMP_COLUMN)
+
+# Schlüssel in df.attrs, unter dem der Bericht der Kompaktierung abgelegt wird
+COMPACTION_ATTR = 'compaction'
+
+
+# ============================================================================
+# KOMPAKTIERUNG
+# ============================================================================
+
+def _compact_column(series, allow_category):
+    """Kompakterer Typ für eine Spalte oder None, wenn sich nichts gewinnen lässt."""
+    if pd.api.types.is_bool_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+        return None
+
+    if pd.api.types.is_integer_dtype(series):
+        downcast = pd.to_numeric(series, downcast='integer')
+        return downcast if downcast.dtype != series.dtype else None
+
+    if pd.api.types.is_float_dtype(series):
+        # Nur verlustfrei: Beträge wie 19.99 sind in float32 nicht exakt und bleiben float64
+        values = series.to_numpy()
+        as_float32 = values.astype(np.float32)
+        if series.dtype != np.float32 and np.array_equal(as_float32.astype(values.dtype), values, equal_nan=True):
+            return pd.Series(as_float32, index=series.index, name=series.name)
+        return None
+
+    if allow_category and (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+        non_null = series.count()
+        if non_null and series.nunique(dropna=True) <= CATEGORY_MAX_UNIQUE_RATIO * non_null:
+            return series.astype('category')
+    return None
+
+
+def compact_dtypes(df, exclude=COMPACTION_EXCLUDE_COLUMNS):
+    """
+    Verkleinert einen DataFrame im Speicher: sich wiederholende Textspalten werden
+    Categoricals, Ganzzahlen werden auf den kleinsten passenden Typ verkleinert,
+    Gleitkommazahlen nur, wenn float32 die Werte exakt darstellt.
+
+    Args:
+        df: DataFrame (z.B. das Eventlog direkt nach dem Laden)
+        exclude: Spalten, die nicht kategorisiert werden (Zahlen werden trotzdem verkleinert)
+
+    Returns:
+        pd.DataFrame: Kompaktierter DataFrame; der Bericht liegt in df.attrs[COMPACTION_ATTR]
+                      ({'bytes_before', 'bytes_after', 'columns': {Spalte: (alter Typ, neuer Typ)}})
+    """
+    if df is None or df.empty:
+        return df
+
+    bytes_before = int(df.memory_usage(deep=True).sum())
+    compacted = {}
+    for name in df.columns:
+        column = _compact_column(df[name], allow_category=name not in exclude)
+        if column is not None:
+            compacted[name] = column
+
+    previous_dtypes = {name: str(df[name].dtype) for name in compacted}
+    if compacted:
+        df = df.assign(**compacted)
+    df.attrs[COMPACTION_ATTR] = {
+        'bytes_before': bytes_before,
+        'bytes_after': int(df.memory_usage(deep=True).sum()),
+        'columns': {name: (previous_dtypes[name], str(df[name].dtype)) for name in compacted},
+    }
+    return df
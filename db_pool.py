@@ -0,0 +1,300 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import pyodbc
+
+
+# ============================================================================
+# KONFIGURATION
+# ============================================================================
+
+# Maximale Anzahl gleichzeitig offener Verbindungen pro Connection-String
+POOL_MAX_SIZE = 8
+
+# Verbindungen, die länger ungenutzt im Pool liegen, werden geschlossen (Sekunden)
+POOL_IDLE_TIMEOUT = 300
+
+# Maximale Wartezeit auf eine freie Verbindung, wenn der Pool ausgeschöpft ist (Sekunden)
+POOL_CHECKOUT_TIMEOUT = 30
+
+# Health-Check nur für Verbindungen, die mindestens so lange ungenutzt waren (Sekunden).
+# Frisch zurückgegebene Verbindungen werden ohne zusätzlichen Roundtrip wiederverwendet.
+POOL_HEALTH_CHECK_AFTER = 30
+
+# Timeout für den Verbindungsaufbau (Sekunden)
+POOL_CONNECT_TIMEOUT = 5
+
+
+class PoolTimeoutError(pyodbc.Error):
+    """
+    Wird geworfen, wenn innerhalb von POOL_CHECKOUT_TIMEOUT keine Verbindung frei wurde.
+    Erbt von pyodbc.Error, damit die bestehenden Fehlerbehandlungen greifen.
+    """
+
+
+class MissingConnectionError(pyodbc.Error):
+    """
+    Wird geworfen, wenn kein Connection-String vorliegt (z.B. abgelaufene Anmeldung).
+    Erbt von pyodbc.Error wie PoolTimeoutError; gemeldet wird der Fehler vom Aufrufer.
+    """
+
+
+# ============================================================================
+# CONNECTION POOL
+# ============================================================================
+
+class ConnectionPool:
+    """
+    Thread-sicherer, größenbeschränkter Pool für pyodbc-Verbindungen.
+
+    Verbindungen werden beim Ausleihen auf Gültigkeit geprüft (Health-Check),
+    nach POOL_IDLE_TIMEOUT Sekunden Leerlauf geschlossen und über metrics()
+    ausgewertet.
+    """
+
+    def __init__(self, connection_string, max_size=POOL_MAX_SIZE, idle_timeout=POOL_IDLE_TIMEOUT,
+                 checkout_timeout=POOL_CHECKOUT_TIMEOUT, health_check_after=POOL_HEALTH_CHECK_AFTER,
+                 connect_timeout=POOL_CONNECT_TIMEOUT):
+        self._connection_string = connection_string
+        self._max_size = max_size
+        self._idle_timeout = idle_timeout
+        self._checkout_timeout = checkout_timeout
+        self._health_check_after = health_check_after
+        self._connect_timeout = connect_timeout
+
+        self._condition = threading.Condition()
+        # Freie Verbindungen als Liste von (connection, zeitpunkt_letzte_nutzung), LIFO
+        self._idle = []
+        # Anzahl aller offenen Verbindungen (frei + ausgeliehen + im Aufbau)
+        self._size = 0
+        self._closed = False
+
+        self._stats = {
+            'checkouts': 0,
+            'created': 0,
+            'reused': 0,
+            'health_check_failures': 0,
+            'evicted_idle': 0,
+            'discarded': 0,
+            'waits': 0,
+            'timeouts': 0,
+        }
+
+    # --------------------------------------------------------------------
+    # Interne Hilfsfunktionen
+    # --------------------------------------------------------------------
+
+    def _create_connection(self):
+        return pyodbc.connect(self._connection_string, timeout=self._connect_timeout)
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except pyodbc.Error:
+            pass
+
+    def _is_healthy(self, connection):
+        """Prüft mit einem minimalen Statement, ob die Verbindung noch lebt."""
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except pyodbc.Error:
+            return False
+
+    def _evict_idle_locked(self):
+        """Schließt Verbindungen, die länger als idle_timeout ungenutzt sind (Lock muss gehalten werden)."""
+        now = time.monotonic()
+        expired = [(conn, ts) for conn, ts in self._idle if now - ts > self._idle_timeout]
+        if not expired:
+            return []
+
+        self._idle = [(conn, ts) for conn, ts in self._idle if now - ts <= self._idle_timeout]
+        self._size -= len(expired)
+        self._stats['evicted_idle'] += len(expired)
+        self._condition.notify(len(expired))
+        return [conn for conn, _ in expired]
+
+    # --------------------------------------------------------------------
+    # Öffentliche API
+    # --------------------------------------------------------------------
+
+    def acquire(self):
+        """
+        Leiht eine Verbindung aus dem Pool aus.
+
+        Returns:
+            pyodbc.Connection: Eine geprüfte, offene Verbindung
+
+        Raises:
+            PoolTimeoutError: Wenn der Pool innerhalb des Timeouts ausgeschöpft bleibt
+            pyodbc.Error: Wenn der Verbindungsaufbau fehlschlägt
+        """
+        deadline = time.monotonic() + self._checkout_timeout
+
+        while True:
+            connection = None
+            last_used = None
+            create_new = False
+
+            with self._condition:
+                if self._closed:
+                    raise pyodbc.Error("Der Verbindungspool wurde bereits geschlossen.")
+
+                to_close = self._evict_idle_locked()
+
+                if self._idle:
+                    connection, last_used = self._idle.pop()
+                elif self._size < self._max_size:
+                    self._size += 1
+                    create_new = True
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f"Keine freie Datenbankverbindung innerhalb von {self._checkout_timeout} Sekunden.")
+                    self._stats['waits'] += 1
+                    self._condition.wait(remaining)
+
+            # Schließen und Verbindungsaufbau außerhalb des Locks, damit andere Threads nicht blockieren
+            for conn in to_close:
+                self._close_quietly(conn)
+
+            if create_new:
+                try:
+                    connection = self._create_connection()
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+                with self._condition:
+                    self._stats['created'] += 1
+                    self._stats['checkouts'] += 1
+                return connection
+
+            if connection is None:
+                # Wir haben gewartet - erneut versuchen
+                continue
+
+            # Health-Check nur nach längerem Leerlauf
+            if time.monotonic() - last_used >= self._health_check_after and not self._is_healthy(connection):
+                self._close_quietly(connection)
+                with self._condition:
+                    self._size -= 1
+                    self._stats['health_check_failures'] += 1
+                    self._condition.notify()
+                continue
+
+            with self._condition:
+                self._stats['reused'] += 1
+                self._stats['checkouts'] += 1
+            return connection
+
+    def release(self, connection, discard=False):
+        """
+        Gibt eine ausgeliehene Verbindung an den Pool zurück.
+
+        Args:
+            connection: Die zuvor mit acquire() ausgeliehene Verbindung
+            discard: True, wenn die Verbindung verworfen statt wiederverwendet werden soll
+        """
+        if not discard:
+            # Offene (nicht committete) Transaktionen dürfen nicht beim nächsten Nutzer landen
+            try:
+                connection.rollback()
+            except pyodbc.Error:
+                discard = True
+
+        with self._condition:
+            if discard or self._closed:
+                self._size -= 1
+                self._stats['discarded'] += 1
+            else:
+                self._idle.append((connection, time.monotonic()))
+                connection = None
+            self._condition.notify()
+
+        if connection is not None:
+            self._close_quietly(connection)
+
+    @contextmanager
+    def connection(self):
+        """
+        Context-Manager zum Ausleihen einer Verbindung.
+        Bei einem Datenbankfehler wird die Verbindung verworfen statt zurückgelegt.
+
+        Beispiel:
+            with pool.connection() as conn:
+                df = pd.read_sql(sql, conn)
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        except pyodbc.Error:
+            self.release(conn, discard=True)
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def metrics(self):
+        """
+        Gibt Kennzahlen zum Zustand des Pools zurück.
+
+        Returns:
+            dict: Zähler (checkouts, created, reused, ...) sowie size, idle und in_use
+        """
+        with self._condition:
+            stats = dict(self._stats)
+            stats['size'] = self._size
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._size - len(self._idle)
+            stats['max_size'] = self._max_size
+        return stats
+
+    def close_all(self):
+        """Schließt alle freien Verbindungen; ausgeliehene werden bei der Rückgabe geschlossen."""
+        with self._condition:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._size -= len(idle)
+            self._idle = []
+            self._condition.notify_all()
+
+        for conn in idle:
+            self._close_quietly(conn)
+
+
+# ============================================================================
+# PROZESSWEITE POOL-INSTANZEN
+# ============================================================================
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(connection_string):
+    """
+    Gibt den prozessweit geteilten Pool für einen Connection-String zurück.
+    Alle Streamlit-Sessions und Threads teilen sich damit dieselben Verbindungen.
+
+    Args:
+        connection_string: ODBC-Connection-String (z.B. aus get_connection_string())
+
+    Returns:
+        ConnectionPool: Der (ggf. neu angelegte) Pool
+    """
+    with _pools_lock:
+        pool = _pools.get(connection_string)
+        if pool is None:
+            pool = ConnectionPool(connection_string)
+            _pools[connection_string] = pool
+        return pool
@@ -0,0 +1,212 @@
+import numpy as np
+import pandas as pd
+
+from eventlog_columns import EVENTLOG_ACTIVITY_COLUMN, EVENTLOG_CASE_COLUMN, EVENTLOG_TIMESTAMP_COLUMN
+
+
+# Spalten des DFG, wie sie auch der Orchestrator mit @output = 'dfg' liefert
+DFG_COLUMNS = ['FROM_ACTIVITY', 'TO_ACTIVITY', 'FREQUENCY']
+
+# Zusätzliche Spalte bei with_durations=True: mittlere Übergangsdauer in Minuten
+DFG_DURATION_COLUMN = 'MEAN_DURATION_MIN'
+
+# Modi zum Ausdünnen dichter DFGs vor dem Layout: Anzeigename -> Parameter von prune_dfg()
+PRUNE_MODES = {
+    'Alle Kanten': None,
+    'Mindest-Frequenz': 'min_frequency',
+    'Top-k Kanten': 'top_k',
+    'Abdeckung der Übergänge (%)': 'coverage',
+}
+
+# Beim Ausdünnen zusätzlich die Kanten eines maximalen aufspannenden Waldes behalten: Was im DFG
+# verbunden ist, bleibt auch im ausgedünnten DFG verbunden (keine verwaisten Aktivitäten)
+PRUNE_KEEP_CONNECTED = True
+
+
+def can_compute_dfg(df_eventlog):
+    """Prüft, ob das Eventlog die für den DFG nötigen Spalten (Fall, Aktivität, Zeitpunkt) enthält."""
+    required = (EVENTLOG_CASE_COLUMN, EVENTLOG_ACTIVITY_COLUMN, EVENTLOG_TIMESTAMP_COLUMN)
+    return all(column in df_eventlog.columns for column in required)
+
+
+def compute_dfg(df_eventlog, with_durations=False):
+    """
+    Berechnet den Directly-Follows Graph vektorisiert aus dem Eventlog.
+
+    Vorgehen: Events nach Fall und Zeitpunkt sortieren, die Aktivitätsspalte um eine
+    Zeile verschieben und nur Paare innerhalb desselben Falls zählen.
+
+    Args:
+        df_eventlog: Eventlog mit Fall-, Aktivitäts- und Zeitstempelspalte
+        with_durations: True, um zusätzlich die mittlere Übergangsdauer (Minuten) zu berechnen
+
+    Returns:
+        pd.DataFrame: FROM_ACTIVITY, TO_ACTIVITY, FREQUENCY (+ MEAN_DURATION_MIN)
+                      oder None, wenn Spalten fehlen
+    """
+    if not can_compute_dfg(df_eventlog):
+        return None
+
+    columns = DFG_COLUMNS + ([DFG_DURATION_COLUMN] if with_durations else [])
+
+    events = df_eventlog[[EVENTLOG_CASE_COLUMN, EVENTLOG_ACTIVITY_COLUMN, EVENTLOG_TIMESTAMP_COLUMN]]
+    events = events.dropna(subset=[EVENTLOG_CASE_COLUMN, EVENTLOG_ACTIVITY_COLUMN])
+    if len(events) < 2:
+        return pd.DataFrame(columns=columns)
+
+    # Stabile Sortierung: Events mit gleichem Zeitpunkt behalten ihre Reihenfolge aus der Datenbank
+    events = events.sort_values([EVENTLOG_CASE_COLUMN, EVENTLOG_TIMESTAMP_COLUMN], kind='mergesort')
+
+    cases = events[EVENTLOG_CASE_COLUMN].to_numpy()
+    activities = events[EVENTLOG_ACTIVITY_COLUMN].to_numpy()
+    same_case = cases[1:] == cases[:-1]
+
+    transitions = pd.DataFrame({
+        'FROM_ACTIVITY': activities[:-1][same_case],
+        'TO_ACTIVITY': activities[1:][same_case],
+    })
+
+    if with_durations:
+        timestamps = events[EVENTLOG_TIMESTAMP_COLUMN].to_numpy()
+        durations = (timestamps[1:] - timestamps[:-1])[same_case]
+        transitions[DFG_DURATION_COLUMN] = durations / np.timedelta64(1, 'm')
+
+    if transitions.empty:
+        return pd.DataFrame(columns=columns)
+
+    grouped = transitions.groupby(['FROM_ACTIVITY', 'TO_ACTIVITY'], sort=True)
+    dfg = grouped.size().rename('FREQUENCY').to_frame()
+    if with_durations:
+        dfg[DFG_DURATION_COLUMN] = grouped[DFG_DURATION_COLUMN].mean()
+
+    dfg = dfg.reset_index()
+    dfg['FREQUENCY'] = dfg['FREQUENCY'].astype('int64')
+    return dfg.sort_values('FREQUENCY', ascending=False, kind='mergesort').reset_index(drop=True)[columns]
+
+
+def _spanning_edges(from_nodes, to_nodes, order):
+    """
+    Positionen der Kanten eines maximalen aufspannenden Waldes (Kruskal über die absteigend
+    nach Frequenz sortierten Kanten, Richtung und Self-Loops spielen keine Rolle).
+    """
+    parent = {}
+
+    def find(node):
+        root = parent.setdefault(node, node)
+        while root != parent[root]:
+            root = parent[root]
+        while node != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    spanning = []
+    for position in order:
+        from_root, to_root = find(from_nodes[position]), find(to_nodes[position])
+        if from_root != to_root:
+            parent[from_root] = to_root
+            spanning.append(position)
+    return np.asarray(spanning, dtype=np.intp)
+
+
+def prune_dfg(df_dfg, min_frequency=None, top_k=None, coverage=None, keep_connected=PRUNE_KEEP_CONNECTED):
+    """
+    Dünnt den DFG vor dem Layout aus, damit nur die angezeigten Kanten geroutet und gezeichnet werden.
+
+    Die Kanten werden einmal absteigend nach Frequenz sortiert; alle drei Kriterien
+    schneiden diese Reihenfolge nur an einer Stelle ab. Mit keep_connected bleiben
+    zusätzlich die häufigsten Kanten, die den Graphen zusammenhalten.
+
+    Args:
+        df_dfg: DFG mit FROM_ACTIVITY, TO_ACTIVITY, FREQUENCY
+        min_frequency: Kanten mit kleinerer Frequenz ausblenden
+        top_k: Nur die k häufigsten Kanten behalten
+        coverage: Häufigste Kanten behalten, bis dieser Anteil (0-1) aller Übergänge abgedeckt ist
+        keep_connected: True, damit verbundene Aktivitäten verbunden bleiben (siehe PRUNE_KEEP_CONNECTED)
+
+    Returns:
+        tuple: (ausgedünnter DFG in ursprünglicher Reihenfolge,
+                dict mit kept_edges, dropped_edges, connecting_edges, dropped_frequency, kept_share)
+    """
+    frequencies = pd.to_numeric(df_dfg['FREQUENCY'], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+    total = frequencies.sum()
+
+    # Stabile Sortierung: gleich häufige Kanten behalten ihre Reihenfolge
+    order = np.argsort(-frequencies, kind='mergesort')
+    sorted_frequencies = frequencies[order]
+    keep_count = len(order)
+
+    if min_frequency is not None:
+        keep_count = min(keep_count, int(np.count_nonzero(sorted_frequencies >= min_frequency)))
+    if top_k is not None:
+        keep_count = min(keep_count, max(int(top_k), 0))
+    if coverage is not None and total > 0:
+        # Erste Position, an der der kumulierte Anteil die Abdeckung erreicht, gehört noch dazu
+        cumulative_share = np.cumsum(sorted_frequencies) / total
+        needed = int(np.searchsorted(cumulative_share, coverage - 1e-12)) + 1
+        keep_count = min(keep_count, needed)
+
+    keep = np.zeros(len(order), dtype=bool)
+    keep[order[:keep_count]] = True
+
+    # Kanten, die nur für den Zusammenhalt behalten werden
+    connecting_edges = 0
+    if keep_connected and keep_count < len(order):
+        spanning = _spanning_edges(df_dfg['FROM_ACTIVITY'].to_numpy(), df_dfg['TO_ACTIVITY'].to_numpy(), order)
+        connecting_edges = int(np.count_nonzero(~keep[spanning]))
+        keep[spanning] = True
+
+    kept_edges = int(np.count_nonzero(keep))
+    kept_frequency = frequencies[keep].sum()
+
+    summary = {
+        'kept_edges': kept_edges,
+        'dropped_edges': len(order) - kept_edges,
+        'connecting_edges': connecting_edges,
+        'dropped_frequency': float(total - kept_frequency),
+        'kept_share': float(kept_frequency / total) if total > 0 else 1.0,
+    }
+    return df_dfg.loc[keep], summary
+
+
+class EdgeIndex:
+    """
+    Gehashter Index über die Kanten eines DFG, einmal pro DFG aufgebaut.
+
+    Beantwortet Rückkanten-, Grad- und Nachbarschaftsabfragen in O(1) statt den
+    DFG pro Kante erneut zu filtern.
+    """
+
+    def __init__(self, df_dfg):
+        from_nodes = df_dfg['FROM_ACTIVITY'].to_numpy()
+        to_nodes = df_dfg['TO_ACTIVITY'].to_numpy()
+        frequencies = df_dfg['FREQUENCY'].to_numpy()
+
+        # (von, nach) -> Frequenz
+        self.frequencies = dict(zip(zip(from_nodes, to_nodes), frequencies))
+        self.successors = {}
+        self.predecessors = {}
+        for from_node, to_node in self.frequencies:
+            self.successors.setdefault(from_node, set()).add(to_node)
+            self.predecessors.setdefault(to_node, set()).add(from_node)
+        self.nodes = set(self.successors) | set(self.predecessors)
+
+    def has_edge(self, from_node, to_node):
+        return (from_node, to_node) in self.frequencies
+
+    def is_bidirectional(self, from_node, to_node):
+        """True, wenn es auch die Rückkante gibt (Self-Loops zählen nicht)."""
+        return from_node != to_node and (to_node, from_node) in self.frequencies
+
+    def bidirectional_edges(self):
+        """Alle Kanten, deren Rückkante ebenfalls existiert."""
+        return {edge for edge in self.frequencies if self.is_bidirectional(*edge)}
+
+    def out_degree(self, node):
+        return len(self.successors.get(node, ()))
+
+    def in_degree(self, node):
+        return len(self.predecessors.get(node, ()))
+
+    def neighbors(self, node):
+        """Vorgänger und Nachfolger eines Knotens."""
+        return self.successors.get(node, set()) | self.predecessors.get(node, set())
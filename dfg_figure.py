@@ -0,0 +1,582 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from dfg_engine import EdgeIndex
+from memory_cache import get_memory_cache, MISSING
+from dfg_geometry import (
+    NodeGrid,
+    arrowhead_barbs,
+    curved_control_point,
+    edge_endpoints,
+    join_polylines,
+    quadratic_bezier,
+    self_loop_curves,
+)
+
+
+# ============================================================================
+# KONFIGURATION
+# ============================================================================
+
+# Kategorien (Spalten des Layouts) und ihre Farben
+CATEGORIES = ['SALESOFFER', 'SALESORDER', 'DELIVERY', 'INVOICE', 'PAYMENT']
+CATEGORY_COLORS = {
+    'SALESOFFER': '#4A90E2',  # Blau
+    'SALESORDER': '#7ED321',  # Grün
+    'DELIVERY': '#F5A623',  # Orange
+    'INVOICE': '#BD10E0',  # Lila
+    'PAYMENT': '#50E3C2'  # Türkis
+}
+
+# Anzahl fertiger Figuren bzw. Layouts, die prozessweit vorgehalten werden. Sie liegen im
+# MemoryResultCache (Größe = Figur als JSON) und zählen gegen dessen Speicherbudget.
+DFG_FIGURE_CACHE_SIZE = 16
+
+# Gültigkeitsdauer einer Figur in Sekunden (der Schlüssel ist der Inhalt, sie veraltet nicht -
+# der ttl gibt nur den Speicher selten genutzter Figuren frei)
+DFG_FIGURE_TTL = 3600
+
+
+# ============================================================================
+# HILFSFUNKTIONEN
+# ============================================================================
+
+def get_category(activity):
+    """Extrahiert die Kategorie aus dem Activity-Namen."""
+    for cat in CATEGORIES:
+        if activity.startswith(cat):
+            return cat
+    return 'UNKNOWN'
+
+
+def get_status(activity):
+    """Extrahiert den Status aus dem Activity-Namen."""
+    parts = activity.split('_')
+    if len(parts) > 1:
+        return '_'.join(parts[1:])
+    return ''
+
+
+def calculate_font_size(text, actual_node_width):
+    """Berechnet optimale Schriftgröße für Text im Knoten - sehr konservativ für alle Fenstergrößen."""
+    if not text:
+        return 7
+
+    # Entferne HTML-Tags für Längenberechnung
+    clean_text = text.replace('<b>', '').replace('</b>', '').replace('<br>', '\n')
+
+    # Finde längste Zeile
+    lines = clean_text.split('\n')
+    max_line_length = max(len(line) for line in lines)
+
+    # Da Plotly die Knoten skaliert, aber Schrift absolut ist, nur 70% der Knotenbreite
+    # nutzen und mit großem Sicherheitsfaktor (0.7 statt 0.6) rechnen
+    available_width = actual_node_width * 0.7
+    optimal_size = available_width / (max_line_length * 0.7)
+
+    # Sehr enge Grenzen für Sicherheit (bei 80px: max 8pt)
+    min_size = 5
+    max_size = 8
+
+    return int(max(min_size, min(max_size, optimal_size)))
+
+
+def frequency_label_text(frequency):
+    return f'<b>{frequency}</b>'
+
+
+def _frequency_label(x, y, frequency):
+    return dict(
+        x=float(x),
+        y=float(y),
+        text=frequency_label_text(frequency),
+        showarrow=False,
+        font=dict(size=10, color='black'),
+        bgcolor='rgba(255, 255, 255, 0.8)',
+        bordercolor='rgba(0, 0, 0, 0.3)',
+        borderwidth=1,
+        borderpad=2
+    )
+
+
+def _arrow_annotation(x, y, ax, ay):
+    return dict(
+        x=float(x),
+        y=float(y),
+        ax=float(ax),
+        ay=float(ay),
+        xref='x',
+        yref='y',
+        axref='x',
+        ayref='y',
+        showarrow=True,
+        arrowhead=2,
+        arrowsize=1.5,
+        arrowwidth=1.5,  # Konstante Breite für alle Pfeile
+        arrowcolor='rgba(100, 100, 100, 0.8)'
+    )
+
+
+# ============================================================================
+# FIGUR AUFBAUEN
+# ============================================================================
+
+def build_dfg_figure(df_dfg, h_spacing, v_spacing, node_width, node_height, batched=True, webgl=False):
+    """
+    Baut das Prozessfluss-Diagramm (Knoten je Kategorie in Spalten, Kanten mit Frequency-Labels).
+
+    Args:
+        df_dfg: DFG mit FROM_ACTIVITY, TO_ACTIVITY, FREQUENCY
+        h_spacing: Horizontaler Abstand zwischen Kategorien
+        v_spacing: Vertikaler Abstand zwischen Status
+        node_width, node_height: Knotenabmessungen
+        batched: True = alle Kanten, Pfeilspitzen und Hover-Punkte in je einem Trace
+        webgl: True = Kanten, Pfeilspitzen, Frequency-Labels und Hover-Punkte als Scattergl-Traces
+               (impliziert batched); Knoten bleiben Rechtecke in den Kategorienfarben
+
+    Returns:
+        tuple: (go.Figure,
+                {(von, nach): Index des Frequency-Labels},
+                Index des Label-Traces oder None, wenn die Labels Annotationen sind)
+    """
+    batched = batched or webgl
+    scatter = go.Scattergl if webgl else go.Scatter
+
+    # Kantenindex einmal pro DFG aufbauen (Rückkanten, Grade, Nachbarn in O(1))
+    edge_index = EdgeIndex(df_dfg)
+
+    # Knoten sammeln, kategorisieren und innerhalb jeder Kategorie sortieren
+    nodes_by_category = {cat: [] for cat in CATEGORIES}
+    for node in edge_index.nodes:
+        cat = get_category(node)
+        if cat in nodes_by_category:
+            nodes_by_category[cat].append(node)
+    for cat in CATEGORIES:
+        nodes_by_category[cat].sort()
+
+    # Finde maximale Anzahl von Status in einer Kategorie
+    max_statuses = max([len(nodes) for nodes in nodes_by_category.values()]) if any(
+        nodes_by_category.values()) else 1
+
+    # Positionierung der Knoten
+    node_positions = {}
+    for cat_idx, cat in enumerate(CATEGORIES):
+        x = cat_idx * h_spacing
+        nodes_in_cat = nodes_by_category[cat]
+
+        # Zentriere vertikal wenn weniger Status als max
+        y_offset = (max_statuses - len(nodes_in_cat)) * v_spacing / 2
+
+        for node_idx, node in enumerate(nodes_in_cat):
+            y = node_idx * v_spacing + y_offset
+            node_positions[node] = (x, y)
+
+    fig = go.Figure()
+
+    # Bidirektionale Paare (A→B und B→A) würden übereinander liegen -> parallel verschieben
+    bidirectional_edges = edge_index.bidirectional_edges()
+
+    # Kantengeometrie für alle Kanten auf einmal berechnen (dfg_geometry)
+    annotations = []
+    label_positions = {}
+    edges = df_dfg[df_dfg['FROM_ACTIVITY'].isin(node_positions) & df_dfg['TO_ACTIVITY'].isin(node_positions)]
+    from_nodes = edges['FROM_ACTIVITY'].to_numpy()
+    to_nodes = edges['TO_ACTIVITY'].to_numpy()
+    frequencies = edges['FREQUENCY'].to_numpy()
+    from_pos = np.array([node_positions[n] for n in from_nodes], dtype=float).reshape(-1, 2)
+    to_pos = np.array([node_positions[n] for n in to_nodes], dtype=float).reshape(-1, 2)
+
+    is_self_loop = from_nodes == to_nodes
+    is_bidirectional = np.array([(f, t) in bidirectional_edges for f, t in zip(from_nodes, to_nodes)],
+                                dtype=bool)
+
+    # Start- und Endpunkte am Knotenrand inkl. parallelem Offset bidirektionaler Kanten
+    x_from, y_from, x_to, y_to = edge_endpoints(
+        from_pos[:, 0], from_pos[:, 1], to_pos[:, 0], to_pos[:, 1],
+        node_width, node_height, bidirectional=is_bidirectional
+    )
+
+    # SELF-LOOPS: Task folgt auf sich selbst -> runde Schleife links oben
+    loop_indices = np.flatnonzero(is_self_loop)
+    loop_x, loop_y = self_loop_curves(from_pos[loop_indices, 0], from_pos[loop_indices, 1],
+                                      node_width, node_height)
+    loop_rows = {edge: row for row, edge in enumerate(loop_indices)}
+
+    # Prüfe auf Kollisionen mit anderen Knoten -> Kontrollpunkt (NaN = gerade Linie)
+    # Das Gitter wird einmal pro Layout aufgebaut; pro Segment werden nur die
+    # Knoten in den durchquerten Zellen geprüft
+    node_grid = NodeGrid(node_positions, node_width, node_height)
+    ctrl_x = np.full(len(edges), np.nan)
+    ctrl_y = np.full(len(edges), np.nan)
+    for i in np.flatnonzero(~is_self_loop):
+        control_point = curved_control_point(
+            x_from[i], y_from[i], x_to[i], y_to[i],
+            node_grid, exclude=(from_nodes[i], to_nodes[i])
+        )
+        if control_point is not None:
+            ctrl_x[i], ctrl_y[i] = control_point
+
+    # Quadratische Bezier-Kurven aller gebogenen Kanten in einem Schritt
+    curved_indices = np.flatnonzero(~np.isnan(ctrl_x))
+    curve_x, curve_y = quadratic_bezier(
+        x_from[curved_indices], y_from[curved_indices],
+        ctrl_x[curved_indices], ctrl_y[curved_indices],
+        x_to[curved_indices], y_to[curved_indices]
+    )
+    curve_rows = {edge: row for row, edge in enumerate(curved_indices)}
+
+    # Stützpunkte einer Kante und Index des Punkts, an dem der Pfeil ansetzt
+    def edge_points(i):
+        if is_self_loop[i]:
+            return loop_x[loop_rows[i]], loop_y[loop_rows[i]], -6
+        if i in curve_rows:
+            return curve_x[curve_rows[i]], curve_y[curve_rows[i]], -5
+        return np.array([x_from[i], x_to[i]]), np.array([y_from[i], y_to[i]]), 0
+
+    # Im gebündelten Modus werden Linien und Pfeilspitzen gesammelt und als je ein Trace gezeichnet
+    lines_x, lines_y = [], []
+    arrow_x, arrow_y, arrow_size = [], [], []
+    label_x, label_y, label_text = [], [], []
+
+    for i, frequency in enumerate(frequencies):
+        points_x, points_y, arrow_start_idx = edge_points(i)
+        is_curved = len(points_x) > 2
+
+        if batched:
+            lines_x.append(points_x)
+            lines_y.append(points_y)
+            # Pfeilspitze als Marker am Ende, ausgerichtet am vorherigen (unsichtbaren) Punkt
+            arrow_x.extend((points_x[arrow_start_idx], points_x[-1]))
+            arrow_y.extend((points_y[arrow_start_idx], points_y[-1]))
+            arrow_size.extend((0, 11))
+        elif is_curved:
+            # Zeichne nur die Kurve ohne Pfeil (Pfeil kommt als Annotation)
+            fig.add_trace(go.Scatter(
+                x=points_x[:-3],  # Stoppe kurz vor dem Ende
+                y=points_y[:-3],
+                mode='lines',
+                line=dict(
+                    width=1.5,  # Konstante Breite für alle Pfeile
+                    color='rgba(100, 100, 100, 0.8)'
+                ),
+                showlegend=False,
+                hoverinfo='skip'
+            ))
+            annotations.append(_arrow_annotation(
+                points_x[-1], points_y[-1], points_x[arrow_start_idx], points_y[arrow_start_idx]
+            ))
+        else:
+            # Zeichne geraden Pfeil (keine Kollision)
+            # Verwende Arrow-Annotation als komplette Linie (kein separates Scatter)
+            annotations.append(_arrow_annotation(x_to[i], y_to[i], x_from[i], y_from[i]))
+
+        # Frequency-Label in der Mitte der Kurve bzw. Linie
+        if is_curved:
+            mid_idx = len(points_x) // 2
+            mid_x, mid_y = points_x[mid_idx], points_y[mid_idx]
+        else:
+            mid_x, mid_y = (x_from[i] + x_to[i]) / 2, (y_from[i] + y_to[i]) / 2
+        if webgl:
+            label_positions[(from_nodes[i], to_nodes[i])] = len(label_text)
+            label_x.append(mid_x)
+            label_y.append(mid_y)
+            label_text.append(frequency_label_text(frequency))
+        else:
+            label_positions[(from_nodes[i], to_nodes[i])] = len(annotations)
+            annotations.append(_frequency_label(mid_x, mid_y, frequency))
+
+    if batched and lines_x:
+        if webgl:
+            # Scattergl kennt keine am Linienverlauf ausgerichteten Marker -> Pfeilspitzen als kurze Linien
+            barbs_x, barbs_y = arrowhead_barbs(arrow_x[0::2], arrow_y[0::2], arrow_x[1::2], arrow_y[1::2])
+            lines_x.extend(barbs_x)
+            lines_y.extend(barbs_y)
+
+        edge_x, edge_y = join_polylines(lines_x, lines_y)
+        fig.add_trace(scatter(
+            x=edge_x,
+            y=edge_y,
+            mode='lines',
+            line=dict(width=1.5, color='rgba(100, 100, 100, 0.8)'),
+            showlegend=False,
+            hoverinfo='skip'
+        ))
+        if not webgl:
+            fig.add_trace(go.Scatter(
+                x=np.asarray(arrow_x, dtype=np.float32),
+                y=np.asarray(arrow_y, dtype=np.float32),
+                mode='markers',
+                marker=dict(symbol='arrow', angleref='previous', size=np.asarray(arrow_size),
+                            color='rgba(100, 100, 100, 0.8)', line=dict(width=0)),
+                showlegend=False,
+                hoverinfo='skip'
+            ))
+
+    label_trace = None
+    if label_text:
+        # Frequency-Labels als ein Text-Trace statt einer Annotation pro Kante
+        label_trace = len(fig.data)
+        fig.add_trace(scatter(
+            x=np.asarray(label_x, dtype=np.float32),
+            y=np.asarray(label_y, dtype=np.float32),
+            text=label_text,
+            mode='text',
+            textfont=dict(size=10, color='black'),
+            showlegend=False,
+            hoverinfo='skip'
+        ))
+
+    # Zeichne Knoten als Rechtecke (Shapes) mit Text
+    shapes = []
+    hover_points = []
+    for node, (x, y) in node_positions.items():
+        cat = get_category(node)
+        status = get_status(node)
+        color = CATEGORY_COLORS.get(cat, '#999999')
+
+        shapes.append(dict(
+            type='rect',
+            x0=x - node_width / 2,
+            y0=y - node_height / 2,
+            x1=x + node_width / 2,
+            y1=y + node_height / 2,
+            fillcolor=color,
+            line=dict(color='white', width=2),
+            layer='below'
+        ))
+
+        # Kategorie (fett) über Status
+        if status:
+            display_text = f'<b>{cat}</b><br>{status}'
+        else:
+            display_text = f'<b>{cat}</b>'
+
+        annotations.append(dict(
+            x=x,
+            y=y,
+            text=display_text,
+            showarrow=False,
+            font=dict(size=calculate_font_size(display_text, node_width), color='white', family='Arial'),
+            xanchor='center',
+            yanchor='middle'
+        ))
+
+        # Unsichtbarer Scatter-Point für Hover-Info
+        hover_text = (f'<b>{node}</b><br>'
+                      f'Eingänge: {edge_index.in_degree(node)}<br>'
+                      f'Ausgänge: {edge_index.out_degree(node)}')
+        if batched:
+            hover_points.append((x, y, hover_text))
+            continue
+        fig.add_trace(go.Scatter(
+            x=[x],
+            y=[y],
+            mode='markers',
+            marker=dict(size=node_width, color='rgba(0,0,0,0)', symbol='square'),
+            showlegend=False,
+            hovertemplate=f'{hover_text}<extra></extra>'
+        ))
+
+    if hover_points:
+        # Alle Hover-Punkte der Knoten in einem Trace
+        hover_x, hover_y, hover_texts = zip(*hover_points)
+        fig.add_trace(scatter(
+            x=np.asarray(hover_x, dtype=float),
+            y=np.asarray(hover_y, dtype=float),
+            text=list(hover_texts),
+            mode='markers',
+            marker=dict(size=node_width, color='rgba(0,0,0,0)', symbol='square'),
+            showlegend=False,
+            hovertemplate='%{text}<extra></extra>'
+        ))
+
+    fig.update_layout(
+        height=600,
+        showlegend=False,
+        xaxis=dict(
+            showgrid=False,
+            showticklabels=False,
+            zeroline=False,
+            range=[-50, (len(CATEGORIES) - 1) * h_spacing + 50]
+        ),
+        yaxis=dict(
+            showgrid=False,
+            showticklabels=False,
+            zeroline=False,
+            range=[-50, max_statuses * v_spacing + 50]
+        ),
+        margin=dict(l=20, r=20, t=40, b=20),
+        annotations=annotations,
+        shapes=shapes,
+        plot_bgcolor='rgba(240, 240, 245, 0.5)'
+    )
+
+    return fig, label_positions, label_trace
+
+
+# ============================================================================
+# FIGUREN-CACHE
+# ============================================================================
+
+def _digest(row_hashes, *extra):
+    """Reihenfolgeunabhängiger Hash über Zeilen-Hashes plus Zusatzparameter."""
+    digest = hashlib.sha1(np.sort(row_hashes).tobytes())
+    digest.update(repr(extra).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def dfg_keys(df_dfg, *layout_params):
+    """
+    Berechnet die Cache-Schlüssel eines DFG.
+
+    Returns:
+        tuple: (Struktur-Schlüssel: Kanten + Layout-Parameter,
+                Inhalts-Schlüssel: zusätzlich die Frequenzen)
+    """
+    structure = pd.util.hash_pandas_object(df_dfg[['FROM_ACTIVITY', 'TO_ACTIVITY']], index=False).to_numpy()
+    content = pd.util.hash_pandas_object(df_dfg[['FROM_ACTIVITY', 'TO_ACTIVITY', 'FREQUENCY']],
+                                         index=False).to_numpy()
+    return _digest(structure, *layout_params), _digest(content, *layout_params)
+
+
+class _LayoutEntry:
+    def __init__(self, fig, label_positions, label_trace):
+        self.fig = fig
+        self.label_positions = label_positions
+        self.label_trace = label_trace
+
+
+class DfgFigureCache:
+    """
+    Hält fertige DFG-Figuren prozessweit vor, damit Reruns ohne Änderung am Graphen
+    (z.B. Eingaben im KPI-Editor) kein Layout und kein Routing mehr berechnen.
+
+    Ändern sich bei gleichen Kanten nur die Frequenzen, wird das vorhandene Layout
+    wiederverwendet und nur die Frequency-Labels werden ersetzt.
+    """
+
+    def __init__(self, max_entries=DFG_FIGURE_CACHE_SIZE, ttl=DFG_FIGURE_TTL):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        # Schlüssel der Einträge im MemoryResultCache, zuletzt benutzt am Ende
+        self._figures = OrderedDict()
+        self._layouts = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'label_patches': 0, 'builds': 0}
+
+    @staticmethod
+    def _lookup(namespace, store, key):
+        """Eintrag aus dem MemoryResultCache oder None, wenn er fehlt bzw. verdrängt wurde."""
+        value = get_memory_cache().get((namespace, key), count_miss=False, isolate=False)
+        if value is MISSING:
+            store.pop(key, None)
+            return None
+        store.move_to_end(key)
+        return value
+
+    def _remember(self, namespace, store, key, value, size):
+        memory_cache = get_memory_cache()
+        if not memory_cache.put((namespace, key), value, self._ttl, size=size):
+            return
+        store[key] = None
+        store.move_to_end(key)
+        while len(store) > self._max_entries:
+            oldest = (namespace, store.popitem(last=False)[0])
+            memory_cache.discard(lambda k: k == oldest)
+
+    @staticmethod
+    def _patch_labels(layout, df_dfg):
+        """Kopiert die Figur und ersetzt nur die Texte der Frequency-Labels."""
+        # Über das Dict statt update_layout(): das gleicht sonst jede Annotation einzeln ab.
+        # to_dict() kopiert tief - die geteilte Figur des Layout-Eintrags bleibt unverändert
+        figure_dict = layout.fig.to_dict()
+        if layout.label_trace is None:
+            labels = figure_dict['layout']['annotations']
+        else:
+            labels = list(figure_dict['data'][layout.label_trace]['text'])
+        frequencies = zip(df_dfg['FROM_ACTIVITY'].to_numpy(), df_dfg['TO_ACTIVITY'].to_numpy(),
+                          df_dfg['FREQUENCY'].to_numpy())
+        for from_node, to_node, frequency in frequencies:
+            position = layout.label_positions.get((from_node, to_node))
+            if position is None:
+                continue
+            if layout.label_trace is None:
+                labels[position]['text'] = frequency_label_text(frequency)
+            else:
+                labels[position] = frequency_label_text(frequency)
+        if layout.label_trace is not None:
+            figure_dict['data'][layout.label_trace]['text'] = labels
+        return go.Figure(figure_dict)
+
+    @staticmethod
+    def _session_copy(result):
+        """Eigene Kopie der geteilten Figur: Änderungen einer Session erreichen den Cache-Eintrag nicht."""
+        fig, size = result
+        return go.Figure(fig), size
+
+    def get(self, df_dfg, h_spacing, v_spacing, node_width, node_height, batched=True, webgl=False):
+        """
+        Liefert die Figur zum DFG aus dem Cache, aktualisiert nur die Labels oder baut sie neu.
+
+        Returns:
+            tuple: (go.Figure als eigene Kopie des Aufrufers, Größe der Figur als JSON in Bytes)
+        """
+        layout_params = (h_spacing, v_spacing, node_width, node_height, batched, webgl)
+        structure_key, content_key = dfg_keys(df_dfg, *layout_params)
+
+        with self._lock:
+            cached = self._lookup('dfg_figure', self._figures, content_key)
+            if cached is not None:
+                self._stats['hits'] += 1
+                return self._session_copy(cached)
+            layout = self._lookup('dfg_layout', self._layouts, structure_key)
+
+        if layout is not None:
+            fig = self._patch_labels(layout, df_dfg)
+            stat = 'label_patches'
+        else:
+            fig, label_positions, label_trace = build_dfg_figure(
+                df_dfg, h_spacing, v_spacing, node_width, node_height, batched, webgl)
+            layout = _LayoutEntry(fig, label_positions, label_trace)
+            stat = 'builds'
+
+        result = (fig, len(fig.to_json()))
+        with self._lock:
+            self._stats[stat] += 1
+            self._remember('dfg_figure', self._figures, content_key, result, result[1])
+            # Das Layout hält eine Figur gleicher Größe
+            self._remember('dfg_layout', self._layouts, structure_key, layout, result[1])
+        return self._session_copy(result)
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
+            self._layouts.clear()
+        get_memory_cache().discard(lambda key: key[0] in ('dfg_figure', 'dfg_layout'))
+
+    def metrics(self):
+        """Gibt Treffer, Label-Aktualisierungen und Neuaufbauten sowie die Anzahl der Einträge zurück."""
+        with self._lock:
+            stats = dict(self._stats)
+        memory_cache = get_memory_cache()
+        stats['figures'] = memory_cache.count(lambda key: key[0] == 'dfg_figure')
+        stats['layouts'] = memory_cache.count(lambda key: key[0] == 'dfg_layout')
+        return stats
+
+
+_figure_cache = None
+_figure_cache_lock = threading.Lock()
+
+
+def get_dfg_figure_cache():
+    """Gibt den prozessweit geteilten DFG-Figuren-Cache zurück."""
+    global _figure_cache
+    with _figure_cache_lock:
+        if _figure_cache is None:
+            _figure_cache = DfgFigureCache()
+        return _figure_cache
@@ -0,0 +1,393 @@
+import math
+
+import numpy as np
+
+
+# ============================================================================
+# KONFIGURATION
+# ============================================================================
+
+# Stützpunkte pro Bezier-Kurve (Anzahl Punkte = BEZIER_POINTS + 1)
+BEZIER_POINTS = 50
+
+# Seitlicher Abstand paralleler Pfeile bei bidirektionalen Kanten
+BIDIRECTIONAL_OFFSET = 6
+
+# Größe der Self-Loop-Schleife
+SELF_LOOP_SIZE = 30
+
+# Sicherheitsabstand um Knoten bei der Kollisionsprüfung
+COLLISION_MARGIN = 5
+
+# Seitliche Verschiebung des Kontrollpunkts, wenn eine Kante um Knoten herumgeführt wird
+CURVE_OFFSET = 50
+
+# Pfeilspitzen aus Linien (WebGL): Schenkellänge und Öffnungswinkel je Schenkel in Grad
+ARROWHEAD_LENGTH = 8
+ARROWHEAD_ANGLE = 25
+
+
+# ============================================================================
+# KANTENGEOMETRIE (alle Kanten auf einmal)
+# ============================================================================
+
+def edge_intersections(x_center, y_center, x_target, y_target, node_width, node_height):
+    """
+    Berechnet für alle Kanten gleichzeitig den Punkt am Rand des Rechtecks, an dem die Linie
+    vom Zentrum zum Zielpunkt das Rechteck verlässt bzw. eintritt.
+
+    Args:
+        x_center, y_center: Arrays mit den Knotenmittelpunkten
+        x_target, y_target: Arrays mit den Zielpunkten
+        node_width, node_height: Knotenabmessungen
+
+    Returns:
+        tuple: (edge_x, edge_y) als Arrays
+    """
+    x_center = np.asarray(x_center, dtype=np.float64)
+    y_center = np.asarray(y_center, dtype=np.float64)
+    dx = np.asarray(x_target, dtype=np.float64) - x_center
+    dy = np.asarray(y_target, dtype=np.float64) - y_center
+
+    # Kleineres t = erster Schnittpunkt; Achsen ohne Bewegung liefern t = inf
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_x = np.where(dx != 0, (node_width / 2) / np.abs(dx), np.inf)
+        t_y = np.where(dy != 0, (node_height / 2) / np.abs(dy), np.inf)
+    t = np.minimum(t_x, t_y)
+    # Keine Bewegung -> Mittelpunkt
+    t = np.where(np.isinf(t), 0.0, t)
+
+    return x_center + t * dx, y_center + t * dy
+
+
+def perpendicular_offsets(x_from, y_from, x_to, y_to, offset, mask=None):
+    """
+    Verschiebungsvektoren senkrecht zur Verbindung (nach rechts gedreht), z.B. für parallele
+    Pfeile bidirektionaler Kanten. Kanten außerhalb von mask oder mit Länge 0 bleiben unverschoben.
+
+    Returns:
+        tuple: (shift_x, shift_y) als Arrays
+    """
+    dx = np.asarray(x_to, dtype=np.float64) - np.asarray(x_from, dtype=np.float64)
+    dy = np.asarray(y_to, dtype=np.float64) - np.asarray(y_from, dtype=np.float64)
+    length = np.hypot(dx, dy)
+
+    active = length > 0
+    if mask is not None:
+        active &= np.asarray(mask, dtype=bool)
+    safe_length = np.where(active, length, 1.0)
+
+    shift_x = np.where(active, -dy / safe_length * offset, 0.0)
+    shift_y = np.where(active, dx / safe_length * offset, 0.0)
+    return shift_x, shift_y
+
+
+def edge_endpoints(x_from_center, y_from_center, x_to_center, y_to_center, node_width, node_height,
+                   bidirectional=None, offset=BIDIRECTIONAL_OFFSET):
+    """
+    Start- und Endpunkte aller (Nicht-Self-Loop-)Kanten am Knotenrand inklusive
+    paralleler Verschiebung bidirektionaler Kanten.
+
+    Returns:
+        tuple: (x_from, y_from, x_to, y_to) als Arrays
+    """
+    x_from, y_from = edge_intersections(x_from_center, y_from_center, x_to_center, y_to_center,
+                                        node_width, node_height)
+    x_to, y_to = edge_intersections(x_to_center, y_to_center, x_from_center, y_from_center,
+                                    node_width, node_height)
+
+    if bidirectional is not None:
+        shift_x, shift_y = perpendicular_offsets(x_from_center, y_from_center, x_to_center, y_to_center,
+                                                 offset, mask=bidirectional)
+        x_from, y_from = x_from + shift_x, y_from + shift_y
+        x_to, y_to = x_to + shift_x, y_to + shift_y
+
+    return x_from, y_from, x_to, y_to
+
+
+# ============================================================================
+# BEZIER-KURVEN (alle Kurven auf einmal)
+# ============================================================================
+
+def _bezier_parameter(num_points):
+    return np.linspace(0.0, 1.0, num_points + 1)[np.newaxis, :]
+
+
+def quadratic_bezier(x0, y0, cx, cy, x2, y2, num_points=BEZIER_POINTS):
+    """
+    Stützpunkte quadratischer Bezier-Kurven B(t) = (1-t)²P0 + 2(1-t)tP1 + t²P2.
+
+    Returns:
+        tuple: (curve_x, curve_y) mit Form (Anzahl Kurven, num_points + 1)
+    """
+    t = _bezier_parameter(num_points)
+    u = 1 - t
+    a, b, c = u ** 2, 2 * u * t, t ** 2
+
+    def column(values):
+        return np.asarray(values, dtype=np.float64).reshape(-1, 1)
+
+    curve_x = a * column(x0) + b * column(cx) + c * column(x2)
+    curve_y = a * column(y0) + b * column(cy) + c * column(y2)
+    return curve_x, curve_y
+
+
+def cubic_bezier(x0, y0, c1x, c1y, c2x, c2y, x3, y3, num_points=BEZIER_POINTS):
+    """
+    Stützpunkte kubischer Bezier-Kurven B(t) = (1-t)³P0 + 3(1-t)²tP1 + 3(1-t)t²P2 + t³P3.
+
+    Returns:
+        tuple: (curve_x, curve_y) mit Form (Anzahl Kurven, num_points + 1)
+    """
+    t = _bezier_parameter(num_points)
+    u = 1 - t
+    a, b, c, d = u ** 3, 3 * u ** 2 * t, 3 * u * t ** 2, t ** 3
+
+    def column(values):
+        return np.asarray(values, dtype=np.float64).reshape(-1, 1)
+
+    curve_x = a * column(x0) + b * column(c1x) + c * column(c2x) + d * column(x3)
+    curve_y = a * column(y0) + b * column(c1y) + c * column(c2y) + d * column(y3)
+    return curve_x, curve_y
+
+
+def self_loop_curves(x_center, y_center, node_width, node_height, loop_size=SELF_LOOP_SIZE,
+                     num_points=BEZIER_POINTS):
+    """
+    Runde Self-Loop-Schleifen in der linken oberen Ecke aller betroffenen Knoten
+    (in Plotly liegen größere y-Werte oben).
+
+    Returns:
+        tuple: (curve_x, curve_y) mit Form (Anzahl Schleifen, num_points + 1)
+    """
+    x_center = np.asarray(x_center, dtype=np.float64)
+    y_center = np.asarray(y_center, dtype=np.float64)
+
+    # Start links am oberen Rand, Ende oben am linken Rand
+    start_x = x_center - node_width / 2
+    start_y = y_center + node_height / 2 - 5
+    end_x = x_center - node_width / 2 + 5
+    end_y = y_center + node_height / 2
+
+    # Kontrollpunkte weiter weg = rundere Schleife
+    ctrl1_x = start_x - loop_size * 0.8
+    ctrl1_y = start_y + loop_size * 0.4
+    ctrl2_x = end_x - loop_size * 0.4
+    ctrl2_y = end_y + loop_size * 0.8
+
+    return cubic_bezier(start_x, start_y, ctrl1_x, ctrl1_y, ctrl2_x, ctrl2_y, end_x, end_y, num_points)
+
+
+# ============================================================================
+# KOLLISIONSPRÜFUNG MIT RÄUMLICHEM GITTER
+# ============================================================================
+
+def line_intersects_rectangle(x1, y1, x2, y2, rect_x, rect_y, rect_width, rect_height, margin=COLLISION_MARGIN):
+    """
+    Prüft, ob eine Linie von (x1,y1) nach (x2,y2) durch ein Rechteck geht.
+    Rechteck ist definiert durch Mittelpunkt (rect_x, rect_y) und Dimensionen.
+    """
+    # Rechteck leicht erweitern für bessere Erkennung
+    rect_left = rect_x - rect_width / 2 - margin
+    rect_right = rect_x + rect_width / 2 + margin
+    rect_top = rect_y - rect_height / 2 - margin
+    rect_bottom = rect_y + rect_height / 2 + margin
+
+    def point_in_rect(px, py):
+        return rect_left <= px <= rect_right and rect_top <= py <= rect_bottom
+
+    # Liegt ein Endpunkt im Rechteck, ist das eine Kollision - außer es ist der Start- oder Zielknoten selbst
+    if point_in_rect(x1, y1) or point_in_rect(x2, y2):
+        tolerance = rect_width / 2 + 1
+        if abs(x1 - rect_x) < tolerance and abs(y1 - rect_y) < tolerance:
+            return False
+        if abs(x2 - rect_x) < tolerance and abs(y2 - rect_y) < tolerance:
+            return False
+        return True
+
+    # Schnittpunkte der parametrischen Linie P = P1 + t*(P2-P1) mit den vier Kanten
+    dx = x2 - x1
+    dy = y2 - y1
+
+    if dx != 0:
+        for edge_x in (rect_left, rect_right):
+            t = (edge_x - x1) / dx
+            if 0 < t < 1 and rect_top <= y1 + t * dy <= rect_bottom:
+                return True
+
+    if dy != 0:
+        for edge_y in (rect_top, rect_bottom):
+            t = (edge_y - y1) / dy
+            if 0 < t < 1 and rect_left <= x1 + t * dx <= rect_right:
+                return True
+
+    return False
+
+
+class NodeGrid:
+    """
+    Gleichmäßiges Gitter über die Knotenrechtecke, einmal pro Layout aufgebaut.
+
+    Jeder Knoten wird in allen Zellen eingetragen, die sein (um margin erweitertes) Rechteck
+    überdeckt. Eine Segmentabfrage prüft nur die Knoten in den Zellen, die das Segment
+    durchquert, statt alle Knoten des Graphen.
+    """
+
+    def __init__(self, node_positions, node_width, node_height, margin=COLLISION_MARGIN, cell_size=None):
+        self.node_width = node_width
+        self.node_height = node_height
+        self.margin = margin
+        self.cell_size = cell_size or max(node_width, node_height) + 2 * margin
+        self.positions = dict(node_positions)
+        self._cells = {}
+
+        half_w = node_width / 2 + margin
+        half_h = node_height / 2 + margin
+        for node, (x, y) in self.positions.items():
+            for col in range(self._cell(x - half_w), self._cell(x + half_w) + 1):
+                for row in range(self._cell(y - half_h), self._cell(y + half_h) + 1):
+                    self._cells.setdefault((col, row), []).append(node)
+
+    def _cell(self, value):
+        return math.floor(value / self.cell_size)
+
+    def _segment_cells(self, x1, y1, x2, y2):
+        """Alle Zellen, die das Segment berührt (spaltenweise über den y-Bereich je Spalte)."""
+        if x1 > x2:
+            x1, y1, x2, y2 = x2, y2, x1, y1
+        first_col, last_col = self._cell(x1), self._cell(x2)
+        dx = x2 - x1
+        for col in range(first_col, last_col + 1):
+            if dx == 0:
+                y_a, y_b = y1, y2
+            else:
+                # Segmentabschnitt innerhalb der Spalte
+                x_a = max(x1, col * self.cell_size)
+                x_b = min(x2, (col + 1) * self.cell_size)
+                y_a = y1 + (x_a - x1) / dx * (y2 - y1)
+                y_b = y1 + (x_b - x1) / dx * (y2 - y1)
+            for row in range(self._cell(min(y_a, y_b)), self._cell(max(y_a, y_b)) + 1):
+                yield col, row
+
+    def candidates(self, x1, y1, x2, y2):
+        """Knoten in den Zellen, die das Segment durchquert."""
+        found = set()
+        for cell in self._segment_cells(x1, y1, x2, y2):
+            found.update(self._cells.get(cell, ()))
+        return found
+
+    def segment_hits(self, x1, y1, x2, y2, exclude=()):
+        """
+        Knoten, deren Rechteck das Segment schneidet.
+
+        Args:
+            x1, y1, x2, y2: Segment
+            exclude: Knoten, die nicht als Hindernis zählen (z.B. Start- und Zielknoten)
+
+        Returns:
+            set: Namen der geschnittenen Knoten
+        """
+        hits = set()
+        for node in self.candidates(x1, y1, x2, y2):
+            if node in exclude:
+                continue
+            rect_x, rect_y = self.positions[node]
+            if line_intersects_rectangle(x1, y1, x2, y2, rect_x, rect_y,
+                                         self.node_width, self.node_height, self.margin):
+                hits.add(node)
+        return hits
+
+
+def curved_control_point(x1, y1, x2, y2, grid, exclude=(), offset=CURVE_OFFSET):
+    """
+    Berechnet einen Kontrollpunkt für eine quadratische Bezier-Kurve, wenn die direkte
+    Linie durch Knoten geht.
+
+    Args:
+        x1, y1, x2, y2: Start- und Endpunkt der Kante
+        grid: NodeGrid des aktuellen Layouts
+        exclude: Start- und Zielknoten der Kante
+
+    Returns:
+        tuple: (ctrl_x, ctrl_y) oder None, wenn die direkte Linie frei ist
+    """
+    if not grid.segment_hits(x1, y1, x2, y2, exclude):
+        return None
+
+    dx = x2 - x1
+    dy = y2 - y1
+    length = (dx ** 2 + dy ** 2) ** 0.5
+    if length == 0:
+        return None
+
+    # Kontrollpunkt senkrecht zur Linie auf beide Seiten verschieben
+    mid_x = (x1 + x2) / 2
+    mid_y = (y1 + y2) / 2
+    perp_x = -dy / length
+    perp_y = dx / length
+    sides = [(mid_x + offset * perp_x, mid_y + offset * perp_y),
+             (mid_x - offset * perp_x, mid_y - offset * perp_y)]
+
+    # Seite mit weniger geschnittenen Knoten wählen (bei Gleichstand die erste)
+    def collisions(ctrl):
+        ctrl_x, ctrl_y = ctrl
+        return len(grid.segment_hits(x1, y1, ctrl_x, ctrl_y, exclude)
+                   | grid.segment_hits(ctrl_x, ctrl_y, x2, y2, exclude))
+
+    return sides[0] if collisions(sides[0]) <= collisions(sides[1]) else sides[1]
+
+
+# ============================================================================
+# GEBÜNDELTE TRACES
+# ============================================================================
+
+def join_polylines(xs, ys, dtype=np.float32):
+    """
+    Verbindet mehrere Linienzüge zu einem Array-Paar, getrennt durch NaN
+    (Plotly unterbricht die Linie dort), damit alle Kanten in einen Trace passen.
+
+    Args:
+        xs, ys: Listen von Arrays (ein Array pro Linienzug)
+        dtype: Zieltyp; float32 halbiert die übertragene Datenmenge und reicht für Bildschirmkoordinaten
+
+    Returns:
+        tuple: (x, y) als Arrays
+    """
+    if not xs:
+        return np.empty(0, dtype=dtype), np.empty(0, dtype=dtype)
+    gap = np.array([np.nan], dtype=dtype)
+    x = np.concatenate([part for values in xs for part in (np.asarray(values, dtype=dtype), gap)])
+    y = np.concatenate([part for values in ys for part in (np.asarray(values, dtype=dtype), gap)])
+    return x, y
+
+
+def arrowhead_barbs(tail_x, tail_y, head_x, head_y, length=ARROWHEAD_LENGTH, angle=ARROWHEAD_ANGLE):
+    """
+    Pfeilspitzen als zwei kurze Linien ("V") in Datenkoordinaten, für alle Kanten auf einmal.
+    Im Gegensatz zu gedrehten Markern bleibt die Ausrichtung auch in WebGL-Traces korrekt.
+
+    Args:
+        tail_x, tail_y: Punkte, aus deren Richtung der Pfeil kommt
+        head_x, head_y: Pfeilspitzen
+        length: Länge der Schenkel
+        angle: Öffnungswinkel je Schenkel in Grad
+
+    Returns:
+        tuple: (x, y) mit Form (Anzahl Kanten, 3): Schenkel 1, Spitze, Schenkel 2
+    """
+    head_x = np.asarray(head_x, dtype=np.float64)
+    head_y = np.asarray(head_y, dtype=np.float64)
+    dx = head_x - np.asarray(tail_x, dtype=np.float64)
+    dy = head_y - np.asarray(tail_y, dtype=np.float64)
+    norm = np.hypot(dx, dy)
+    norm = np.where(norm > 0, norm, 1.0)
+    ux, uy = dx / norm, dy / norm
+
+    cos_a, sin_a = np.cos(np.radians(angle)), np.sin(np.radians(angle))
+    # Richtungsvektor um +/- angle gedreht, von der Spitze aus nach hinten
+    left_x = head_x - length * (ux * cos_a - uy * sin_a)
+    left_y = head_y - length * (ux * sin_a + uy * cos_a)
+    right_x = head_x - length * (ux * cos_a + uy * sin_a)
+    right_y = head_y - length * (-ux * sin_a + uy * cos_a)
+
+    return np.column_stack([left_x, head_x, right_x]), np.column_stack([left_y, head_y, right_y])
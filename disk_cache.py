@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# ============================================================================
+# KONFIGURATION
+# ============================================================================
+
+# Verzeichnis für die Parquet-Dateien (überlebt Neustarts und Deployments des Streamlit-Servers)
+DISK_CACHE_DIR = os.getenv('RESULT_CACHE_DIR', os.path.join('.cache', 'results'))
+
+# Maximale Gesamtgröße des Verzeichnisses in Bytes, darüber wird nach LRU verdrängt
+DISK_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+
+# Schlüssel der Metadaten im Parquet-Schema
+_META_KEY = b'result_cache'
+
+
+# ============================================================================
+# SCHLÜSSEL
+# ============================================================================
+
+def canonical_params(output, customer_ids, start_date, end_date, material_ids, is_strict_inclusion):
+    """
+    Bringt die Filterparameter in eine eindeutige Form, damit z.B. [3, 1] und [1, 3]
+    oder '5' und 5 denselben Cache-Eintrag treffen.
+
+    Returns:
+        dict: JSON-serialisierbare, sortierte Parameter
+    """
+    return {
+        'output': output,
+        'customer_ids': sorted(str(c) for c in (customer_ids or [])),
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'material_ids': sorted(str(m) for m in (material_ids or [])),
+        'is_strict_inclusion': bool(is_strict_inclusion),
+    }
+
+
+def make_key(params):
+    """Erzeugt aus den kanonischen Parametern einen stabilen Dateinamen."""
+    payload = json.dumps(params, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+# ============================================================================
+# PARQUET-CACHE
+# ============================================================================
+
+class ParquetResultCache:
+    """
+    Persistenter Ergebnis-Cache auf der Festplatte (zweite Stufe nach st.cache_data).
+
+    - Ein Eintrag = eine Parquet-Datei, benannt nach dem Hash der kanonischen Parameter
+    - Erstellungszeit und TTL stehen in den Schema-Metadaten der Datei; den TTL gibt der
+      Aufrufer beim Schreiben vor (derselbe wie für seinen In-Memory-Cache)
+    - Schreiben ist atomar (temporäre Datei + os.replace)
+    - Die Änderungszeit der Datei dient als "zuletzt benutzt" für die LRU-Verdrängung
+    """
+
+    def __init__(self, directory=DISK_CACHE_DIR, max_bytes=DISK_CACHE_MAX_BYTES):
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'writes': 0, 'evictions': 0, 'errors': 0}
+        os.makedirs(self._directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self._directory, f"{key}.parquet")
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    @staticmethod
+    def _remove_quietly(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def get(self, params):
+        """
+        Liest einen Eintrag, sofern vorhanden und nicht abgelaufen.
+
+        Args:
+            params: Kanonische Parameter aus canonical_params()
+
+        Returns:
+            pd.DataFrame oder None
+        """
+        path = self._path(make_key(params))
+        try:
+            metadata = pq.read_schema(path).metadata or {}
+            info = json.loads(metadata.get(_META_KEY, b'{}'))
+            if time.time() - info.get('created_at', 0) > info.get('ttl', 0):
+                self._remove_quietly(path)
+                self._count('expired')
+                self._count('misses')
+                return None
+
+            df = pq.read_table(path).to_pandas()
+            # Zugriff vermerken (LRU)
+            os.utime(path, None)
+        except FileNotFoundError:
+            self._count('misses')
+            return None
+        except (OSError, ValueError, pa.ArrowException):
+            # Defekte Datei -> wie ein Fehltreffer behandeln und entfernen
+            self._remove_quietly(path)
+            self._count('errors')
+            self._count('misses')
+            return None
+
+        self._count('hits')
+        return df
+
+    def put(self, params, df, ttl):
+        """
+        Schreibt einen Eintrag atomar. Fehler beim Schreiben werden ignoriert,
+        da der Cache nur beschleunigen, aber nie die Abfrage verhindern soll.
+
+        Args:
+            params: Kanonische Parameter aus canonical_params()
+            df: Ergebnis der Abfrage
+            ttl: Gültigkeitsdauer in Sekunden
+
+        Returns:
+            bool: True, wenn der Eintrag geschrieben wurde
+        """
+        path = self._path(make_key(params))
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            info = {'created_at': time.time(), 'ttl': ttl, 'params': params}
+            metadata = dict(table.schema.metadata or {})
+            metadata[_META_KEY] = json.dumps(info).encode('utf-8')
+            table = table.replace_schema_metadata(metadata)
+
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, path)
+        except (OSError, ValueError, TypeError, pa.ArrowException):
+            self._remove_quietly(tmp_path)
+            self._count('errors')
+            return False
+
+        self._count('writes')
+        self._evict_if_needed()
+        return True
+
+    def _evict_if_needed(self):
+        """Löscht die am längsten nicht benutzten Dateien, bis das Größenlimit eingehalten ist."""
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self._directory) as it:
+                for entry in it:
+                    if not entry.name.endswith('.parquet'):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        except OSError:
+            return
+
+        if total <= self._max_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            if total <= self._max_bytes:
+                break
+            self._remove_quietly(path)
+            total -= size
+            self._count('evictions')
+
+    def clear(self):
+        """Entfernt alle Einträge."""
+        try:
+            with os.scandir(self._directory) as it:
+                for entry in it:
+                    if entry.name.endswith('.parquet'):
+                        self._remove_quietly(entry.path)
+        except OSError:
+            pass
+
+    def metrics(self):
+        """Gibt Treffer-, Fehltreffer-, Schreib- und Verdrängungszähler zurück."""
+        with self._lock:
+            return dict(self._stats)
+
+
+_disk_cache = None
+_disk_cache_lock = threading.Lock()
+
+
+def get_disk_cache():
+    """Gibt den prozessweit geteilten Parquet-Cache zurück."""
+    global _disk_cache
+    with _disk_cache_lock:
+        if _disk_cache is None:
+            _disk_cache = ParquetResultCache()
+        return _disk_cache
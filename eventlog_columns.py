@@ -0,0 +1,12 @@
+# ============================================================================
+# KONFIGURATION
+# ============================================================================
+
+# Spaltennamen im Eventlog, auf die lokale Auswertungen (Filter, DFG, KPI) zugreifen.
+# Fehlt eine dieser Spalten im Ergebnis, wird die jeweilige Auswertung wieder der Datenbank überlassen.
+# Eigenes Modul ohne pyodbc-Import: Die lokalen Auswertungen und ihre Tests brauchen keinen ODBC-Treiber.
+EVENTLOG_CASE_COLUMN = 'CASE_ID'
+EVENTLOG_ACTIVITY_COLUMN = 'ACTIVITY'
+EVENTLOG_TIMESTAMP_COLUMN = 'Datum'
+EVENTLOG_CUSTOMER_COLUMN = 'CUSTOMER_ID'
+EVENTLOG_MATERIAL_COLUMN = 'ID_MAT'
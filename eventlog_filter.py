@@ -0,0 +1,111 @@
+import pandas as pd
+
+from eventlog_columns import (
+    EVENTLOG_CASE_COLUMN,
+    EVENTLOG_CUSTOMER_COLUMN,
+    EVENTLOG_MATERIAL_COLUMN,
+    EVENTLOG_TIMESTAMP_COLUMN,
+)
+
+
+# ============================================================================
+# FILTERSEMANTIK DES ORCHESTRATORS
+# ============================================================================
+#
+# Lokal abgeleitete Eventlogs (Obermengen-Cache, lokaler Eventlog-Store) müssen dasselbe liefern wie
+# @output = 'eventlog' des Orchestrators. Die Filter wirken in dieser Reihenfolge:
+#
+#   1. Zeitraum: Startdatum 00:00 bis Enddatum 23:59:59 (Enddatum inklusive)
+#   2. Kunde: pro Event
+#   3. Material (nicht strikt, @material_filter_mode = 0): alle nach 1. und 2. verbliebenen Events
+#      der Fälle, die unter diesen Events mindestens eines der Materialien enthalten
+#
+# Die Fallzugehörigkeit beim Materialfilter hängt damit vom angefragten Zeitraum ab. Die strikte
+# Inklusion wird nie lokal nachgebildet, sondern nur bei identischer Anfrage wiederverwendet.
+#
+# KPI und DFG erhalten @end_date ohne Uhrzeit und enden damit am Enddatum 00:00:00 (einschließlich).
+# Lokal aus dem Eventlog berechnete KPI und DFG schneiden es dafür mit restrict_to_aggregate_range zu.
+
+
+def filter_date_range(df, start_date, end_date, column=EVENTLOG_TIMESTAMP_COLUMN):
+    """Schneidet einen Zeitraum (Enddatum inklusive bis 23:59:59) vektorisiert aus dem Eventlog."""
+    if df.empty or column not in df.columns:
+        return df
+    start_ts = pd.Timestamp(start_date)
+    end_ts = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+    mask = (df[column] >= start_ts) & (df[column] < end_ts)
+    return df.loc[mask].reset_index(drop=True)
+
+
+def id_set(ids):
+    """IDs als Menge von Strings, damit 5 und '5' gleich behandelt werden."""
+    return frozenset(str(i) for i in (ids or []))
+
+
+def isin_ids(series, ids):
+    """Vektorisierter isin-Vergleich, der numerische wie auch String-ID-Spalten trifft."""
+    if pd.api.types.is_numeric_dtype(series):
+        numeric_ids = []
+        for value in ids:
+            try:
+                numeric_ids.append(int(value))
+            except (TypeError, ValueError):
+                pass
+        return series.isin(numeric_ids)
+    return series.astype(str).isin(ids)
+
+
+def narrow_eventlog(df, start_date=None, end_date=None, customer_ids=None, material_ids=None):
+    """
+    Schränkt ein Eventlog, das eine Obermenge der Anfrage ist, nach der Filtersemantik des
+    Orchestrators ein (nicht strikt).
+
+    Args:
+        df: Eventlog, das alle Events der Anfrage enthält
+        start_date, end_date: Zeitraum; None = Zeitraum nicht einschränken
+        customer_ids: Kunden; leer = alle Kunden
+        material_ids: Materialien; leer = alle Materialien
+
+    Returns:
+        pd.DataFrame mit neuem Index
+    """
+    if start_date is not None and end_date is not None:
+        df = filter_date_range(df, start_date, end_date)
+
+    customers = id_set(customer_ids)
+    if customers:
+        df = df.loc[isin_ids(df[EVENTLOG_CUSTOMER_COLUMN], customers)]
+
+    materials = id_set(material_ids)
+    if materials:
+        # Fälle behalten, die im verbliebenen Ausschnitt mindestens eines der Materialien enthalten
+        matching = df.loc[isin_ids(df[EVENTLOG_MATERIAL_COLUMN], materials), EVENTLOG_CASE_COLUMN]
+        df = df.loc[df[EVENTLOG_CASE_COLUMN].isin(matching.unique())]
+
+    return df.reset_index(drop=True)
+
+
+def restrict_to_aggregate_range(df, end_date, material_ids=None, is_strict_inclusion=False):
+    """
+    Schneidet ein Eventlog (Enddatum bis 23:59:59) auf den Zeitraum von @output = 'kpi' bzw. 'dfg'
+    zu, die nur bis zum Enddatum 00:00:00 reichen. Mit Materialfilter wird die Fallzugehörigkeit
+    auf dem kürzeren Ausschnitt neu bestimmt.
+
+    Args:
+        df: Eventlog des Orchestrators für dieselben Filter
+        end_date: Enddatum der Anfrage
+        material_ids: Materialien der Anfrage
+        is_strict_inclusion: True für strikte Inklusion der Materialien
+
+    Returns:
+        pd.DataFrame oder None, wenn Events des Endtages bei strikter Inklusion wegfallen
+        (die strikte Fallzugehörigkeit wird lokal nicht nachgebildet -> Datenbank)
+    """
+    if df.empty or EVENTLOG_TIMESTAMP_COLUMN not in df.columns:
+        return df
+    mask = df[EVENTLOG_TIMESTAMP_COLUMN] <= pd.Timestamp(end_date)
+    if mask.all():
+        return df
+    if is_strict_inclusion and id_set(material_ids):
+        return None
+    return narrow_eventlog(df.loc[mask], material_ids=material_ids)
@@ -0,0 +1,63 @@
+import numpy as np
+
+
+# ============================================================================
+# KONFIGURATION
+# ============================================================================
+
+# Auswählbare Seitengrößen der Eventlog-Vorschau; an den Browser geht immer nur eine Seite
+PREVIEW_PAGE_SIZES = [25, 50, 100, 250]
+PREVIEW_DEFAULT_PAGE_SIZE = 50
+
+# Anzeigename für "unsortiert" (Reihenfolge wie vom Orchestrator geliefert)
+PREVIEW_NO_SORT = "(unsortiert)"
+
+
+# ============================================================================
+# SEITENWEISE VORSCHAU
+# ============================================================================
+
+def page_count(row_count, page_size):
+    """Anzahl Seiten (mindestens 1, auch für ein leeres Eventlog)."""
+    return max(1, -(-row_count // page_size))
+
+
+def sort_order(df, sort_column=None, ascending=True):
+    """
+    Zeilenpositionen in Sortierreihenfolge (stabil, fehlende Werte zuletzt).
+    Wird einmal pro Sortierung berechnet, danach ist jede Seite nur noch ein Slice.
+
+    Returns:
+        np.ndarray: Positionen für df.iloc
+    """
+    if sort_column is None or sort_column not in df.columns:
+        return np.arange(len(df))
+
+    values = df[sort_column].reset_index(drop=True)
+    try:
+        ordered = values.sort_values(ascending=ascending, kind='stable', na_position='last')
+    except TypeError:
+        # Gemischte Typen in einer object-Spalte: als Text sortieren
+        ordered = values.astype(str).sort_values(ascending=ascending, kind='stable', na_position='last')
+    return ordered.index.to_numpy()
+
+
+def preview_page(df, order, page, page_size):
+    """
+    Liefert genau eine Seite des Eventlogs.
+
+    Args:
+        df: Eventlog
+        order: Positionen aus sort_order()
+        page: Seitennummer (ab 1, wird auf den gültigen Bereich begrenzt)
+        page_size: Zeilen pro Seite
+
+    Returns:
+        (pd.DataFrame, int, int): Seite, erste und letzte angezeigte Zeile (ab 1)
+    """
+    page = min(max(1, page), page_count(len(df), page_size))
+    start = (page - 1) * page_size
+    stop = min(start + page_size, len(df))
+    if start >= stop:
+        return df.iloc[0:0], 0, 0
+    return df.iloc[order[start:stop]], start + 1, stop
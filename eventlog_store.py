@@ -0,0 +1,361 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from disk_cache import make_key
+from memory_cache import entry_size, get_memory_cache, MISSING
+from eventlog_columns import EVENTLOG_TIMESTAMP_COLUMN
+from eventlog_filter import filter_date_range
+
+
+# ============================================================================
+# KONFIGURATION
+# ============================================================================
+
+# Verzeichnis der lokalen Eventlog-Kopien (eine Parquet-Datei pro Filter-Scope)
+EVENTLOG_STORE_DIR = os.getenv('EVENTLOG_STORE_DIR', os.path.join('.cache', 'eventlog_store'))
+
+# Frühestens nach so vielen Sekunden wird ein Scope erneut mit der Datenbank abgeglichen
+SYNC_MIN_INTERVAL = 60
+
+# Spätestens nach so vielen Sekunden wird ein Scope komplett neu geladen, um auch
+# nachträglich geänderte ältere Events zu übernehmen
+FULL_RESYNC_INTERVAL = 24 * 3600
+
+# Anzahl Scopes, die zusätzlich zur Parquet-Datei im Arbeitsspeicher gehalten werden. Die Kopien liegen
+# im MemoryResultCache und zählen gegen dessen Speicherbudget; verdrängte Scopes werden von der Platte gelesen.
+MAX_SCOPES_IN_MEMORY = 8
+
+# Schlüsselraum der Scopes im MemoryResultCache
+_MEMORY_NAMESPACE = 'eventlog_store'
+
+# Spalte mit dem Eventzeitpunkt (High-Watermark)
+WATERMARK_COLUMN = EVENTLOG_TIMESTAMP_COLUMN
+
+_META_KEY = b'eventlog_store'
+
+# Schlüssel in df.attrs für den Fingerabdruck des geladenen Eventlogs (siehe eventlog_version)
+EVENTLOG_VERSION_ATTR = 'eventlog_version'
+
+# Schlüssel in df.attrs für den Fingerabdruck des Eventlogs, aus dem eine Teilmenge abgeleitet wurde
+EVENTLOG_SOURCE_ATTR = 'eventlog_source_version'
+
+
+# ============================================================================
+# HILFSFUNKTIONEN
+# ============================================================================
+
+def scope_params(customer_ids):
+    """
+    Kanonische Filterparameter OHNE Zeitraum - alle Zeiträume eines Scopes teilen sich eine Kopie.
+    Der Kundenfilter wirkt pro Event und lässt sich deshalb auf jeden Teilzeitraum ausschneiden.
+    """
+    return {'customer_ids': sorted(str(c) for c in (customer_ids or []))}
+
+
+def can_use_store(material_ids):
+    """
+    Mit Materialfilter (strikt oder nicht) entscheidet der Orchestrator anhand der Events im
+    angefragten Zeitraum, welche Fälle dazugehören (siehe eventlog_filter). Ein Ausschnitt aus
+    einem breiteren synchronisierten Zeitraum würde diese Entscheidung über den falschen Zeitraum
+    treffen - und ein Nachladen ab der Watermark Fälle verlieren, die über ältere Events dazugehören.
+    """
+    return not material_ids
+
+
+def _compute_version(df):
+    """Zeilenzahl, Watermark und ein reihenfolgeabhängiger Hash über alle Spalten."""
+    watermark = None
+    if not df.empty and WATERMARK_COLUMN in df.columns:
+        value = df[WATERMARK_COLUMN].max()
+        watermark = None if pd.isna(value) else pd.Timestamp(value).isoformat()
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return len(df), watermark, hashlib.blake2b(row_hashes.tobytes(), digest_size=16).hexdigest()
+
+
+def stamp_eventlog_version(df):
+    """Berechnet den Fingerabdruck einmal beim Laden und legt ihn in df.attrs ab."""
+    df.attrs[EVENTLOG_VERSION_ATTR] = _compute_version(df)
+    return df
+
+
+def eventlog_version(df):
+    """
+    Fingerabdruck eines Eventlogs für Cache-Schlüssel abgeleiteter Ergebnisse (DFG, KPIs, Sortierung).
+    Ändert sich das Eventlog hinter denselben Filterargumenten (TTL, Verdrängung, inkrementeller
+    Abgleich, Obermengen-Ableitung), ändert sich auch der Schlüssel.
+
+    Ein per stamp_eventlog_version() abgelegter Wert wird nur verwendet, wenn die Zeilenzahl passt -
+    Teilmengen erben df.attrs, haben aber weniger Zeilen und werden dann neu berechnet.
+
+    Returns:
+        tuple: (Zeilenzahl, Watermark als ISO-String oder None, Hash)
+    """
+    version = df.attrs.get(EVENTLOG_VERSION_ATTR)
+    if version is not None and version[0] == len(df):
+        return version
+    return _compute_version(df)
+
+
+def eventlog_source_version(df):
+    """
+    Fingerabdruck des geladenen Eventlogs, aus dem df stammt: bei Ableitungen aus dem
+    Obermengen-Cache der des Obermengen-Eventlogs, sonst der eigene (siehe eventlog_version).
+    """
+    source = df.attrs.get(EVENTLOG_SOURCE_ATTR)
+    return source if source is not None else eventlog_version(df)
+
+
+class _ScopeState:
+    """Lokale Kopie eines Scopes inkl. Abdeckung und Watermark."""
+
+    def __init__(self, df, covered_start, covered_end, watermark, last_sync, last_full_sync):
+        self.df = df
+        self.covered_start = covered_start
+        self.covered_end = covered_end
+        self.watermark = watermark
+        self.last_sync = last_sync
+        self.last_full_sync = last_full_sync
+
+    def to_metadata(self):
+        return {
+            'covered_start': self.covered_start.isoformat(),
+            'covered_end': self.covered_end.isoformat(),
+            'watermark': self.watermark.isoformat() if self.watermark is not None else None,
+            'last_sync': self.last_sync,
+            'last_full_sync': self.last_full_sync,
+        }
+
+
+# ============================================================================
+# INKREMENTELLER EVENTLOG-STORE
+# ============================================================================
+
+class IncrementalEventlogStore:
+    """
+    Hält pro Filter-Scope (Kunden, Materialien, Inklusionsmodus) eine lokale, spaltenbasierte
+    Kopie des Eventlogs und merkt sich den zuletzt gesehenen Eventzeitpunkt (Watermark).
+
+    Bei einer Aktualisierung werden nur Events ab dem Tag der Watermark nachgeladen:
+    Der Orchestrator filtert tagesgenau, daher wird dieser Tag lokal ersetzt statt ergänzt,
+    so entstehen keine Duplikate.
+    """
+
+    def __init__(self, directory=EVENTLOG_STORE_DIR):
+        self._directory = directory
+        self._states = OrderedDict()  # Scopes im MemoryResultCache, zuletzt benutzt am Ende
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._memory_lock = threading.Lock()
+        self._stats = {'full_loads': 0, 'incremental_syncs': 0, 'local_hits': 0, 'rows_fetched': 0, 'bypassed': 0}
+        os.makedirs(self._directory, exist_ok=True)
+
+    # --------------------------------------------------------------------
+    # Persistenz
+    # --------------------------------------------------------------------
+
+    def _path(self, key):
+        return os.path.join(self._directory, f"{key}.parquet")
+
+    def _scope_lock(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _load_state(self, key):
+        with self._memory_lock:
+            state = get_memory_cache().get((_MEMORY_NAMESPACE, key), count_miss=False, isolate=False)
+            if state is not MISSING:
+                self._states[key] = None
+                self._states.move_to_end(key)
+                return state
+            self._states.pop(key, None)
+
+        path = self._path(key)
+        try:
+            table = pq.read_table(path)
+            info = json.loads((table.schema.metadata or {}).get(_META_KEY, b'{}'))
+            state = _ScopeState(
+                df=table.to_pandas(),
+                covered_start=date.fromisoformat(info['covered_start']),
+                covered_end=date.fromisoformat(info['covered_end']),
+                watermark=datetime.fromisoformat(info['watermark']) if info.get('watermark') else None,
+                last_sync=info['last_sync'],
+                last_full_sync=info['last_full_sync'],
+            )
+        except (OSError, KeyError, ValueError, pa.ArrowException):
+            return None
+
+        self._remember(key, state)
+        return state
+
+    def _remember(self, key, state):
+        memory_cache = get_memory_cache()
+        with self._memory_lock:
+            if memory_cache.put((_MEMORY_NAMESPACE, key), state, FULL_RESYNC_INTERVAL, size=entry_size(state.df)):
+                self._states[key] = None
+                self._states.move_to_end(key)
+            else:
+                self._states.pop(key, None)
+            evicted = set()
+            while len(self._states) > MAX_SCOPES_IN_MEMORY:
+                evicted.add((_MEMORY_NAMESPACE, self._states.popitem(last=False)[0]))
+        if evicted:
+            memory_cache.discard(lambda k: k in evicted)
+
+    def _save_state(self, key, state):
+        """Schreibt die lokale Kopie atomar; Fehler lassen nur die Persistenz ausfallen."""
+        path = self._path(key)
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            table = pa.Table.from_pandas(state.df, preserve_index=False)
+            metadata = dict(table.schema.metadata or {})
+            metadata[_META_KEY] = json.dumps(state.to_metadata()).encode('utf-8')
+            pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+            os.replace(tmp_path, path)
+        except (OSError, ValueError, TypeError, pa.ArrowException):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    # --------------------------------------------------------------------
+    # Synchronisation
+    # --------------------------------------------------------------------
+
+    @staticmethod
+    def _watermark_of(df):
+        if df.empty or WATERMARK_COLUMN not in df.columns:
+            return None
+        value = df[WATERMARK_COLUMN].max()
+        return None if pd.isna(value) else pd.Timestamp(value).to_pydatetime()
+
+    def _full_load(self, fetch_range, start_date, end_date):
+        df = fetch_range(start_date, end_date)
+        now = time.time()
+        with self._memory_lock:
+            self._stats['full_loads'] += 1
+            self._stats['rows_fetched'] += len(df)
+        return _ScopeState(df, start_date, end_date, self._watermark_of(df), now, now)
+
+    def _incremental_sync(self, state, fetch_range, end_date):
+        """Lädt nur Events ab dem Tag der Watermark und ersetzt diesen Tag lokal."""
+        sync_start = state.watermark.date() if state.watermark is not None else state.covered_start
+        sync_start = max(sync_start, state.covered_start)
+        new_rows = fetch_range(sync_start, end_date)
+
+        keep_mask = state.df[WATERMARK_COLUMN] < pd.Timestamp(sync_start) if not state.df.empty else None
+        kept = state.df.loc[keep_mask] if keep_mask is not None else state.df
+        if new_rows.empty:
+            merged = kept.reset_index(drop=True)
+        elif kept.empty:
+            merged = new_rows.reset_index(drop=True)
+        else:
+            merged = pd.concat([kept, new_rows], ignore_index=True)
+
+        with self._memory_lock:
+            self._stats['incremental_syncs'] += 1
+            self._stats['rows_fetched'] += len(new_rows)
+
+        return _ScopeState(
+            merged, state.covered_start, max(state.covered_end, end_date),
+            self._watermark_of(merged) or state.watermark, time.time(), state.last_full_sync
+        )
+
+    def _extend_backwards(self, state, fetch_range, start_date):
+        """Lädt nur die Lücke vor dem bisher abgedeckten Zeitraum nach."""
+        older_rows = fetch_range(start_date, state.covered_start - timedelta(days=1))
+        if older_rows.empty:
+            merged = state.df
+        elif state.df.empty:
+            merged = older_rows.reset_index(drop=True)
+        else:
+            merged = pd.concat([older_rows, state.df], ignore_index=True)
+
+        with self._memory_lock:
+            self._stats['rows_fetched'] += len(older_rows)
+
+        return _ScopeState(
+            merged, start_date, state.covered_end,
+            state.watermark or self._watermark_of(merged), state.last_sync, state.last_full_sync
+        )
+
+    def get(self, customer_ids, start_date, end_date, material_ids, is_strict_inclusion, fetch_range):
+        """
+        Liefert das Eventlog für den Zeitraum aus der lokalen Kopie und gleicht diese vorher
+        bei Bedarf inkrementell mit der Datenbank ab. Anfragen mit Materialfilter gehen direkt
+        an die Datenbank (siehe can_use_store).
+
+        Args:
+            customer_ids, start_date, end_date, material_ids, is_strict_inclusion: Filter wie im Orchestrator
+            fetch_range: Funktion (start_date, end_date) -> DataFrame, die den Orchestrator abfragt
+
+        Returns:
+            pd.DataFrame: Eventlog im angefragten Zeitraum
+        """
+        if not can_use_store(material_ids):
+            with self._memory_lock:
+                self._stats['bypassed'] += 1
+            return fetch_range(start_date, end_date)
+
+        key = make_key(scope_params(customer_ids))
+        # Die lokale Kopie reicht immer mindestens bis heute, damit neue Events nachgezogen werden können
+        sync_end = max(end_date, date.today())
+
+        with self._scope_lock(key):
+            state = self._load_state(key)
+            now = time.time()
+
+            changed = False
+
+            if (state is None
+                    or now - state.last_full_sync > FULL_RESYNC_INTERVAL
+                    or WATERMARK_COLUMN not in state.df.columns):
+                # Erster Abruf oder fällige Vollaktualisierung -> einmal komplett laden
+                full_start = min(start_date, state.covered_start) if state is not None else start_date
+                state = self._full_load(fetch_range, full_start, sync_end)
+                changed = True
+            else:
+                if start_date < state.covered_start:
+                    # Zeitraum wird nach vorne erweitert -> nur die Lücke nachladen
+                    state = self._extend_backwards(state, fetch_range, start_date)
+                    changed = True
+                if now - state.last_sync > SYNC_MIN_INTERVAL or end_date > state.covered_end:
+                    state = self._incremental_sync(state, fetch_range, sync_end)
+                    changed = True
+
+            if changed:
+                self._remember(key, state)
+                self._save_state(key, state)
+            else:
+                with self._memory_lock:
+                    self._stats['local_hits'] += 1
+
+            return filter_date_range(state.df, start_date, end_date)
+
+    def metrics(self):
+        """Gibt Zähler für Voll-Ladevorgänge, inkrementelle Abgleiche und lokale Treffer zurück."""
+        with self._memory_lock:
+            stats = dict(self._stats)
+        stats['scopes_in_memory'] = get_memory_cache().count(lambda k: k[0] == _MEMORY_NAMESPACE)
+        return stats
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_eventlog_store():
+    """Gibt den prozessweit geteilten Eventlog-Store zurück."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = IncrementalEventlogStore()
+        return _store
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+
+# ============================================================================
+# KONFIGURATION
+# ============================================================================
+
+AMPEL_GREEN = "🟢"
+AMPEL_YELLOW = "🟡"
+AMPEL_RED = "🔴"
+AMPEL_NO_DATA = ""
+
+# Standard-Toleranz für Gelb: IST darf SOLL um diesen Anteil überschreiten
+AMPEL_DEFAULT_TOLERANCE = 0.10
+
+# Abweichende Toleranzen pro KPI (KPI_NAME -> Anteil über SOLL), z.B. {'INVOICE_TO_PAYMENT': 0.25}
+AMPEL_TOLERANCES = {}
+
+
+# ============================================================================
+# AUSWERTUNG
+# ============================================================================
+
+def ampel_tolerances(kpi_names, tolerances=None, default=AMPEL_DEFAULT_TOLERANCE):
+    """
+    Toleranz pro KPI als Array in der Reihenfolge von kpi_names.
+
+    Args:
+        kpi_names: KPI_NAME-Werte
+        tolerances: KPI_NAME -> Toleranz (Standard: AMPEL_TOLERANCES)
+        default: Toleranz für KPIs ohne eigenen Eintrag
+    """
+    tolerances = AMPEL_TOLERANCES if tolerances is None else tolerances
+    return pd.Series(kpi_names).map(tolerances).fillna(default).to_numpy(dtype=np.float64)
+
+
+def evaluate_ampel(ist, soll, tolerance):
+    """
+    Vektorisierte Ampel-Regeln, ohne Python-Aufruf pro Zeile:
+        IST <= SOLL                   -> Grün
+        IST <= SOLL * (1 + Toleranz)  -> Gelb
+        sonst                         -> Rot
+    Fehlende Werte ergeben eine leere Ampel.
+
+    Args:
+        ist, soll, tolerance: Arrays gleicher bzw. broadcast-fähiger Form
+                              (z.B. KPI x Kunde mit SOLL/Toleranz als Spaltenvektor)
+
+    Returns:
+        np.ndarray: Ampelsymbole in der Form von ist
+    """
+    ist = np.asarray(ist, dtype=np.float64)
+    soll = np.asarray(soll, dtype=np.float64)
+    tolerance = np.asarray(tolerance, dtype=np.float64)
+
+    conditions = [
+        np.isnan(ist) | np.isnan(soll),
+        ist <= soll,
+        ist <= soll * (1 + tolerance),
+    ]
+    choices = [AMPEL_NO_DATA, AMPEL_GREEN, AMPEL_YELLOW]
+    return np.select(conditions, choices, default=AMPEL_RED)
+
+
+def ampel_column(df, ist_column, soll_column, kpi_column='KPI_NAME', tolerances=None):
+    """
+    Ampel für einen KPI-Frame (eine Zeile pro KPI).
+
+    Returns:
+        np.ndarray: Ampelsymbol pro Zeile
+    """
+    return evaluate_ampel(
+        df[ist_column].to_numpy(dtype=np.float64),
+        df[soll_column].to_numpy(dtype=np.float64),
+        ampel_tolerances(df[kpi_column], tolerances),
+    )
+
+
+def ampel_matrix(df_ist, sollwerte, tolerances=None):
+    """
+    Ampel für eine KPI x Kunde-Matrix in einem Durchgang.
+
+    Args:
+        df_ist: DataFrame mit KPI_NAME als Index und einer Spalte pro Kunde (IST-Durchschnitte)
+        sollwerte: KPI_NAME -> SOLL
+
+    Returns:
+        pd.DataFrame: Ampelsymbole in der Form von df_ist
+    """
+    kpi_names = df_ist.index.to_series()
+    soll = kpi_names.map(sollwerte).to_numpy(dtype=np.float64)[:, np.newaxis]
+    tolerance = ampel_tolerances(kpi_names, tolerances)[:, np.newaxis]
+    symbols = evaluate_ampel(df_ist.to_numpy(dtype=np.float64), soll, tolerance)
+    return pd.DataFrame(symbols, index=df_ist.index, columns=df_ist.columns)
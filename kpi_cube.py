@@ -0,0 +1,289 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from eventlog_columns import (
+    EVENTLOG_ACTIVITY_COLUMN,
+    EVENTLOG_CASE_COLUMN,
+    EVENTLOG_CUSTOMER_COLUMN,
+    EVENTLOG_MATERIAL_COLUMN,
+    EVENTLOG_TIMESTAMP_COLUMN,
+)
+from eventlog_filter import id_set, isin_ids, narrow_eventlog, restrict_to_aggregate_range
+from kpi_engine import DURATION_COLUMN, assign_steps, case_kpi_durations, kpi_definitions, step_start_times
+from memory_cache import get_memory_cache, MISSING
+
+
+# ============================================================================
+# KONFIGURATION
+# ============================================================================
+
+# Gültigkeitsdauer eines Würfels in Sekunden. Der Schlüssel ist der Fingerabdruck des Basis-Eventlogs,
+# ein Würfel veraltet also nicht - der ttl gibt nur den Speicher nicht mehr genutzter Würfel frei.
+KPI_CUBE_TTL = 600
+
+# Schlüsselraum der Würfel im MemoryResultCache
+_MEMORY_NAMESPACE = 'kpi_cube'
+
+
+# ============================================================================
+# KPI-WÜRFEL
+# ============================================================================
+
+class KpiCube:
+    """
+    Voraggregierte Durchlaufzeit-KPIs eines Basis-Eventlogs (alle Kunden, alle Materialien).
+
+    Ergebnis einer Anfrage ist exakt compute_kpis() auf dem Eventlog, das der Orchestrator für
+    dieselben Filter liefert (eventlog_filter), bis zum Enddatum 00:00 wie @output = 'kpi'.
+
+    - Reguläre Fälle (höchstens ein Event pro Prozessschritt der KPIs, ein Kunde, ein Material)
+      liegen als Summe und Anzahl pro Kunde x Material x KPI x erster Tag x letzter Tag vor.
+      Eine Messung zählt genau dann, wenn Start- und Endevent im Zeitraum liegen; Kunden- und
+      Materialfilter wirken auf alle Events des Falls gleich.
+    - Bei allen anderen Fällen hängt das Ergebnis davon ab, welche Events im Zeitraum liegen.
+      Ihre Events bleiben als Rest-Eventlog erhalten und werden pro Anfrage gefiltert und berechnet.
+
+    Die Zellen sind nach erstem Tag sortiert: Eine Anfrage schneidet sie per Binärsuche zu und
+    summiert die passenden Zellen pro KPI - unabhängig von der Anzahl der Events.
+    """
+
+    def __init__(self, df_base, start_date, end_date, kpi_names):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.kpi_names = tuple(kpi_names)
+        self._definitions = kpi_definitions(self.kpi_names)
+
+        events = df_base.loc[df_base[EVENTLOG_CASE_COLUMN].notna()]
+        regular = self._regular_cases(events)
+        is_regular = events[EVENTLOG_CASE_COLUMN].isin(regular).to_numpy()
+        self._residual = events.loc[~is_regular].reset_index(drop=True)
+        self._build_cells(events.loc[is_regular])
+
+    def _regular_cases(self, events):
+        """Fälle, deren Messungen nur davon abhängen, ob ihr Start- und Endevent im Zeitraum liegen."""
+        steps = assign_steps(events[EVENTLOG_ACTIVITY_COLUMN])
+        used_steps = {step for pair in self._definitions.values() for step in pair}
+        in_kpi = np.isin(steps, list(used_steps))
+
+        per_case = pd.DataFrame({
+            'CASE': events[EVENTLOG_CASE_COLUMN].to_numpy(),
+            'STEP': np.where(in_kpi, steps, ''),
+            'CUSTOMER': events[EVENTLOG_CUSTOMER_COLUMN].to_numpy(),
+            'MATERIAL': events[EVENTLOG_MATERIAL_COLUMN].to_numpy(),
+            'MISSING': (events[EVENTLOG_TIMESTAMP_COLUMN].isna() | events[EVENTLOG_CUSTOMER_COLUMN].isna()
+                        | events[EVENTLOG_MATERIAL_COLUMN].isna()).to_numpy(),
+        })
+        grouped = per_case.groupby('CASE', sort=False)
+        step_events = per_case.loc[in_kpi].groupby('CASE', sort=False)['STEP']
+        repeated_steps = (step_events.size() > step_events.nunique()).reindex(grouped.size().index, fill_value=False)
+        ok = (~repeated_steps & (grouped['CUSTOMER'].nunique() == 1) & (grouped['MATERIAL'].nunique() == 1)
+              & ~grouped['MISSING'].any())
+        return ok.index[ok.to_numpy()]
+
+    def _build_cells(self, events):
+        """Summen und Anzahlen der regulären Fälle pro Kunde x Material x KPI x erster/letzter Tag."""
+        # Kunde und Material als Codes; die Werte behalten ihren Typ für isin_ids() wie beim Filtern
+        extra = (EVENTLOG_CUSTOMER_COLUMN, EVENTLOG_MATERIAL_COLUMN)
+        if events.empty:
+            starts, definitions = events[list(extra)], []
+        else:
+            starts, definitions = step_start_times(events, extra_columns=extra), self._definitions.values()
+        customer_codes, customers = pd.factorize(starts[EVENTLOG_CUSTOMER_COLUMN])
+        material_codes, materials = pd.factorize(starts[EVENTLOG_MATERIAL_COLUMN])
+        self._customer_values = pd.Series(customers)
+        self._material_values = pd.Series(materials)
+
+        parts = []
+        for kpi_index, (start_step, end_step) in enumerate(definitions):
+            start, end = starts[start_step], starts[end_step]
+            valid = (start.notna() & end.notna()).to_numpy()
+            if not valid.any():
+                continue
+            start, end = start.to_numpy()[valid], end.to_numpy()[valid]
+            parts.append(pd.DataFrame({
+                'CUSTOMER': customer_codes[valid],
+                'MATERIAL': material_codes[valid],
+                'KPI': kpi_index,
+                'FIRST': np.minimum(start, end),
+                'LAST': np.maximum(start, end),
+                DURATION_COLUMN: (end - start) / np.timedelta64(1, 'm'),
+            }))
+
+        if parts:
+            measurements = pd.concat(parts, ignore_index=True)
+            last = measurements['LAST']
+            last_day = last.dt.normalize()
+            # Erster Tag, an dem die Anfrage beginnen darf; letzter Tag, an dem sie enden darf
+            # (@end_date 00:00 muss nach dem letzten Event liegen - außer es liegt genau auf Mitternacht)
+            measurements['FIRST_DAY'] = measurements['FIRST'].dt.normalize()
+            measurements['LAST_DAY'] = last_day.where(last == last_day, last_day + pd.Timedelta(days=1))
+            cells = (measurements
+                     .groupby(['CUSTOMER', 'MATERIAL', 'KPI', 'FIRST_DAY', 'LAST_DAY'], sort=False)[DURATION_COLUMN]
+                     .agg(SUM='sum', COUNT='size')
+                     .reset_index()
+                     .sort_values('FIRST_DAY', kind='mergesort'))
+        else:
+            cells = pd.DataFrame({
+                'CUSTOMER': np.array([], dtype=np.int64), 'MATERIAL': np.array([], dtype=np.int64),
+                'KPI': np.array([], dtype=np.int64), 'FIRST_DAY': np.array([], dtype='datetime64[ns]'),
+                'LAST_DAY': np.array([], dtype='datetime64[ns]'), 'SUM': np.array([], dtype=np.float64),
+                'COUNT': np.array([], dtype=np.int64),
+            })
+
+        self._customers = cells['CUSTOMER'].to_numpy(dtype=np.int64)
+        self._materials = cells['MATERIAL'].to_numpy(dtype=np.int64)
+        self._kpis = cells['KPI'].to_numpy(dtype=np.int64)
+        self._first_days = cells['FIRST_DAY'].to_numpy(dtype='datetime64[ns]')
+        self._last_days = cells['LAST_DAY'].to_numpy(dtype='datetime64[ns]')
+        self._sums = cells['SUM'].to_numpy(dtype=np.float64)
+        self._counts = cells['COUNT'].to_numpy(dtype=np.int64)
+
+    @property
+    def cells(self):
+        return len(self._sums)
+
+    @property
+    def residual_events(self):
+        return len(self._residual)
+
+    @property
+    def nbytes(self):
+        """Speicherbedarf für das Budget des MemoryResultCache."""
+        arrays = (self._customers, self._materials, self._kpis, self._first_days, self._last_days,
+                  self._sums, self._counts)
+        values = self._customer_values.memory_usage(deep=True) + self._material_values.memory_usage(deep=True)
+        return int(sum(a.nbytes for a in arrays) + values + self._residual.memory_usage(deep=True).sum())
+
+    def covers(self, customer_ids, start_date, end_date, material_ids, is_strict_inclusion):
+        """Prüft, ob der Würfel die Anfrage beantworten kann (Zeitraum im Basis-Eventlog, nicht strikt)."""
+        if is_strict_inclusion and material_ids:
+            return False
+        return self.start_date <= start_date <= end_date <= self.end_date
+
+    def query(self, customer_ids, start_date, end_date, material_ids):
+        """
+        KPIs für die Filter aus den Zellen und dem Rest-Eventlog.
+
+        Returns:
+            pd.DataFrame: KPI_NAME, AVG_VALUE wie compute_kpis()
+        """
+        start_ts = np.datetime64(pd.Timestamp(start_date), 'ns')
+        end_ts = np.datetime64(pd.Timestamp(end_date), 'ns')
+        customers = id_set(customer_ids)
+        materials = id_set(material_ids)
+
+        first = int(np.searchsorted(self._first_days, start_ts, side='left'))
+        mask = self._last_days[first:] <= end_ts
+        if customers:
+            codes = np.flatnonzero(isin_ids(self._customer_values, customers).to_numpy())
+            mask &= np.isin(self._customers[first:], codes)
+        if materials:
+            codes = np.flatnonzero(isin_ids(self._material_values, materials).to_numpy())
+            mask &= np.isin(self._materials[first:], codes)
+
+        num_kpis = len(self._definitions)
+        kpis = self._kpis[first:][mask]
+        totals = np.bincount(kpis, weights=self._sums[first:][mask], minlength=num_kpis).astype(np.float64)
+        counts = np.bincount(kpis, weights=self._counts[first:][mask], minlength=num_kpis).astype(np.int64)
+
+        if not self._residual.empty:
+            df_residual = narrow_eventlog(self._residual, start_date, end_date, customers, materials)
+            df_residual = restrict_to_aggregate_range(df_residual, end_date, materials)
+            durations = case_kpi_durations(df_residual, self._definitions) if not df_residual.empty else None
+            if durations is not None and not durations.empty:
+                index = durations['KPI_NAME'].map({name: i for i, name in enumerate(self._definitions)})
+                index = index.to_numpy(dtype=np.int64)
+                totals += np.bincount(index, weights=durations[DURATION_COLUMN].to_numpy(), minlength=num_kpis)
+                counts += np.bincount(index, minlength=num_kpis)
+
+        present = counts > 0
+        return pd.DataFrame({
+            'KPI_NAME': [name for name, ok in zip(self._definitions, present) if ok],
+            'AVG_VALUE': totals[present] / counts[present],
+        })
+
+
+def build_kpi_cube(df_base, start_date, end_date, kpi_names):
+    """
+    Baut den Würfel für ein Basis-Eventlog ohne Kunden- und Materialfilter.
+
+    Returns:
+        KpiCube oder None, wenn Spalten fehlen oder sich ein KPI_NAME nicht zuordnen lässt
+    """
+    required = (EVENTLOG_CASE_COLUMN, EVENTLOG_ACTIVITY_COLUMN, EVENTLOG_TIMESTAMP_COLUMN,
+                EVENTLOG_CUSTOMER_COLUMN, EVENTLOG_MATERIAL_COLUMN)
+    if not all(column in df_base.columns for column in required) or not kpi_definitions(kpi_names):
+        return None
+    return KpiCube(df_base, start_date, end_date, kpi_names)
+
+
+# ============================================================================
+# PROZESSWEITE WÜRFEL
+# ============================================================================
+
+class KpiCubeCache:
+    """
+    Würfel pro (Fingerabdruck des Basis-Eventlogs, KPI_NAME-Werte). Die Würfel liegen im
+    MemoryResultCache und zählen gegen dessen Speicherbudget.
+
+    Ein Würfel beantwortet nur Eventlogs, die aus genau diesem Basis-Eventlog abgeleitet wurden
+    (eventlog_store.eventlog_source_version) - wird die Basis neu geladen, entsteht ein neuer Würfel.
+    """
+
+    def __init__(self, ttl=KPI_CUBE_TTL):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'builds': 0}
+
+    def get(self, source_version, kpi_names):
+        """Gibt den Würfel zurück oder None, wenn für diese Basis keiner gebaut wurde."""
+        cube = get_memory_cache().get((_MEMORY_NAMESPACE, source_version, tuple(kpi_names)),
+                                      count_miss=False, isolate=False)
+        with self._lock:
+            self._stats['misses' if cube is MISSING else 'hits'] += 1
+        return None if cube is MISSING else cube
+
+    def build(self, source_version, df_base, start_date, end_date, kpi_names):
+        """
+        Baut den Würfel für ein Basis-Eventlog, sofern er noch nicht vorliegt.
+
+        Returns:
+            KpiCube oder None, wenn er sich nicht bauen lässt
+        """
+        key = (_MEMORY_NAMESPACE, source_version, tuple(kpi_names))
+        memory_cache = get_memory_cache()
+        cube = memory_cache.get(key, count_miss=False, isolate=False)
+        if cube is not MISSING:
+            return cube
+        cube = build_kpi_cube(df_base, start_date, end_date, kpi_names)
+        if cube is None:
+            return None
+        memory_cache.put(key, cube, self._ttl, size=cube.nbytes)
+        with self._lock:
+            self._stats['builds'] += 1
+        return cube
+
+    def clear(self):
+        get_memory_cache().discard(lambda key: key[0] == _MEMORY_NAMESPACE)
+
+    def metrics(self):
+        """Gibt Treffer, Fehltreffer und Aufbauten sowie die Anzahl der Würfel zurück."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['cubes'] = get_memory_cache().count(lambda key: key[0] == _MEMORY_NAMESPACE)
+        return stats
+
+
+_kpi_cube_cache = None
+_kpi_cube_cache_lock = threading.Lock()
+
+
+def get_kpi_cube_cache():
+    """Gibt die prozessweit geteilten KPI-Würfel zurück."""
+    global _kpi_cube_cache
+    with _kpi_cube_cache_lock:
+        if _kpi_cube_cache is None:
+            _kpi_cube_cache = KpiCubeCache()
+        return _kpi_cube_cache
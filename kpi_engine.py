@@ -0,0 +1,267 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from eventlog_columns import EVENTLOG_ACTIVITY_COLUMN, EVENTLOG_CASE_COLUMN, EVENTLOG_TIMESTAMP_COLUMN
+
+
+# ============================================================================
+# KONFIGURATION
+# ============================================================================
+
+# Prozessschritte in Reihenfolge; eine Aktivität gehört zu dem Schritt, mit dem ihr Name beginnt
+PROCESS_STEPS = ['SALESOFFER', 'SALESORDER', 'DELIVERY', 'INVOICE', 'PAYMENT']
+
+# Erlaubte relative Abweichung zwischen lokaler Berechnung und Orchestrator
+KPI_VALIDATION_TOLERANCE = 0.01
+
+# Sekunden, die ein Abgleich mit dem Orchestrator gilt; danach wird die Abfrageform erneut geprüft
+KPI_VALIDATION_TTL = 3600
+
+# Spalte mit der Dauer eines Falls in Minuten (Zwischenergebnis pro Fall)
+DURATION_COLUMN = 'DURATION_MIN'
+
+
+# ============================================================================
+# BERECHNUNG
+# ============================================================================
+
+def kpi_definitions(kpi_names):
+    """
+    Leitet aus den KPI_NAME-Werten des Orchestrators die Durchlaufzeit-Definitionen ab.
+    Ein KPI misst vom ersten Event des zuerst genannten bis zum ersten Event des zuletzt
+    genannten Prozessschritts, z.B. 'SALESORDER_TO_DELIVERY' -> ('SALESORDER', 'DELIVERY').
+
+    Args:
+        kpi_names: KPI_NAME-Werte (z.B. aus @output = 'kpi')
+
+    Returns:
+        dict: KPI_NAME -> (Startschritt, Endschritt) oder None, wenn ein Name nicht
+              genau zwei Prozessschritte nennt (dann bleibt es bei der Datenbank)
+    """
+    definitions = {}
+    for kpi_name in kpi_names:
+        positions = sorted((str(kpi_name).find(step), step) for step in PROCESS_STEPS if step in str(kpi_name))
+        if len(positions) != 2:
+            return None
+        definitions[kpi_name] = (positions[0][1], positions[1][1])
+    return definitions
+
+
+def can_compute_kpis(df_eventlog):
+    """Prüft, ob das Eventlog die für die KPIs nötigen Spalten (Fall, Aktivität, Zeitpunkt) enthält."""
+    required = (EVENTLOG_CASE_COLUMN, EVENTLOG_ACTIVITY_COLUMN, EVENTLOG_TIMESTAMP_COLUMN)
+    return all(column in df_eventlog.columns for column in required)
+
+
+def assign_steps(activities):
+    """
+    Ordnet jeder Aktivität ihren Prozessschritt zu (vektorisiert über startswith, ein Durchlauf pro Schritt).
+
+    Returns:
+        np.ndarray: Prozessschritt pro Event, '' für Aktivitäten ohne Schritt
+    """
+    activities = activities.astype(str)
+    conditions = [activities.str.startswith(step).to_numpy() for step in PROCESS_STEPS]
+    return np.select(conditions, PROCESS_STEPS, default='')
+
+
+def step_start_times(df_eventlog, extra_columns=()):
+    """
+    Ermittelt pro Fall den ersten Zeitpunkt jedes Prozessschritts.
+
+    Args:
+        df_eventlog: Eventlog mit Fall-, Aktivitäts- und Zeitstempelspalte
+        extra_columns: Weitere Spalten, die pro Fall übernommen werden (erster Wert)
+
+    Returns:
+        pd.DataFrame: Index = Fall, eine Spalte pro Prozessschritt (Zeitpunkt oder NaT)
+                      plus die extra_columns
+    """
+    events = df_eventlog[[EVENTLOG_CASE_COLUMN, EVENTLOG_ACTIVITY_COLUMN, EVENTLOG_TIMESTAMP_COLUMN,
+                          *extra_columns]]
+    steps = assign_steps(events[EVENTLOG_ACTIVITY_COLUMN])
+
+    mask = steps != ''
+    by_step = pd.DataFrame({
+        EVENTLOG_CASE_COLUMN: events[EVENTLOG_CASE_COLUMN].to_numpy()[mask],
+        'STEP': steps[mask],
+        EVENTLOG_TIMESTAMP_COLUMN: events[EVENTLOG_TIMESTAMP_COLUMN].to_numpy()[mask],
+    })
+    wide = by_step.groupby([EVENTLOG_CASE_COLUMN, 'STEP'])[EVENTLOG_TIMESTAMP_COLUMN].min().unstack('STEP')
+    # Fehlende Schritte als NaT-Spalten anlegen, damit die Differenzen datetime-typisiert bleiben
+    wide = wide.reindex(columns=PROCESS_STEPS).astype('datetime64[ns]')
+
+    if extra_columns:
+        extras = events.groupby(EVENTLOG_CASE_COLUMN)[list(extra_columns)].first()
+        wide = wide.join(extras, how='left')
+    return wide
+
+
+def case_kpi_durations(df_eventlog, definitions, extra_columns=()):
+    """
+    Berechnet die Durchlaufzeiten aller KPIs pro Fall.
+
+    Args:
+        df_eventlog: Eventlog
+        definitions: KPI_NAME -> (Startschritt, Endschritt), siehe kpi_definitions()
+        extra_columns: Weitere Spalten, die pro Fall übernommen werden (erster Wert)
+
+    Returns:
+        pd.DataFrame: Fall, KPI_NAME, DURATION_MIN, Startzeitpunkt (Datum) und extra_columns;
+                      nur Fälle, in denen Start- und Endschritt vorkommen
+    """
+    wide = step_start_times(df_eventlog, extra_columns)
+
+    parts = []
+    for kpi_name, (start_step, end_step) in definitions.items():
+        duration = (wide[end_step] - wide[start_step]) / np.timedelta64(1, 'm')
+        valid = duration.notna()
+        if not valid.any():
+            continue
+        part = pd.DataFrame({
+            EVENTLOG_CASE_COLUMN: wide.index[valid],
+            'KPI_NAME': kpi_name,
+            DURATION_COLUMN: duration[valid].to_numpy(),
+            EVENTLOG_TIMESTAMP_COLUMN: wide.loc[valid, start_step].to_numpy(),
+        })
+        for column in extra_columns:
+            part[column] = wide.loc[valid, column].to_numpy()
+        parts.append(part)
+
+    if not parts:
+        return pd.DataFrame(columns=[EVENTLOG_CASE_COLUMN, 'KPI_NAME', DURATION_COLUMN, EVENTLOG_TIMESTAMP_COLUMN,
+                                     *extra_columns])
+    return pd.concat(parts, ignore_index=True)
+
+
+def compute_kpis(df_eventlog, kpi_names):
+    """
+    Berechnet die Durchlaufzeit-KPIs lokal aus dem Eventlog.
+
+    Args:
+        df_eventlog: Eventlog
+        kpi_names: KPI_NAME-Werte des Orchestrators (Reihenfolge des Ergebnisses)
+
+    Returns:
+        pd.DataFrame: KPI_NAME, AVG_VALUE (Minuten) wie @output = 'kpi'
+                      oder None, wenn Spalten fehlen oder sich ein KPI_NAME nicht zuordnen lässt
+    """
+    definitions = kpi_definitions(kpi_names)
+    if definitions is None or not can_compute_kpis(df_eventlog):
+        return None
+    if df_eventlog.empty or not definitions:
+        return pd.DataFrame(columns=['KPI_NAME', 'AVG_VALUE'])
+
+    durations = case_kpi_durations(df_eventlog, definitions)
+    averages = durations.groupby('KPI_NAME', sort=False)[DURATION_COLUMN].mean()
+    ordered = [name for name in definitions if name in averages.index]
+    return pd.DataFrame({'KPI_NAME': ordered, 'AVG_VALUE': averages.reindex(ordered).to_numpy()})
+
+
+# ============================================================================
+# ABGLEICH MIT DEM ORCHESTRATOR
+# ============================================================================
+
+def validate_kpis(df_local, df_reference, tolerance=KPI_VALIDATION_TOLERANCE):
+    """
+    Vergleicht lokal berechnete KPIs mit dem Ergebnis des Orchestrators.
+    Ein KPI ohne Wert in der Datenbank (NULL) stimmt überein, wenn er lokal ebenfalls fehlt.
+
+    Returns:
+        tuple: (stimmt_überein: bool, Liste der abweichenden KPI_NAME)
+    """
+    if df_local is None or df_reference is None or df_reference.empty:
+        return False, []
+
+    reference = pd.Series(pd.to_numeric(df_reference['AVG_VALUE'], errors='coerce').to_numpy(),
+                          index=df_reference['KPI_NAME'])
+    local = pd.Series(df_local['AVG_VALUE'].to_numpy(), index=df_local['KPI_NAME'])
+
+    local = local[~local.index.duplicated()].reindex(reference.index)
+    both_missing = reference.isna() & local.isna()
+    within = (local - reference).abs() <= reference.abs() * tolerance + 1e-6
+    mismatches = reference.index[~(both_missing | within).to_numpy()].tolist()
+    return not mismatches, mismatches
+
+
+def query_shape(customer_ids, material_ids, is_strict_inclusion):
+    """
+    Form einer Abfrage für den Abgleich: mit/ohne Kundenfilter, kein/ein/mehrere Materialien
+    und strikte Inklusion. Abweichungen der lokalen Berechnung hängen von der Filterlogik
+    des Orchestrators ab, nicht vom konkreten Kunden oder Zeitraum.
+    """
+    material_count = min(len(material_ids or []), 2)
+    return bool(customer_ids), material_count, bool(is_strict_inclusion) and material_count > 0
+
+
+class KpiValidation:
+    """
+    Ergebnisse des Abgleichs lokale Berechnung vs. Orchestrator pro Abfrageform.
+
+    Jede Form wird einzeln mit einem Datenbank-Ergebnis abgeglichen; das Ergebnis
+    (auch eine Abweichung) gilt für ttl Sekunden, danach wird die Form erneut geprüft.
+    Nach einem erfolgreichen Abgleich liefert validated_names() die KPI_NAME-Werte
+    des Orchestrators, mit denen lokal gerechnet wird.
+    """
+
+    def __init__(self, ttl=KPI_VALIDATION_TTL):
+        self._ttl = ttl
+        self._results = {}  # Form -> (stimmt_überein, KPI_NAME-Werte, Abweichungen, Zeitpunkt)
+        self._lock = threading.Lock()
+
+    def _current(self, shape):
+        result = self._results.get(shape)
+        if result is not None and time.monotonic() - result[3] >= self._ttl:
+            del self._results[shape]
+            result = None
+        return result
+
+    def record(self, shape, df_local, df_reference):
+        """
+        Hält das Ergebnis des Abgleichs für eine Abfrageform fest.
+
+        Returns:
+            bool oder None: Übereinstimmung; None, wenn keine Referenzwerte vorliegen
+                            (dann wird beim nächsten Mal erneut geprüft)
+        """
+        if df_reference is None or df_reference.empty:
+            return None
+        ok, mismatches = validate_kpis(df_local, df_reference)
+        names = tuple(str(name) for name in df_reference['KPI_NAME'])
+        with self._lock:
+            self._results[shape] = (ok, names, mismatches, time.monotonic())
+        return ok
+
+    def status(self, shape):
+        """True/False nach einem Abgleich innerhalb des ttl, None = noch offen."""
+        with self._lock:
+            result = self._current(shape)
+            return None if result is None else result[0]
+
+    def validated_names(self, shape):
+        """KPI_NAME-Werte des Orchestrators, wenn die Form bestätigt ist - sonst None."""
+        with self._lock:
+            result = self._current(shape)
+            return result[1] if result is not None and result[0] else None
+
+    def metrics(self):
+        """Gibt pro Abfrageform Ergebnis und abweichende KPIs zurück."""
+        with self._lock:
+            return {shape: {'ok': ok, 'mismatches': list(mismatches)}
+                    for shape, (ok, _, mismatches, _) in self._results.items()}
+
+
+_kpi_validation = None
+_kpi_validation_lock = threading.Lock()
+
+
+def get_kpi_validation():
+    """Gibt die prozessweit geteilten Abgleichsergebnisse zurück."""
+    global _kpi_validation
+    with _kpi_validation_lock:
+        if _kpi_validation is None:
+            _kpi_validation = KpiValidation()
+        return _kpi_validation
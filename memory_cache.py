@@ -0,0 +1,319 @@
+import functools
+import inspect
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+
+# ============================================================================
+# KONFIGURATION
+# ============================================================================
+
+# Speicherbudget aller Einträge in Bytes (gemessen mit memory_usage(deep=True)), darüber wird nach LRU verdrängt
+MEMORY_CACHE_MAX_BYTES = int(os.getenv('RESULT_MEMORY_CACHE_MAX_BYTES', str(1024 * 1024 * 1024)))
+
+# Standard-Gültigkeitsdauer eines Eintrags in Sekunden
+MEMORY_CACHE_TTL = 600
+
+# Treffer als Copy-on-Write-Sichten statt als tiefe Kopien ausgeben: schaltet Copy-on-Write von pandas
+# prozessweit ein (Standard ab pandas 3.0). Sessions teilen dann die Arrays eines Eintrags, erst ein
+# Schreibzugriff (Spaltenzuweisung, .loc) kopiert die betroffenen Spalten. False = jeder Treffer wird tief kopiert
+MEMORY_CACHE_COPY_ON_WRITE = True
+
+# Rückgabe von get() für fehlende Einträge (None ist ein gültiges, cachebares Ergebnis)
+MISSING = object()
+
+if MEMORY_CACHE_COPY_ON_WRITE:
+    pd.set_option('mode.copy_on_write', True)
+
+
+# ============================================================================
+# GRÖSSENMESSUNG
+# ============================================================================
+
+def entry_size(value):
+    """
+    Speicherbedarf eines Ergebnisses in Bytes.
+    DataFrames werden mit memory_usage(deep=True) gemessen, Container rekursiv.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sum(entry_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(entry_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def _prepare(value):
+    """Macht geteilte Arrays schreibgeschützt, bevor sie im Cache abgelegt werden."""
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _prepare(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            _prepare(v)
+    return value
+
+
+def _isolate(value):
+    """
+    Gibt dem Aufrufer eine eigene Sicht auf den Eintrag zurück: Mit Copy-on-Write eine flache
+    Kopie, die erst beim ersten Schreibzugriff kopiert wird. Ohne Copy-on-Write schreiben auch
+    flache Kopien bei df.loc[...] = ... in die geteilten Arrays - dann wird tief kopiert, damit
+    eine Session den Eintrag der anderen weder über Spaltenzuweisungen noch über .loc verändert.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=pd.get_option('mode.copy_on_write') is not True)
+    if isinstance(value, dict):
+        return {k: _isolate(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return tuple(_isolate(v) for v in value)
+    if isinstance(value, list):
+        return [_isolate(v) for v in value]
+    return value
+
+
+# ============================================================================
+# LRU-CACHE MIT SPEICHERBUDGET
+# ============================================================================
+
+class _Entry:
+    __slots__ = ('value', 'size', 'expires_at')
+
+    def __init__(self, value, size, expires_at):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+
+
+class MemoryResultCache:
+    """
+    Prozessweiter In-Memory-Cache für Abfrageergebnisse mit Speicherbudget.
+
+    - Jeder Eintrag wird beim Ablegen gemessen; übersteigt die Summe max_bytes,
+      werden die am längsten nicht benutzten Einträge verdrängt (LRU)
+    - Einträge laufen nach ihrem ttl ab (wie st.cache_data(ttl=...))
+    - Ein Eintrag, der allein größer als das Budget ist, wird nicht abgelegt
+    - Alle Sessions teilen die Einträge; Aufrufer erhalten Copy-on-Write-Sichten
+      (MEMORY_CACHE_COPY_ON_WRITE), die den Eintrag auch beim Schreiben nicht verändern
+    - Auch die prozessweiten Eventlog- und Figuren-Caches legen ihre Daten hier ab
+      (eigener Schlüsselraum, isolate=False), damit alles unter einem Budget steht
+    """
+
+    def __init__(self, max_bytes=MEMORY_CACHE_MAX_BYTES):
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()  # Schlüssel -> _Entry, zuletzt benutzt am Ende
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0, 'rejected': 0}
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        lock = self._key_locks.get(key)
+        if lock is not None and not lock.locked():
+            del self._key_locks[key]
+
+    def get(self, key, count_miss=True, isolate=True):
+        """
+        Gibt den Eintrag zurück (eigene Sicht, siehe _isolate) oder MISSING, wenn er fehlt oder abgelaufen ist.
+
+        Args:
+            count_miss: False für eine Vorab-Prüfung, deren Fehltreffer noch nicht gezählt wird
+            isolate: False gibt den geteilten Wert selbst zurück - nur für Besitzer, die ihn
+                     nicht verändern (z.B. der Obermengen-Cache, der nur daraus filtert)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.time():
+                self._remove(key)
+                self._stats['expired'] += 1
+                entry = None
+            if entry is None:
+                if count_miss:
+                    self._stats['misses'] += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            value = entry.value
+        return _isolate(value) if isolate else value
+
+    def put(self, key, value, ttl=MEMORY_CACHE_TTL, size=None):
+        """
+        Legt einen Eintrag ab und verdrängt bei Bedarf die ältesten Einträge.
+
+        Args:
+            size: Größe in Bytes für Werte, die entry_size() nicht messen kann (z.B. Figuren)
+
+        Returns:
+            bool: False, wenn der Eintrag größer als das gesamte Budget ist und nicht abgelegt wurde
+        """
+        if size is None:
+            size = entry_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self._max_bytes:
+                self._stats['rejected'] += 1
+                return False
+            self._entries[key] = _Entry(_prepare(value), size, time.time() + ttl)
+            self._bytes += size
+            while self._bytes > self._max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats['evictions'] += 1
+        return True
+
+    def expires_at(self, key):
+        """Ablaufzeitpunkt (time.time()) eines Eintrags oder None, wenn er fehlt."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.expires_at if entry is not None else None
+
+    def key_lock(self, key):
+        """Sperre pro Schlüssel: Gleichzeitige Anfragen berechnen einen Eintrag nur einmal."""
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def release_key_lock(self, key):
+        """Entfernt die Sperre eines Schlüssels, zu dem kein Eintrag abgelegt wurde (abgelehnt oder Fehler)."""
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if key not in self._entries and lock is not None and not lock.locked():
+                del self._key_locks[key]
+
+    def count(self, predicate):
+        """Anzahl der Einträge, deren Schlüssel predicate erfüllen."""
+        with self._lock:
+            return sum(1 for key in self._entries if predicate(key))
+
+    def discard(self, predicate):
+        """Entfernt alle Einträge, deren Schlüssel predicate erfüllen."""
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                self._remove(key)
+
+    def clear(self):
+        self.discard(lambda key: True)
+
+    def metrics(self):
+        """Gibt Treffer, Fehltreffer, Verdrängungen sowie Anzahl und Größe der Einträge zurück."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+            stats['max_bytes'] = self._max_bytes
+            stats['key_locks'] = len(self._key_locks)
+        return stats
+
+
+_memory_cache = None
+_memory_cache_lock = threading.Lock()
+
+
+def get_memory_cache():
+    """Gibt den prozessweit geteilten In-Memory-Ergebnis-Cache zurück."""
+    global _memory_cache
+    with _memory_cache_lock:
+        if _memory_cache is None:
+            _memory_cache = MemoryResultCache()
+        return _memory_cache
+
+
+# ============================================================================
+# DEKORATOR
+# ============================================================================
+
+_tracking = threading.local()
+
+
+@contextmanager
+def track_expiries():
+    """
+    Sammelt im aktuellen Thread die Ablaufzeitpunkte aller Einträge, die im Block über
+    memory_cached-Funktionen gelesen oder abgelegt werden (z.B. für den Cache-Warmer).
+
+        with track_expiries() as expiries:
+            fetch_lov_customers_data()
+        next_run = min(expiries)
+    """
+    previous = getattr(_tracking, 'expiries', None)
+    expiries = []
+    _tracking.expiries = expiries
+    try:
+        yield expiries
+    finally:
+        _tracking.expiries = previous
+
+
+def _record_expiry(cache, key):
+    expiries = getattr(_tracking, 'expiries', None)
+    if expiries is not None:
+        expires_at = cache.expires_at(key)
+        if expires_at is not None:
+            expiries.append(expires_at)
+
+
+def memory_cached(ttl=MEMORY_CACHE_TTL):
+    """
+    Dekorator analog zu @st.cache_data(ttl=...), aber über den budgetierten MemoryResultCache.
+    Wie bei st.cache_data gehen Parameter mit führendem '_' nicht in den Schlüssel ein,
+    Ausnahmen werden nicht gecacht. Die dekorierte Funktion hat clear() (für cache_dependencies).
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        def make_key(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            hashed = tuple((k, v) for k, v in bound.arguments.items() if not k.startswith('_'))
+            return name, pickle.dumps(hashed, protocol=pickle.HIGHEST_PROTOCOL)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = get_memory_cache()
+            key = make_key(args, kwargs)
+            # Fehltreffer zählt erst die Prüfung unter der Sperre (sonst doppelt für wartende Sessions)
+            value = cache.get(key, count_miss=False)
+            if value is not MISSING:
+                _record_expiry(cache, key)
+                return value
+            lock = cache.key_lock(key)
+            stored = False
+            try:
+                with lock:
+                    # Eine andere Session hat den Eintrag inzwischen berechnet
+                    value = cache.get(key)
+                    if value is not MISSING:
+                        _record_expiry(cache, key)
+                        return value
+                    value = func(*args, **kwargs)
+                    stored = cache.put(key, value, ttl)
+            finally:
+                if not stored:
+                    cache.release_key_lock(key)
+            _record_expiry(cache, key)
+            return _isolate(value)
+
+        wrapper.clear = lambda: get_memory_cache().discard(lambda key: key[0] == name)
+        return wrapper
+    return decorator
@@ -0,0 +1,273 @@
+import pandas as pd
+import pyarrow as pa
+import pyodbc
+
+
+# ============================================================================
+# KONFIGURATION
+# ============================================================================
+
+# Ausgaben des Orchestrators, die für die gefilterte Analyse benötigt werden
+FILTERED_OUTPUTS = ('eventlog', 'kpi', 'dfg')
+
+# Anzahl Zeilen pro cursor.fetchmany()-Aufruf beim spaltenweisen Einlesen
+FETCH_BATCH_SIZE = 20000
+
+# Fehler beim Aufbau bzw. Zusammenfügen der Arrow-Blöcke (z.B. int/string-Konflikt zwischen zwei
+# fetchmany()-Blöcken). Sie sind keine pyodbc.Error - das Einlesen wechselt dann auf den pandas-Pfad.
+ARROW_CONVERSION_ERRORS = (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError)
+
+# Deklarierte Spaltentypen pro Orchestrator-Ausgabe.
+# Die Werte werden direkt beim Einlesen in typisierte Arrow-Arrays geschrieben,
+# ein nachträgliches pd.to_datetime / pd.to_numeric entfällt damit.
+# Nicht deklarierte Spalten werden von pyarrow aus den Werten abgeleitet.
+OUTPUT_SCHEMAS = {
+    'eventlog': {
+        'Datum': pa.timestamp('us'),
+        'Umsatz': pa.float64(),
+    },
+    'kpi': {
+        'KPI_NAME': pa.string(),
+        'AVG_VALUE': pa.float64(),
+    },
+    'dfg': {
+        'FROM_ACTIVITY': pa.string(),
+        'TO_ACTIVITY': pa.string(),
+        'FREQUENCY': pa.int64(),
+    },
+}
+
+
+# ============================================================================
+# QUERY-AUFBAU
+# ============================================================================
+
+def build_orchestrator_params(customer_ids, start_date, end_date, material_ids, is_strict_inclusion,
+                              end_of_day=False):
+    """
+    Formatiert die Filterparameter als SQL-Literale für sp_process_analyzer_orchestrator.
+
+    Args:
+        customer_ids: Liste der Kunden-IDs (leer = alle Kunden)
+        start_date: Startdatum (date)
+        end_date: Enddatum (date)
+        material_ids: Liste der Material-IDs (leer = alle Materialien)
+        is_strict_inclusion: True für strikte Inklusion der Materialien
+        end_of_day: True, wenn das Enddatum bis 23:59:59 gelten soll (Eventlog)
+
+    Returns:
+        dict: Parametername -> SQL-Literal
+    """
+    customer_id_param = f"'{','.join(map(str, customer_ids))}'" if customer_ids else "NULL"
+    start_date_param = f"'{start_date.strftime('%Y-%m-%d')}'"
+    if end_of_day:
+        end_date_param = f"'{end_date.strftime('%Y-%m-%d')} 23:59:59'"
+    else:
+        end_date_param = f"'{end_date.strftime('%Y-%m-%d')}'"
+    material_ids_list = [str(p).replace("'", "''") for p in material_ids]
+    material_ids_param = f"'{','.join(material_ids_list)}'" if material_ids_list else "NULL"
+    material_filter_mode_param = 1 if is_strict_inclusion else 0
+
+    return {
+        'customer_id': customer_id_param,
+        'start_date': start_date_param,
+        'end_date': end_date_param,
+        'material_ids': material_ids_param,
+        'material_filter_mode': material_filter_mode_param,
+    }
+
+
+def build_orchestrator_query(output, customer_ids, start_date, end_date, material_ids, is_strict_inclusion):
+    """
+    Baut das EXEC-Statement für eine Ausgabe des Orchestrators.
+    Das Eventlog filtert bis zum Ende des Endtages, KPI und DFG auf das Enddatum selbst
+    (lokal nachgebildet in eventlog_filter.restrict_to_aggregate_range).
+    """
+    params = build_orchestrator_params(
+        customer_ids, start_date, end_date, material_ids, is_strict_inclusion,
+        end_of_day=(output == 'eventlog')
+    )
+
+    return f"""
+    EXEC stored_proc.sp_process_analyzer_orchestrator
+        @output = '{output}',
+        @customer_id = {params['customer_id']},
+        @start_date = {params['start_date']},
+        @end_date = {params['end_date']},
+        @material_ids = {params['material_ids']},
+        @material_filter_mode = {params['material_filter_mode']};
+    """
+
+
+def build_bundle_query(customer_ids, start_date, end_date, material_ids, is_strict_inclusion,
+                       outputs=FILTERED_OUTPUTS):
+    """
+    Baut einen einzigen Batch, der alle gewünschten Ausgaben nacheinander liefert.
+    SET NOCOUNT ON verhindert, dass Zeilenzähler als zusätzliche Ergebnismengen auftauchen.
+    """
+    statements = [
+        build_orchestrator_query(output, customer_ids, start_date, end_date, material_ids, is_strict_inclusion)
+        for output in outputs
+    ]
+    return "SET NOCOUNT ON;\n" + "\n".join(statements)
+
+
+# ============================================================================
+# ERGEBNISSE LESEN
+# ============================================================================
+
+def _to_arrow_array(values, declared_type=None):
+    """
+    Wandelt die Werte einer Spalte in ein Arrow-Array um.
+    Passt der deklarierte Typ nicht direkt (z.B. Decimal oder Datums-Strings),
+    wird erst abgeleitet und dann gecastet; schlägt auch das fehl, bleibt der abgeleitete Typ.
+    """
+    if declared_type is None:
+        return pa.array(values, from_pandas=True)
+
+    try:
+        return pa.array(values, type=declared_type, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        inferred = pa.array(values, from_pandas=True)
+        try:
+            return inferred.cast(declared_type, safe=False)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            return inferred
+
+
+def _rows_to_frame(rows, columns, schema):
+    """
+    pandas-Pfad für Blöcke, die sich nicht als Arrow-Tabelle darstellen lassen:
+    Zeilen direkt in einen DataFrame, deklarierte Datums- und Zahlenspalten werden nachträglich konvertiert.
+    """
+    df = pd.DataFrame.from_records(rows, columns=columns)
+    for name, declared_type in schema.items():
+        if name not in df.columns:
+            continue
+        if pa.types.is_timestamp(declared_type):
+            df[name] = pd.to_datetime(df[name], errors='coerce')
+        elif pa.types.is_floating(declared_type) or pa.types.is_integer(declared_type):
+            df[name] = pd.to_numeric(df[name], errors='coerce')
+    return df
+
+
+def fetch_arrow_frame(cursor, output=None, batch_size=FETCH_BATCH_SIZE):
+    """
+    Liest die aktuelle Ergebnismenge eines Cursors in großen fetchmany()-Blöcken
+    spaltenweise in typisierte Arrow-Arrays und gibt sie als DataFrame zurück.
+
+    Args:
+        cursor: pyodbc-Cursor mit ausgeführter Abfrage
+        output: Name der Orchestrator-Ausgabe für das Schema aus OUTPUT_SCHEMAS
+        batch_size: Zeilen pro fetchmany()-Aufruf
+
+    Returns:
+        pd.DataFrame: Typisierte Spalten (datetime64, float64, int64, ...)
+    """
+    columns = [column[0] for column in cursor.description]
+    schema = OUTPUT_SCHEMAS.get(output, {})
+
+    batches = []
+    frames = None  # pandas-Pfad, sobald ein Block nicht in Arrow passt
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        if frames is not None:
+            frames.append(_rows_to_frame(rows, columns, schema))
+            continue
+        try:
+            # Zeilen -> Spalten transponieren, danach wird jede Spalte einmal typisiert
+            column_values = list(zip(*rows))
+            arrays = [
+                _to_arrow_array(list(values), schema.get(name))
+                for name, values in zip(columns, column_values)
+            ]
+            batches.append(pa.Table.from_arrays(arrays, names=columns))
+        except ARROW_CONVERSION_ERRORS:
+            frames = [batch.to_pandas() for batch in batches] + [_rows_to_frame(rows, columns, schema)]
+            batches = []
+        del rows
+
+    if frames is not None:
+        return pd.concat(frames, ignore_index=True)
+
+    if not batches:
+        empty_arrays = [pa.array([], type=schema.get(name, pa.null())) for name in columns]
+        return pa.Table.from_arrays(empty_arrays, names=columns).to_pandas()
+
+    try:
+        # 'permissive' vereinheitlicht abweichend abgeleitete Typen zwischen den Blöcken (z.B. null/int -> float)
+        table = pa.concat_tables(batches, promote_options='permissive')
+    except ARROW_CONVERSION_ERRORS:
+        # Unvereinbare Typen zwischen den Blöcken (z.B. int und string) -> blockweise über pandas
+        return pd.concat([batch.to_pandas() for batch in batches], ignore_index=True)
+    return table.to_pandas(self_destruct=True, split_blocks=True)
+
+
+def fetch_output(connection, output, sql_query):
+    """
+    Führt eine einzelne Orchestrator-Abfrage aus und liest das Ergebnis über fetch_arrow_frame().
+
+    Returns:
+        pd.DataFrame: Ergebnis der Abfrage (leer, wenn keine Ergebnismenge geliefert wurde)
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql_query)
+        # Zeilenzähler o.ä. ohne Spaltenbeschreibung überspringen
+        while cursor.description is None:
+            if not cursor.nextset():
+                return pd.DataFrame()
+        return fetch_arrow_frame(cursor, output)
+    finally:
+        cursor.close()
+
+
+def read_result_sets(cursor, outputs=()):
+    """
+    Liest alle Ergebnismengen eines ausgeführten Batches über cursor.nextset().
+    Ergebnisse ohne Spaltenbeschreibung (z.B. reine Statusmeldungen) werden übersprungen.
+
+    Args:
+        cursor: pyodbc-Cursor mit ausgeführtem Batch
+        outputs: Namen der Ausgaben in Batch-Reihenfolge (für die Schemata)
+
+    Returns:
+        list: Ein DataFrame pro Ergebnismenge, in Reihenfolge des Batches
+    """
+    frames = []
+    while True:
+        if cursor.description is not None:
+            output = outputs[len(frames)] if len(frames) < len(outputs) else None
+            frames.append(fetch_arrow_frame(cursor, output))
+        if not cursor.nextset():
+            break
+    return frames
+
+
+def fetch_bundle(connection, customer_ids, start_date, end_date, material_ids, is_strict_inclusion,
+                 outputs=FILTERED_OUTPUTS):
+    """
+    Lädt mehrere Orchestrator-Ausgaben in einem einzigen Roundtrip.
+
+    Returns:
+        dict: Ausgabe ('eventlog', 'kpi', 'dfg') -> DataFrame
+
+    Raises:
+        pyodbc.Error: Bei Datenbankfehlern oder wenn die Anzahl der Ergebnismengen nicht passt
+    """
+    sql_query = build_bundle_query(customer_ids, start_date, end_date, material_ids, is_strict_inclusion, outputs)
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql_query)
+        frames = read_result_sets(cursor, outputs)
+    finally:
+        cursor.close()
+
+    if len(frames) != len(outputs):
+        raise pyodbc.Error(
+            f"Erwartet wurden {len(outputs)} Ergebnismengen, geliefert wurden {len(frames)}.")
+
+    return dict(zip(outputs, frames))
@@ -0,0 +1,71 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+
+# ============================================================================
+# KONFIGURATION
+# ============================================================================
+
+# Maximale Anzahl paralleler Ladevorgänge im gesamten Prozess (über alle Sessions).
+# Sollte nicht größer als POOL_MAX_SIZE aus db_pool.py sein, damit jeder Worker
+# eine eigene Verbindung bekommt, ohne auf den Pool warten zu müssen.
+LOAD_WORKERS = 6
+
+# Das Modul wird von Streamlit nur einmal importiert - der Executor überlebt daher Reruns
+_executor = ThreadPoolExecutor(max_workers=LOAD_WORKERS, thread_name_prefix='dataset-loader')
+
+
+# ============================================================================
+# PARALLELES LADEN
+# ============================================================================
+
+def _run_with_context(ctx, func, args, kwargs):
+    """
+    Führt func im Worker-Thread mit dem ScriptRunContext der aufrufenden Session aus,
+    damit st.cache_data und st.secrets dort wie im Haupt-Thread funktionieren.
+    Danach erhält der Pool-Thread seinen vorherigen Kontext zurück - sonst hinge die Session
+    bis zum nächsten Auftrag an einem Thread, der längst für andere Sessions arbeitet.
+    """
+    if ctx is None:
+        return func(*args, **kwargs)
+    thread = threading.current_thread()
+    previous = get_script_run_ctx(suppress_warning=True)
+    add_script_run_ctx(thread, ctx)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        add_script_run_ctx(thread, previous)
+
+
+def submit_datasets(tasks):
+    """
+    Startet mehrere Ladevorgänge gleichzeitig auf dem geteilten Thread-Pool.
+
+    Args:
+        tasks: Dictionary {name: (funktion, args, kwargs)}
+
+    Returns:
+        dict: {name: Future} - das Ergebnis wird mit resolve_dataset() abgeholt
+    """
+    ctx = get_script_run_ctx()
+    return {
+        name: _executor.submit(_run_with_context, ctx, func, args, kwargs)
+        for name, (func, args, kwargs) in tasks.items()
+    }
+
+
+def resolve_dataset(future):
+    """
+    Wartet auf einen einzelnen Ladevorgang.
+    Fehler werden nicht geworfen, sondern zurückgegeben, damit jeder Datensatz
+    für sich gemeldet werden kann und die übrigen weiter angezeigt werden.
+
+    Returns:
+        tuple: (ergebnis oder None, exception oder None)
+    """
+    try:
+        return future.result(), None
+    except Exception as ex:
+        return None, ex
@@ -0,0 +1,191 @@
+import threading
+import time
+
+import pandas as pd
+import pyodbc
+
+
+# ============================================================================
+# KONFIGURATION
+# ============================================================================
+
+# Stored Procedure zum Setzen eines Sollwerts: KPI_NAME, Wert (Minuten), Benutzer
+SET_TARGET_TIME_SQL = "EXEC stored_proc.sp_set_process_target_time ?, ?, ?"
+
+# Sollwerte laden und Versionsprobe: ändert sich Anzahl oder letzter Änderungszeitpunkt,
+# wird die Tabelle neu geladen (UPDATE und Stored Procedure setzen EVENT_TIME)
+LOAD_TARGET_TIMES_SQL = "SELECT ATTRIBUTE_NAME, TARGET_VALUE FROM dbo.T_PROCESS_TO_BE_TIME"
+TARGET_TIMES_VERSION_SQL = "SELECT COUNT(*), MAX(EVENT_TIME) FROM dbo.T_PROCESS_TO_BE_TIME"
+
+# Sekunden, in denen die geladenen Sollwerte ohne Datenbankzugriff gelten; danach genügt die Versionsprobe
+SOLLWERT_PROBE_INTERVAL = 30
+
+# Änderungen unterhalb dieser Schwelle gelten als Fließkomma-Rauschen und werden nicht gespeichert
+SOLL_CHANGE_TOLERANCE = 0.001
+
+
+# ============================================================================
+# ÄNDERUNGEN ERKENNEN UND SPEICHERN
+# ============================================================================
+
+def changed_sollwerte(df_original, df_edited, tolerance=SOLL_CHANGE_TOLERANCE):
+    """
+    Ermittelt vektorisiert die geänderten Sollwerte (ein Join über KPI_NAME statt Suche pro Zeile).
+
+    Args:
+        df_original: KPI_NAME, SOLL vor der Bearbeitung
+        df_edited: KPI_NAME, SOLL aus dem Editor
+
+    Returns:
+        pd.DataFrame: KPI_NAME, SOLL der geänderten Zeilen
+    """
+    original = df_original[['KPI_NAME', 'SOLL']].drop_duplicates('KPI_NAME')
+    merged = df_edited[['KPI_NAME', 'SOLL']].merge(original, on='KPI_NAME', how='inner',
+                                                   suffixes=('', '_ORIGINAL'))
+
+    new_values = pd.to_numeric(merged['SOLL'], errors='coerce')
+    old_values = pd.to_numeric(merged['SOLL_ORIGINAL'], errors='coerce')
+    # Geleerte Zellen (NaN) werden nicht gespeichert
+    changed = (new_values - old_values).abs() > tolerance
+
+    return pd.DataFrame({
+        'KPI_NAME': merged.loc[changed, 'KPI_NAME'].to_numpy(),
+        'SOLL': new_values[changed].to_numpy(dtype=float),
+    })
+
+
+def save_sollwerte(connection, df_changes, username):
+    """
+    Speichert alle geänderten Sollwerte in einer Transaktion auf einer Verbindung.
+    Schlägt ein Wert fehl, wird die gesamte Transaktion zurückgerollt - es bleiben
+    keine halb gespeicherten Sollwerte zurück.
+
+    Args:
+        connection: pyodbc-Verbindung (autocommit aus)
+        df_changes: KPI_NAME, SOLL (z.B. aus changed_sollwerte())
+        username: Benutzer für die Protokollierung in der Stored Procedure
+
+    Returns:
+        int: Anzahl gespeicherter Sollwerte
+    """
+    rows = [(kpi_name, float(value), username)
+            for kpi_name, value in zip(df_changes['KPI_NAME'], df_changes['SOLL'])]
+    if not rows:
+        return 0
+
+    cursor = connection.cursor()
+    try:
+        # Parameter-Arrays: alle Aufrufe in einem Roundtrip statt einem pro Zeile
+        cursor.fast_executemany = True
+        cursor.executemany(SET_TARGET_TIME_SQL, rows)
+        connection.commit()
+    except pyodbc.Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    return len(rows)
+
+
+# ============================================================================
+# VERSIONIERTER SOLLWERT-CACHE
+# ============================================================================
+
+class SollwertCache:
+    """
+    Sessionübergreifender Cache für T_PROCESS_TO_BE_TIME.
+
+    Innerhalb von SOLLWERT_PROBE_INTERVAL wird ohne Datenbankzugriff geantwortet.
+    Danach prüft eine Versionsprobe (COUNT, MAX(EVENT_TIME)), ob sich die Tabelle
+    geändert hat; nur dann wird sie neu geladen. Eigene Schreibzugriffe rufen
+    clear() auf (über cache_dependencies), damit sie sofort sichtbar sind.
+
+    Probe und Neuladen laufen ohne Sperre; unter der Sperre werden nur die Werte
+    getauscht. Solange eine Session prüft, antworten die anderen mit den bisherigen
+    Werten. Ein Ergebnis, das vor einem clear() angefragt wurde, wird nicht übernommen.
+    """
+
+    def __init__(self, probe_interval=SOLLWERT_PROBE_INTERVAL):
+        self._probe_interval = probe_interval
+        self._values = None
+        self._version = None
+        self._checked_at = 0.0
+        # Wird von clear() erhöht: Proben, die davor gestartet sind, überschreiben nichts mehr
+        self._generation = 0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'probes': 0, 'loads': 0, 'discarded': 0}
+
+    def get(self, connect):
+        """
+        Gibt die Sollwerte als Dictionary {ATTRIBUTE_NAME: TARGET_VALUE} zurück.
+
+        Args:
+            connect: Funktion ohne Argumente, die einen Verbindungs-Kontextmanager liefert
+                     (z.B. lambda: get_pool(connection_string).connection()); wird nur
+                     aufgerufen, wenn eine Probe oder ein Neuladen nötig ist
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._values is not None and (self._refreshing
+                                             or now - self._checked_at < self._probe_interval):
+                self._stats['hits'] += 1
+                return dict(self._values)
+            generation, values, known_version = self._generation, self._values, self._version
+            self._refreshing = values is not None
+
+        loaded = False
+        try:
+            with connect() as connection:
+                cursor = connection.cursor()
+                try:
+                    version = tuple(cursor.execute(TARGET_TIMES_VERSION_SQL).fetchone())
+                finally:
+                    cursor.close()
+
+                if values is None or version != known_version:
+                    df = pd.read_sql(LOAD_TARGET_TIMES_SQL, connection)
+                    values = dict(zip(df["ATTRIBUTE_NAME"], df["TARGET_VALUE"]))
+                    loaded = True
+        finally:
+            with self._lock:
+                if generation == self._generation:
+                    self._refreshing = False
+
+        with self._lock:
+            self._stats['probes'] += 1
+            self._stats['loads'] += loaded
+            if generation == self._generation:
+                self._values = values
+                self._version = version
+                self._checked_at = time.monotonic()
+            else:
+                self._stats['discarded'] += 1
+        return dict(values)
+
+    def clear(self):
+        with self._lock:
+            self._values = None
+            self._version = None
+            self._checked_at = 0.0
+            self._generation += 1
+            self._refreshing = False
+
+    def metrics(self):
+        """Gibt Treffer, Versionsproben, Ladevorgänge und verworfene Ergebnisse zurück."""
+        with self._lock:
+            return dict(self._stats)
+
+
+_sollwert_cache = None
+_sollwert_cache_lock = threading.Lock()
+
+
+def get_sollwert_cache():
+    """Gibt den prozessweit geteilten Sollwert-Cache zurück."""
+    global _sollwert_cache
+    with _sollwert_cache_lock:
+        if _sollwert_cache is None:
+            _sollwert_cache = SollwertCache()
+        return _sollwert_cache
@@ -0,0 +1,220 @@
+import itertools
+import threading
+import time
+
+from memory_cache import get_memory_cache, MISSING
+from eventlog_columns import (
+    EVENTLOG_CASE_COLUMN,
+    EVENTLOG_CUSTOMER_COLUMN,
+    EVENTLOG_MATERIAL_COLUMN,
+    EVENTLOG_TIMESTAMP_COLUMN,
+)
+from eventlog_filter import id_set, narrow_eventlog
+from eventlog_store import EVENTLOG_SOURCE_ATTR, eventlog_version
+
+
+# ============================================================================
+# KONFIGURATION
+# ============================================================================
+
+# Anzahl geladener Eventlogs, die als mögliche Obermenge vorgehalten werden. Die Eventlogs selbst
+# liegen im MemoryResultCache und zählen gegen dessen Speicherbudget; verdrängte Einträge entfallen hier.
+SUPERSET_MAX_ENTRIES = 8
+
+# Gültigkeitsdauer eines Eintrags in Sekunden (entspricht dem ttl der In-Memory-Caches)
+SUPERSET_TTL = 600
+
+# Materialfilter (nicht strikt) lokal nachbilden: Es bleiben alle Fälle, die im angefragten Ausschnitt
+# mindestens eines der gewählten Materialien enthalten - wie @material_filter_mode = 0 im Orchestrator
+# (siehe eventlog_filter). Die strikte Inklusion wird nie lokal abgeleitet, sondern nur bei identischer
+# Anfrage wiederverwendet.
+LOCAL_MATERIAL_NARROWING = True
+
+# Schlüsselraum der Eventlogs im MemoryResultCache
+_MEMORY_NAMESPACE = 'subset_cache'
+
+
+# ============================================================================
+# HILFSFUNKTIONEN
+# ============================================================================
+
+class _Request:
+    """Kanonische Form einer Eventlog-Anfrage."""
+
+    def __init__(self, customer_ids, start_date, end_date, material_ids, is_strict_inclusion):
+        self.customers = id_set(customer_ids)
+        self.start_date = start_date
+        self.end_date = end_date
+        self.materials = id_set(material_ids)
+        self.is_strict_inclusion = bool(is_strict_inclusion) and bool(self.materials)
+
+
+class _Entry:
+    """Filter, Spalten und Zeilenzahl eines Eventlogs; die Daten liegen unter key im MemoryResultCache."""
+
+    def __init__(self, request, key, df):
+        self.request = request
+        self.key = key
+        self.columns = df.columns
+        self.rows = len(df)
+        self.created_at = time.time()
+
+
+# ============================================================================
+# OBERMENGEN-CACHE
+# ============================================================================
+
+class SupersetEventlogCache:
+    """
+    Merkt sich bereits geladene Eventlogs samt Filter und beantwortet engere Anfragen
+    (kürzerer Zeitraum, einzelner Kunde statt alle, zusätzliches Produkt) lokal durch
+    vektorisiertes Filtern. Nur Anfragen, die den Datenbestand tatsächlich erweitern,
+    müssen noch an die Datenbank.
+    """
+
+    def __init__(self, max_entries=SUPERSET_MAX_ENTRIES, ttl=SUPERSET_TTL):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._entries = []
+        self._lock = threading.Lock()
+        self._keys = itertools.count()
+        self._stats = {'hits': 0, 'misses': 0, 'evicted': 0}
+
+    @staticmethod
+    def _same_request(cached, request):
+        return ((cached.customers, cached.start_date, cached.end_date, cached.materials, cached.is_strict_inclusion)
+                == (request.customers, request.start_date, request.end_date, request.materials,
+                    request.is_strict_inclusion))
+
+    @classmethod
+    def _covers(cls, cached, request, columns):
+        """Prüft, ob der gecachte Eintrag eine Obermenge der Anfrage ist und lokal eingeschränkt werden kann."""
+        if cls._same_request(cached, request):
+            return True
+        # Strikte Inklusion nur bei identischer Anfrage
+        if cached.is_strict_inclusion or request.is_strict_inclusion:
+            return False
+
+        # Zeitraum
+        if request.start_date < cached.start_date or request.end_date > cached.end_date:
+            return False
+        if ((request.start_date, request.end_date) != (cached.start_date, cached.end_date)
+                and EVENTLOG_TIMESTAMP_COLUMN not in columns):
+            return False
+
+        # Kunden: leer = alle Kunden
+        if request.customers != cached.customers:
+            if cached.customers and (not request.customers or not request.customers <= cached.customers):
+                return False
+            if EVENTLOG_CUSTOMER_COLUMN not in columns:
+                return False
+
+        # Materialien: identischer Filter oder Einschränkung aus "alle Materialien". Die Fallzugehörigkeit
+        # hängt vom Ausschnitt ab und wird deshalb auch bei identischem Filter neu bestimmt.
+        if request.materials:
+            if request.materials != cached.materials and (not LOCAL_MATERIAL_NARROWING or cached.materials):
+                return False
+            if EVENTLOG_MATERIAL_COLUMN not in columns or EVENTLOG_CASE_COLUMN not in columns:
+                return False
+        elif cached.materials:
+            return False
+
+        return True
+
+    @classmethod
+    def _derive(cls, cached, request, df):
+        """Schränkt den gecachten Eventlog vektorisiert auf die Anfrage ein."""
+        if cls._same_request(cached, request):
+            return df.reset_index(drop=True)
+
+        same_range = (request.start_date, request.end_date) == (cached.start_date, cached.end_date)
+        return narrow_eventlog(
+            df,
+            start_date=None if same_range else request.start_date,
+            end_date=None if same_range else request.end_date,
+            customer_ids=None if request.customers == cached.customers else request.customers,
+            material_ids=request.materials,
+        )
+
+    def lookup(self, customer_ids, start_date, end_date, material_ids, is_strict_inclusion):
+        """
+        Sucht einen gecachten Eventlog, aus dem sich die Anfrage lokal ableiten lässt.
+
+        Returns:
+            pd.DataFrame oder None, wenn die Anfrage an die Datenbank muss
+        """
+        request = _Request(customer_ids, start_date, end_date, material_ids, is_strict_inclusion)
+        now = time.time()
+
+        memory_cache = get_memory_cache()
+        with self._lock:
+            self._entries = [e for e in self._entries if now - e.created_at <= self._ttl]
+            # Bevorzugt den kleinsten passenden Eintrag -> am wenigsten zu filtern
+            candidates = sorted(
+                (e for e in self._entries if self._covers(e.request, request, e.columns)),
+                key=lambda e: e.rows
+            )
+            entry, df = None, None
+            for candidate in candidates:
+                # Nur lesen: _derive() filtert in neue DataFrames, der geteilte Eintrag bleibt unverändert
+                df = memory_cache.get(candidate.key, count_miss=False, isolate=False)
+                if df is not MISSING:
+                    entry = candidate
+                    break
+                # Vom Speicherbudget verdrängt
+                self._entries.remove(candidate)
+                self._stats['evicted'] += 1
+            self._stats['hits' if entry is not None else 'misses'] += 1
+
+        if entry is None:
+            return None
+        derived = self._derive(entry.request, request, df)
+        # Herkunft für Auswertungen, die vom Obermengen-Eventlog vorberechnet sind (kpi_cube)
+        derived.attrs[EVENTLOG_SOURCE_ATTR] = eventlog_version(df)
+        return derived
+
+    def add(self, customer_ids, start_date, end_date, material_ids, is_strict_inclusion, df):
+        """Registriert ein frisch geladenes Eventlog als mögliche Obermenge späterer Anfragen."""
+        if df is None or df.empty:
+            return
+        request = _Request(customer_ids, start_date, end_date, material_ids, is_strict_inclusion)
+        memory_cache = get_memory_cache()
+        with self._lock:
+            key = (_MEMORY_NAMESPACE, next(self._keys))
+            if not memory_cache.put(key, df, self._ttl):
+                return
+            # Einträge entfernen, die vom neuen Eintrag vollständig abgedeckt werden
+            dropped = [e for e in self._entries if self._covers(request, e.request, df.columns)]
+            self._entries = [e for e in self._entries if e not in dropped]
+            self._entries.append(_Entry(request, key, df))
+            if len(self._entries) > self._max_entries:
+                dropped.extend(self._entries[:-self._max_entries])
+                self._entries = self._entries[-self._max_entries:]
+            dropped_keys = {e.key for e in dropped}
+        if dropped_keys:
+            memory_cache.discard(lambda k: k in dropped_keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries = []
+        get_memory_cache().discard(lambda key: key[0] == _MEMORY_NAMESPACE)
+
+    def metrics(self):
+        """Gibt Treffer- und Fehltrefferzähler sowie die Anzahl der Einträge zurück."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        return stats
+
+
+_superset_cache = None
+_superset_cache_lock = threading.Lock()
+
+
+def get_superset_cache():
+    """Gibt den prozessweit geteilten Obermengen-Cache zurück."""
+    global _superset_cache
+    with _superset_cache_lock:
+        if _superset_cache is None:
+            _superset_cache = SupersetEventlogCache()
+        return _superset_cache
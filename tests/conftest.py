@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pandas as pd
+
+# Die Module liegen flach im Projektverzeichnis
+sys.path.insert(0, os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+
+def reference_query(events, customer_ids, start_date, end_date, material_ids):
+    """
+    Nachbildung von @output = 'eventlog' des Orchestrators (nicht strikt), bewusst ohne den
+    Code der Caches: Zeitraum (Enddatum bis 23:59:59) -> Kunde pro Event -> Fälle, die im
+    verbleibenden Ausschnitt mindestens eines der Materialien enthalten.
+    """
+    end = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+    rows = [row for row in events.to_dict('records') if pd.Timestamp(start_date) <= row['Datum'] < end]
+    if customer_ids:
+        rows = [row for row in rows if str(row['CUSTOMER_ID']) in {str(c) for c in customer_ids}]
+    if material_ids:
+        cases = {row['CASE_ID'] for row in rows if str(row['ID_MAT']) in {str(m) for m in material_ids}}
+        rows = [row for row in rows if row['CASE_ID'] in cases]
+    return pd.DataFrame(rows, columns=events.columns)
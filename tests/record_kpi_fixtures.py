@@ -0,0 +1,61 @@
+"""
+Zeichnet Referenzfälle für tests/test_kpi_engine.py auf: Eventlog und @output = 'kpi'
+des Orchestrators für dieselben Filter, abgelegt unter tests/fixtures/kpi/<name>/.
+
+Beispiel:
+    python tests/record_kpi_fixtures.py maerz_kunde_1 2025-03-01 2025-03-31 --customer 1 \
+        --connection-string "Driver={ODBC Driver 17 for SQL Server};Server=...;Database=...;UID=...;PWD=..."
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date
+
+import pyodbc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator import build_orchestrator_query, fetch_output  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'kpi')
+
+
+def record(connection, name, customer_ids, start_date, end_date, material_ids, is_strict_inclusion):
+    """Lädt Eventlog und KPIs für einen Filter und schreibt sie als Parquet mit den Parametern."""
+    target = os.path.join(FIXTURE_DIR, name)
+    os.makedirs(target, exist_ok=True)
+    for output in ('eventlog', 'kpi'):
+        sql_query = build_orchestrator_query(
+            output, customer_ids, start_date, end_date, material_ids, is_strict_inclusion
+        )
+        fetch_output(connection, output, sql_query).to_parquet(os.path.join(target, f'{output}.parquet'))
+
+    params = {
+        'customer_ids': customer_ids,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'material_ids': material_ids,
+        'is_strict_inclusion': is_strict_inclusion,
+    }
+    with open(os.path.join(target, 'params.json'), 'w', encoding='utf-8') as f:
+        json.dump(params, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('name')
+    parser.add_argument('start_date', type=date.fromisoformat)
+    parser.add_argument('end_date', type=date.fromisoformat)
+    parser.add_argument('--customer', action='append', default=[])
+    parser.add_argument('--material', action='append', default=[])
+    parser.add_argument('--strict', action='store_true')
+    parser.add_argument('--connection-string', default=os.getenv('ORCHESTRATOR_CONNECTION_STRING'))
+    args = parser.parse_args()
+
+    with pyodbc.connect(args.connection_string) as connection:
+        record(connection, args.name, args.customer, args.start_date, args.end_date, args.material, args.strict)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from compaction import COMPACTION_ATTR, compact_dtypes
+from dfg_engine import compute_dfg
+from disk_cache import ParquetResultCache
+from eventlog_filter import narrow_eventlog
+from eventlog_preview import preview_page, sort_order
+from kpi_engine import compute_kpis
+
+KPI_NAMES = ('SALESOFFER_TO_SALESORDER', 'SALESORDER_TO_DELIVERY')
+ACTIVITIES = ['SALESOFFER_CREATED', 'SALESORDER_CREATED', 'DELIVERY_SHIPPED']
+
+
+@pytest.fixture(scope='module')
+def eventlog():
+    rng = np.random.default_rng(3)
+    size = 600
+    customers = rng.integers(1, 6, size)
+    return pd.DataFrame({
+        'CASE_ID': np.repeat(np.arange(size // 3), 3),
+        'ACTIVITY': np.tile(ACTIVITIES, size // 3),
+        'Datum': pd.Timestamp('2025-01-01') + pd.to_timedelta(np.arange(size) * 7, unit='h'),
+        'CUSTOMER_ID': customers,
+        'CUSTOMER_NAME': [None if c == 5 else f"{c:02d} / BikePro" for c in customers],
+        'ID_MAT': rng.integers(10, 14, size),
+        # Beträge mit Cent-Anteil sind in float32 nicht exakt, ganze Mengen schon
+        'Umsatz': np.where(rng.random(size) < 0.1, np.nan, rng.integers(100, 100000, size) / 100),
+        'Menge': rng.integers(1, 20, size).astype(np.float64),
+    })
+
+
+@pytest.fixture(scope='module')
+def compacted(eventlog):
+    return compact_dtypes(eventlog)
+
+
+def as_objects(df):
+    return df.astype(object).where(df.notna(), None)
+
+
+def test_compaction_keeps_every_value(eventlog, compacted):
+    pd.testing.assert_frame_equal(as_objects(compacted), as_objects(eventlog))
+
+    report = compacted.attrs[COMPACTION_ATTR]
+    assert report['bytes_after'] < report['bytes_before']
+    assert set(report['columns']) == {'CASE_ID', 'ACTIVITY', 'CUSTOMER_ID', 'CUSTOMER_NAME', 'ID_MAT', 'Menge'}
+    # Fall-ID wird nur verkleinert, nicht kategorisiert; Beträge bleiben float64
+    assert pd.api.types.is_integer_dtype(compacted['CASE_ID'])
+    assert compacted['Umsatz'].dtype == np.float64
+
+
+@pytest.mark.parametrize('ascending', [True, False])
+def test_preview_sorts_like_the_original(eventlog, compacted, ascending):
+    for column in eventlog.columns:
+        order = sort_order(compacted, column, ascending)
+        np.testing.assert_array_equal(order, sort_order(eventlog, column, ascending), err_msg=column)
+        page, _, _ = preview_page(compacted, order, 2, 50)
+        expected, _, _ = preview_page(eventlog, order, 2, 50)
+        pd.testing.assert_frame_equal(as_objects(page), as_objects(expected))
+
+
+def test_totals_filters_kpis_and_dfg_are_unchanged(eventlog, compacted):
+    assert compacted['Umsatz'].fillna(0).sum() == pytest.approx(eventlog['Umsatz'].fillna(0).sum())
+
+    args = (date(2025, 1, 10), date(2025, 3, 31), [2, '3'], [11])
+    pd.testing.assert_frame_equal(as_objects(narrow_eventlog(compacted, *args)),
+                                  as_objects(narrow_eventlog(eventlog, *args)))
+
+    pd.testing.assert_frame_equal(compute_kpis(compacted, KPI_NAMES), compute_kpis(eventlog, KPI_NAMES))
+    pd.testing.assert_frame_equal(as_objects(compute_dfg(compacted)), as_objects(compute_dfg(eventlog)))
+
+
+def test_parquet_round_trip_keeps_the_compact_schema(tmp_path, eventlog, compacted):
+    cache = ParquetResultCache(str(tmp_path))
+    params = {'output': 'eventlog'}
+    assert cache.put(params, compacted, ttl=600)
+
+    restored = cache.get(params)
+    assert dict(restored.dtypes) == dict(compacted.dtypes)
+    pd.testing.assert_frame_equal(as_objects(restored), as_objects(eventlog))
+    # Erneutes Kompaktieren nach dem Lesen (wie beim Laden aus dem Parquet-Cache) ändert nichts mehr
+    assert compact_dtypes(restored).attrs[COMPACTION_ATTR]['columns'] == {}
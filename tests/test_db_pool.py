@@ -0,0 +1,106 @@
+import pytest
+
+pyodbc = pytest.importorskip('pyodbc', exc_type=ImportError)
+
+from db_pool import ConnectionPool, PoolTimeoutError  # noqa: E402
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self._connection = connection
+
+    def execute(self, sql):
+        if not self._connection.healthy:
+            raise pyodbc.Error('Verbindung unterbrochen')
+        return self
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.healthy = True
+        self.closed = False
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class FakePool(ConnectionPool):
+    """Pool ohne Datenbank: Verbindungen sind FakeConnection-Objekte."""
+
+    def __init__(self, **kwargs):
+        super().__init__('DRIVER=fake', **kwargs)
+        self.created = []
+
+    def _create_connection(self):
+        connection = FakeConnection()
+        self.created.append(connection)
+        return connection
+
+
+def test_checkout_reuses_released_connections():
+    pool = FakePool(max_size=2)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+        assert pool.metrics()['in_use'] == 1
+
+    metrics = pool.metrics()
+    assert (metrics['created'], metrics['reused'], metrics['checkouts']) == (1, 1, 2)
+    # Offene Transaktionen werden bei der Rückgabe zurückgerollt
+    assert first.rollbacks == 2
+
+
+def test_checkout_times_out_when_the_pool_is_exhausted():
+    pool = FakePool(max_size=1, checkout_timeout=0.05)
+    connection = pool.acquire()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+    assert pool.metrics()['timeouts'] == 1
+
+    pool.release(connection)
+    assert pool.acquire() is connection
+
+
+def test_failed_health_check_evicts_the_connection():
+    pool = FakePool(health_check_after=0)
+    with pool.connection() as broken:
+        pass
+    broken.healthy = False
+
+    with pool.connection() as connection:
+        assert connection is not broken
+    assert broken.closed
+    metrics = pool.metrics()
+    assert metrics['health_check_failures'] == 1 and metrics['size'] == 1
+
+
+def test_idle_connections_are_closed_after_the_timeout():
+    pool = FakePool(idle_timeout=0)
+    with pool.connection() as idle:
+        pass
+    with pool.connection() as connection:
+        assert connection is not idle
+    assert idle.closed and pool.metrics()['evicted_idle'] == 1
+
+
+def test_database_errors_discard_the_connection():
+    pool = FakePool()
+    with pytest.raises(pyodbc.Error):
+        with pool.connection() as connection:
+            raise pyodbc.Error('Abfrage fehlgeschlagen')
+    assert connection.closed
+    assert pool.metrics()['size'] == 0 and pool.metrics()['discarded'] == 1
@@ -0,0 +1,96 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from dfg_engine import compute_dfg, prune_dfg
+from eventlog_filter import restrict_to_aggregate_range
+
+
+@pytest.fixture
+def eventlog():
+    # Fall 1: A -> B -> C, Fall 2: A -> C mit gleichem Zeitpunkt für A und C (Reihenfolge aus der Datenbank)
+    return pd.DataFrame({
+        'CASE_ID': [1, 2, 1, 1, 2],
+        'ACTIVITY': ['A', 'A', 'C', 'B', 'C'],
+        'Datum': pd.to_datetime(['2025-01-01 08:00:00', '2025-01-02 09:00:00', '2025-01-02 12:00:00',
+                                 '2025-01-01 10:00:00', '2025-01-02 09:00:00']),
+    })
+
+
+def as_dict(df_dfg, column='FREQUENCY'):
+    return {(row.FROM_ACTIVITY, row.TO_ACTIVITY): getattr(row, column) for row in df_dfg.itertuples()}
+
+
+def test_compute_dfg_counts_transitions_within_cases(eventlog):
+    df_dfg = compute_dfg(eventlog)
+    assert list(df_dfg.columns) == ['FROM_ACTIVITY', 'TO_ACTIVITY', 'FREQUENCY']
+    assert as_dict(df_dfg) == {('A', 'B'): 1, ('B', 'C'): 1, ('A', 'C'): 1}
+    # Keine Kante über Fallgrenzen hinweg (C aus Fall 1 -> A aus Fall 2)
+    assert ('C', 'A') not in as_dict(df_dfg)
+
+
+def test_compute_dfg_durations(eventlog):
+    df_dfg = compute_dfg(eventlog, with_durations=True)
+    assert as_dict(df_dfg, 'MEAN_DURATION_MIN') == pytest.approx({('A', 'B'): 120.0, ('B', 'C'): 1560.0,
+                                                                  ('A', 'C'): 0.0})
+
+
+def test_compute_dfg_edge_cases(eventlog):
+    assert compute_dfg(eventlog.drop(columns=['Datum'])) is None
+    assert compute_dfg(eventlog.iloc[:1]).empty
+    assert compute_dfg(eventlog.assign(CASE_ID=range(len(eventlog)))).empty
+
+
+def test_compute_dfg_ends_at_midnight_of_the_end_date(eventlog):
+    # @output = 'dfg' endet am 02.01. 00:00 - von Fall 1 bleibt nur A -> B, Fall 2 entfällt
+    df_dfg = compute_dfg(restrict_to_aggregate_range(eventlog, date(2025, 1, 2)))
+    assert as_dict(df_dfg) == {('A', 'B'): 1}
+
+
+@pytest.fixture
+def dense_dfg():
+    # Hauptpfad A -> B -> C -> D, seltene Nebenkanten und ein nur schwach angebundener Knoten E
+    return pd.DataFrame({
+        'FROM_ACTIVITY': ['A', 'B', 'C', 'A', 'B', 'D', 'C', 'E'],
+        'TO_ACTIVITY': ['B', 'C', 'D', 'C', 'D', 'A', 'C', 'D'],
+        'FREQUENCY': [100, 90, 80, 10, 5, 3, 2, 1],
+    })
+
+
+def weakly_connected(df_dfg):
+    components = []
+    for from_node, to_node in zip(df_dfg['FROM_ACTIVITY'], df_dfg['TO_ACTIVITY']):
+        touching = [c for c in components if from_node in c or to_node in c]
+        merged = {from_node, to_node}.union(*touching)
+        components = [c for c in components if c not in touching] + [merged]
+    return components
+
+
+@pytest.mark.parametrize('kwargs, expected_dropped', [
+    ({'min_frequency': 10}, 3),
+    ({'top_k': 2}, 4),
+    ({'coverage': 0.9}, 4),
+    ({'top_k': 0}, 4),
+])
+def test_prune_dfg_keeps_the_graph_connected(dense_dfg, kwargs, expected_dropped):
+    pruned, summary = prune_dfg(dense_dfg, **kwargs)
+    assert weakly_connected(pruned) == [{'A', 'B', 'C', 'D', 'E'}]
+    # Verbunden wird über die häufigsten Kanten: E hängt nur über E -> D am Graphen
+    assert ('E', 'D') in as_dict(pruned)
+    assert summary['dropped_edges'] == expected_dropped == len(dense_dfg) - len(pruned)
+    assert summary['kept_edges'] == len(pruned)
+
+
+def test_prune_dfg_criteria_and_summary(dense_dfg):
+    pruned, summary = prune_dfg(dense_dfg, top_k=3, keep_connected=False)
+    # Ursprüngliche Reihenfolge bleibt erhalten
+    assert list(zip(pruned['FROM_ACTIVITY'], pruned['TO_ACTIVITY'])) == [('A', 'B'), ('B', 'C'), ('C', 'D')]
+    assert summary == pytest.approx({'kept_edges': 3, 'dropped_edges': 5, 'connecting_edges': 0,
+                                     'dropped_frequency': 21.0, 'kept_share': 270 / 291})
+
+    pruned, summary = prune_dfg(dense_dfg, top_k=3)
+    assert summary['connecting_edges'] == 1 and summary['dropped_frequency'] == 20.0
+
+    unchanged, summary = prune_dfg(dense_dfg)
+    assert len(unchanged) == len(dense_dfg) and summary['dropped_edges'] == 0
@@ -0,0 +1,27 @@
+import pandas as pd
+
+from dfg_figure import DfgFigureCache
+
+LAYOUT = (200, 90, 100, 50)
+
+
+def dfg(frequency):
+    return pd.DataFrame({
+        'FROM_ACTIVITY': ['SALESOFFER_CREATED', 'SALESORDER_CREATED'],
+        'TO_ACTIVITY': ['SALESORDER_CREATED', 'DELIVERY_SHIPPED'],
+        'FREQUENCY': [frequency, 3],
+    })
+
+
+def test_sessions_get_their_own_figure():
+    cache = DfgFigureCache()
+    built, _ = cache.get(dfg(5), *LAYOUT)
+    built.update_layout(title='Session A')
+    hit, _ = cache.get(dfg(5), *LAYOUT)
+    patched, _ = cache.get(dfg(7), *LAYOUT)
+
+    assert hit is not built
+    assert hit.layout.title.text is None
+    assert patched.layout.title.text is None
+    assert cache.metrics()['hits'] == 1 and cache.metrics()['label_patches'] == 1
+    cache.clear()
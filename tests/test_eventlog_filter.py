@@ -0,0 +1,105 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from conftest import reference_query
+from eventlog_filter import narrow_eventlog, restrict_to_aggregate_range
+from eventlog_store import IncrementalEventlogStore
+from subset_cache import SupersetEventlogCache
+
+WIDE_RANGE = (date(2025, 1, 1), date(2025, 3, 31))
+
+# (Kunden, Start, Ende, Materialien) - jeweils enger als der bereits geladene Zeitraum
+REQUESTS = [
+    ([], date(2025, 1, 1), date(2025, 1, 31), []),
+    ([1], date(2025, 1, 1), date(2025, 3, 31), []),
+    ([], date(2025, 1, 1), date(2025, 1, 31), [10]),
+    ([1], date(2025, 1, 15), date(2025, 2, 28), [10]),
+    ([], date(2025, 2, 1), date(2025, 2, 5), [10, 20]),
+]
+
+
+@pytest.fixture
+def events():
+    # Fall 1 enthält Material 10 erst im Februar, Fall 2 schon im Januar; Fall 4 wechselt den Kunden
+    return pd.DataFrame({
+        'CASE_ID': [1, 1, 2, 2, 3, 4, 4],
+        'ACTIVITY': ['SALESORDER_CREATED', 'DELIVERY_SHIPPED', 'SALESORDER_CREATED', 'DELIVERY_SHIPPED',
+                     'SALESORDER_CREATED', 'SALESORDER_CREATED', 'DELIVERY_SHIPPED'],
+        'Datum': pd.to_datetime(['2025-01-10 00:00:00', '2025-02-05 00:00:00', '2025-01-12 00:00:00', '2025-01-20 00:00:00',
+                                 '2025-01-15 00:00:00', '2025-01-31 23:59:59', '2025-02-01 00:00:00']),
+        'CUSTOMER_ID': [1, 1, 2, 2, 1, 2, 1],
+        'ID_MAT': [20, 10, 10, 20, 20, 10, 10],
+    })
+
+
+@pytest.fixture
+def superset_cache():
+    cache = SupersetEventlogCache()
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+def via_store(tmp_path, events, customer_ids, start_date, end_date, material_ids):
+    store = IncrementalEventlogStore(str(tmp_path))
+
+    def fetch_range(range_start, range_end):
+        return reference_query(events, customer_ids, range_start, range_end, material_ids)
+
+    store.get(customer_ids, *WIDE_RANGE, material_ids, False, fetch_range)
+    return store.get(customer_ids, start_date, end_date, material_ids, False, fetch_range)
+
+
+def via_superset_cache(cache, events, customer_ids, start_date, end_date, material_ids):
+    # Obermengen mit und ohne Materialfilter über den breiten Zeitraum
+    cache.add([], *WIDE_RANGE, [], False, reference_query(events, [], *WIDE_RANGE, []))
+    if material_ids:
+        cache.add([], *WIDE_RANGE, material_ids, False, reference_query(events, [], *WIDE_RANGE, material_ids))
+    result = cache.lookup(customer_ids, start_date, end_date, material_ids, False)
+    assert result is not None
+    return result
+
+
+def normalized(df):
+    return df.sort_values(['CASE_ID', 'Datum']).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('layer', ['narrow_eventlog', 'store', 'superset_cache'])
+@pytest.mark.parametrize('customer_ids, start_date, end_date, material_ids', REQUESTS)
+def test_local_layers_match_orchestrator(layer, tmp_path, superset_cache, events,
+                                         customer_ids, start_date, end_date, material_ids):
+    request = (customer_ids, start_date, end_date, material_ids)
+    if layer == 'narrow_eventlog':
+        result = narrow_eventlog(events, start_date, end_date, customer_ids, material_ids)
+    elif layer == 'store':
+        result = via_store(tmp_path, events, *request)
+    else:
+        result = via_superset_cache(superset_cache, events, *request)
+
+    expected = reference_query(events, *request)
+    pd.testing.assert_frame_equal(normalized(result), normalized(expected), check_dtype=False)
+
+
+def test_superset_cache_never_narrows_strict_inclusion(superset_cache, events):
+    df_strict = reference_query(events, [], *WIDE_RANGE, [10])
+    superset_cache.add([], *WIDE_RANGE, [10], True, df_strict)
+
+    assert superset_cache.lookup([], date(2025, 1, 1), date(2025, 1, 31), [10], True) is None
+    assert superset_cache.lookup([1], *WIDE_RANGE, [10], True) is None
+    assert len(superset_cache.lookup([], *WIDE_RANGE, [10], True)) == len(df_strict)
+
+
+def test_aggregate_range_ends_at_midnight_and_redecides_materials(events):
+    df_eventlog = reference_query(events, [], date(2025, 1, 1), date(2025, 2, 1), [10])
+    df_range = restrict_to_aggregate_range(df_eventlog, date(2025, 2, 1), [10])
+    # Das Event am 01.02. 00:00 zählt noch; Fall 4 behält so sein Material-10-Event
+    assert set(df_range['CASE_ID']) == {2, 4}
+    assert len(df_range) == 4
+
+    df_range = restrict_to_aggregate_range(df_eventlog, date(2025, 1, 31), [10])
+    # Fall 4 liegt am 31.01. erst um 23:59:59 - für KPI und DFG bleibt nur Fall 2
+    assert set(df_range['CASE_ID']) == {2}
+    assert restrict_to_aggregate_range(df_eventlog, date(2025, 1, 31), [10], True) is None
+    assert restrict_to_aggregate_range(df_eventlog, date(2025, 2, 28), [10], True) is df_eventlog
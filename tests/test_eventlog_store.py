@@ -0,0 +1,106 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import eventlog_store
+from conftest import reference_query
+from eventlog_store import IncrementalEventlogStore
+from memory_cache import get_memory_cache
+
+
+@pytest.fixture
+def events():
+    # Fall 1 enthält Material 10 erst im Februar, Fall 2 schon im Januar
+    return pd.DataFrame({
+        'CASE_ID': [1, 1, 2, 2, 3],
+        'ACTIVITY': ['SALESORDER_CREATED', 'DELIVERY_SHIPPED', 'SALESORDER_CREATED', 'DELIVERY_SHIPPED',
+                     'SALESORDER_CREATED'],
+        'Datum': pd.to_datetime(['2025-01-10', '2025-02-05', '2025-01-12', '2025-01-20', '2025-01-15']),
+        'CUSTOMER_ID': [1, 1, 2, 2, 1],
+        'ID_MAT': [20, 10, 10, 20, 20],
+    })
+
+
+def forget_scopes_in_memory():
+    # Die Scopes liegen im prozessweiten MemoryResultCache, unabhängig vom Verzeichnis des Stores
+    get_memory_cache().discard(lambda key: key[0] == 'eventlog_store')
+
+
+@pytest.fixture
+def store(tmp_path):
+    forget_scopes_in_memory()
+    yield IncrementalEventlogStore(str(tmp_path))
+    forget_scopes_in_memory()
+
+
+def fetcher(events, customer_ids, material_ids, calls=None):
+    def fetch_range(start_date, end_date):
+        if calls is not None:
+            calls.append((start_date, end_date))
+        return reference_query(events, customer_ids, start_date, end_date, material_ids)
+    return fetch_range
+
+
+def normalized(df):
+    return df.sort_values(['CASE_ID', 'Datum']).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('customer_ids, material_ids', [([], [10]), ([1], [10]), ([], [10, 20])])
+def test_material_filter_matches_direct_query_for_narrower_range(store, events, customer_ids, material_ids):
+    fetch_range = fetcher(events, customer_ids, material_ids)
+    # Erst der breite Zeitraum, dann Januar: Fall 1 gehört im Januar nicht dazu
+    store.get(customer_ids, date(2025, 1, 1), date(2025, 3, 31), material_ids, False, fetch_range)
+    result = store.get(customer_ids, date(2025, 1, 1), date(2025, 1, 31), material_ids, False, fetch_range)
+
+    expected = reference_query(events, customer_ids, date(2025, 1, 1), date(2025, 1, 31), material_ids)
+    pd.testing.assert_frame_equal(normalized(result), normalized(expected), check_dtype=False)
+    assert store.metrics()['bypassed'] == 2
+
+
+def test_sync_fetches_only_from_the_watermark_day(store, events, monkeypatch):
+    calls = []
+    store.get([], date(2025, 1, 1), date(2025, 3, 31), [], False, fetcher(events, [], [], calls))
+    assert calls[0][0] == date(2025, 1, 1)
+
+    # Neues Event am Tag der Watermark (05.02.) und eines danach; der Tag wird lokal ersetzt, nicht ergänzt
+    grown = pd.concat([events, pd.DataFrame({
+        'CASE_ID': [1, 4], 'ACTIVITY': ['INVOICE_CREATED', 'SALESORDER_CREATED'],
+        'Datum': pd.to_datetime(['2025-02-05 18:00:00', '2025-03-01 00:00:00']),
+        'CUSTOMER_ID': [1, 2], 'ID_MAT': [10, 20],
+    })], ignore_index=True)
+    monkeypatch.setattr(eventlog_store, 'SYNC_MIN_INTERVAL', -1)
+    result = store.get([], date(2025, 1, 1), date(2025, 3, 31), [], False, fetcher(grown, [], [], calls))
+
+    assert calls[1][0] == date(2025, 2, 5)
+    expected = reference_query(grown, [], date(2025, 1, 1), date(2025, 3, 31), [])
+    pd.testing.assert_frame_equal(normalized(result), normalized(expected), check_dtype=False)
+    assert store.metrics()['incremental_syncs'] == 1
+
+
+def test_earlier_start_loads_only_the_gap(store, events):
+    calls = []
+    fetch_range = fetcher(events, [1], [], calls)
+    store.get([1], date(2025, 1, 14), date(2025, 3, 31), [], False, fetch_range)
+    result = store.get([1], date(2025, 1, 1), date(2025, 3, 31), [], False, fetch_range)
+
+    assert calls[1] == (date(2025, 1, 1), date(2025, 1, 13))
+    expected = reference_query(events, [1], date(2025, 1, 1), date(2025, 3, 31), [])
+    pd.testing.assert_frame_equal(normalized(result), normalized(expected), check_dtype=False)
+    assert store.metrics()['full_loads'] == 1
+
+
+def test_scope_is_read_back_from_disk(tmp_path, events):
+    calls = []
+    fetch_range = fetcher(events, [], [], calls)
+    forget_scopes_in_memory()
+    IncrementalEventlogStore(str(tmp_path)).get([], date(2025, 1, 1), date(2025, 3, 31), [], False, fetch_range)
+    forget_scopes_in_memory()
+
+    restarted = IncrementalEventlogStore(str(tmp_path))
+    result = restarted.get([], date(2025, 1, 1), date(2025, 1, 31), [], False, fetch_range)
+    forget_scopes_in_memory()
+
+    assert len(calls) == 1 and restarted.metrics()['local_hits'] == 1
+    expected = reference_query(events, [], date(2025, 1, 1), date(2025, 1, 31), [])
+    pd.testing.assert_frame_equal(normalized(result), normalized(expected), check_dtype=False)
@@ -0,0 +1,106 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import reference_query
+from eventlog_filter import restrict_to_aggregate_range
+from eventlog_store import eventlog_source_version, stamp_eventlog_version
+from kpi_cube import KpiCubeCache, build_kpi_cube
+from kpi_engine import compute_kpis
+from subset_cache import SupersetEventlogCache
+
+KPI_NAMES = ('SALESOFFER_TO_SALESORDER', 'SALESORDER_TO_DELIVERY', 'SALESOFFER_TO_PAYMENT')
+BASE_RANGE = (date(2025, 1, 1), date(2025, 3, 31))
+ACTIVITIES = ['SALESOFFER_CREATED', 'SALESORDER_CREATED', 'SALESORDER_CHANGED', 'DELIVERY_SHIPPED',
+              'INVOICE_CREATED', 'PAYMENT_RECEIVED', 'NOTE_ADDED']
+
+
+@pytest.fixture(scope='module')
+def base_eventlog():
+    # Überwiegend reguläre Fälle; einige mit wiederholten Schritten, Kunden- oder Materialwechsel
+    rng = np.random.default_rng(7)
+    rows = []
+    for case_id in range(300):
+        customer, material = int(rng.integers(1, 5)), int(rng.integers(10, 14))
+        start = pd.Timestamp('2025-01-01') + pd.Timedelta(hours=int(rng.integers(0, 89 * 24)))
+        steps = [0, 1, 3, 5] if rng.random() < 0.7 else list(rng.choice(len(ACTIVITIES), 5))
+        for position, activity in enumerate(steps):
+            # Auch Events genau um Mitternacht (Grenze von @end_date bei KPI und DFG)
+            offset = pd.Timedelta(days=int(rng.integers(0, 4)) * position)
+            timestamp = (start + offset).normalize() if rng.random() < 0.2 else start + offset
+            rows.append({
+                'CASE_ID': case_id,
+                'ACTIVITY': ACTIVITIES[activity],
+                'Datum': timestamp,
+                'CUSTOMER_ID': customer if rng.random() < 0.95 else int(rng.integers(1, 5)),
+                'ID_MAT': material if rng.random() < 0.9 else int(rng.integers(10, 14)),
+            })
+    df = pd.DataFrame(rows)
+    return df.loc[df['Datum'] <= pd.Timestamp('2025-03-31 23:59:59')].reset_index(drop=True)
+
+
+def random_requests(count):
+    rng = np.random.default_rng(11)
+    for _ in range(count):
+        start = BASE_RANGE[0] + timedelta(days=int(rng.integers(0, 89)))
+        end = min(start + timedelta(days=int(rng.integers(0, 45))), BASE_RANGE[1])
+        customers = [int(c) for c in rng.choice(range(1, 5), int(rng.integers(0, 3)), replace=False)]
+        materials = [int(m) for m in rng.choice(range(10, 14), int(rng.integers(0, 3)), replace=False)]
+        yield customers, start, end, materials
+
+
+def test_cube_matches_compute_kpis_on_the_filtered_eventlog(base_eventlog):
+    cube = build_kpi_cube(base_eventlog, *BASE_RANGE, KPI_NAMES)
+    assert cube.cells > 0 and 0 < cube.residual_events < len(base_eventlog)
+
+    for customers, start, end, materials in random_requests(150):
+        df_eventlog = reference_query(base_eventlog, customers, start, end, materials)
+        expected = compute_kpis(restrict_to_aggregate_range(df_eventlog, end, materials), KPI_NAMES)
+        result = cube.query(customers, start, end, materials)
+
+        request = (customers, start, end, materials)
+        assert list(result['KPI_NAME']) == list(expected['KPI_NAME']), request
+        np.testing.assert_allclose(result['AVG_VALUE'].to_numpy(dtype=float),
+                                   expected['AVG_VALUE'].to_numpy(dtype=float), rtol=1e-9, err_msg=str(request))
+
+
+def test_cube_matches_compact_id_columns(base_eventlog):
+    # Kompaktierte Eventlogs: Kunden als Categorical, Materialien als kleinerer Integer-Typ
+    compact = base_eventlog.astype({'CUSTOMER_ID': 'category', 'ID_MAT': 'int16'})
+    cube = build_kpi_cube(compact, *BASE_RANGE, KPI_NAMES)
+    plain = build_kpi_cube(base_eventlog, *BASE_RANGE, KPI_NAMES)
+    for customers, start, end, materials in random_requests(20):
+        pd.testing.assert_frame_equal(cube.query(customers, start, end, materials),
+                                      plain.query(customers, start, end, materials))
+
+
+def test_cube_coverage(base_eventlog):
+    cube = build_kpi_cube(base_eventlog, *BASE_RANGE, KPI_NAMES)
+    assert cube.covers([1], date(2025, 2, 1), date(2025, 2, 28), [10], False)
+    assert not cube.covers([], date(2025, 2, 1), date(2025, 2, 28), [10], True)
+    assert not cube.covers([], date(2024, 12, 31), date(2025, 2, 28), [], False)
+    assert not cube.covers([], date(2025, 3, 1), date(2025, 4, 1), [], False)
+
+    assert build_kpi_cube(base_eventlog.drop(columns=['ID_MAT']), *BASE_RANGE, KPI_NAMES) is None
+    assert build_kpi_cube(base_eventlog, *BASE_RANGE, ['DURCHLAUFZEIT']) is None
+
+
+def test_cube_serves_only_eventlogs_derived_from_its_base(base_eventlog):
+    base = stamp_eventlog_version(base_eventlog.copy())
+    superset_cache, cubes = SupersetEventlogCache(), KpiCubeCache()
+    try:
+        superset_cache.add([], *BASE_RANGE, [], False, base)
+        cube = cubes.build(eventlog_source_version(base), base, *BASE_RANGE, KPI_NAMES)
+
+        derived = stamp_eventlog_version(superset_cache.lookup([1], date(2025, 2, 1), date(2025, 2, 28), [10], False))
+        assert cubes.get(eventlog_source_version(derived), KPI_NAMES) is cube
+        assert cubes.get(eventlog_source_version(base), KPI_NAMES[:2]) is None
+
+        # Ein neu geladenes Eventlog (anderer Inhalt) hat keinen Würfel
+        reloaded = stamp_eventlog_version(base.iloc[:-1].copy())
+        assert cubes.get(eventlog_source_version(reloaded), KPI_NAMES) is None
+    finally:
+        superset_cache.clear()
+        cubes.clear()
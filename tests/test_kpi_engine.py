@@ -0,0 +1,124 @@
+import glob
+import json
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from eventlog_filter import filter_date_range, restrict_to_aggregate_range
+from kpi_engine import KpiValidation, compute_kpis, kpi_definitions, query_shape, validate_kpis
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'kpi')
+
+KPI_NAMES = ('SALESOFFER_TO_SALESORDER', 'SALESORDER_TO_DELIVERY', 'SALESOFFER_TO_PAYMENT')
+
+
+@pytest.fixture
+def eventlog():
+    # Fall 1: Angebot -> Auftrag 120 min (die spätere Auftragsänderung zählt nicht), Auftrag -> Lieferung 1440 min
+    # Fall 2: Angebot -> Auftrag 60 min, keine Lieferung
+    return pd.DataFrame({
+        'CASE_ID': [1, 1, 1, 1, 2, 2],
+        'ACTIVITY': ['SALESOFFER_CREATED', 'SALESORDER_CREATED', 'SALESORDER_CHANGED', 'DELIVERY_SHIPPED',
+                     'SALESOFFER_CREATED', 'SALESORDER_CREATED'],
+        'Datum': pd.to_datetime(['2025-01-01 08:00', '2025-01-01 10:00', '2025-01-01 12:00', '2025-01-02 10:00',
+                                 '2025-01-03 00:00', '2025-01-03 01:00']),
+    })
+
+
+def as_dict(df_kpi):
+    return dict(zip(df_kpi['KPI_NAME'], df_kpi['AVG_VALUE']))
+
+
+def test_kpi_definitions_from_orchestrator_names():
+    assert kpi_definitions(['SALESORDER_TO_DELIVERY', 'KPI_INVOICE_PAYMENT']) == {
+        'SALESORDER_TO_DELIVERY': ('SALESORDER', 'DELIVERY'),
+        'KPI_INVOICE_PAYMENT': ('INVOICE', 'PAYMENT'),
+    }
+
+
+@pytest.mark.parametrize('kpi_name', ['DURCHLAUFZEIT', 'SALESOFFER', 'SALESOFFER_SALESORDER_DELIVERY'])
+def test_kpi_definitions_reject_unmappable_names(kpi_name):
+    assert kpi_definitions(['SALESORDER_TO_DELIVERY', kpi_name]) is None
+    assert compute_kpis(pd.DataFrame(columns=['CASE_ID', 'ACTIVITY', 'Datum']), [kpi_name]) is None
+
+
+def test_compute_kpis_full_range(eventlog):
+    df_kpi = compute_kpis(eventlog, KPI_NAMES)
+    # KPIs ohne Fall mit Start- und Endschritt fehlen; Reihenfolge wie vom Orchestrator
+    assert list(df_kpi['KPI_NAME']) == ['SALESOFFER_TO_SALESORDER', 'SALESORDER_TO_DELIVERY']
+    assert as_dict(df_kpi) == pytest.approx({'SALESOFFER_TO_SALESORDER': 90.0, 'SALESORDER_TO_DELIVERY': 1440.0})
+
+
+@pytest.mark.parametrize('start_date, end_date, expected', [
+    (date(2025, 1, 1), date(2025, 1, 1), {'SALESOFFER_TO_SALESORDER': 120.0}),
+    # Enddatum inklusive: Fall 2 liegt am 03.01. vollständig im Zeitraum, von Fall 1 nur die Lieferung
+    (date(2025, 1, 2), date(2025, 1, 3), {'SALESOFFER_TO_SALESORDER': 60.0}),
+    (date(2025, 1, 4), date(2025, 1, 31), {}),
+])
+def test_compute_kpis_on_filtered_eventlog(eventlog, start_date, end_date, expected):
+    df_kpi = compute_kpis(filter_date_range(eventlog, start_date, end_date), KPI_NAMES)
+    assert as_dict(df_kpi) == pytest.approx(expected)
+
+
+def test_compute_kpis_missing_columns(eventlog):
+    assert compute_kpis(eventlog.drop(columns=['ACTIVITY']), KPI_NAMES) is None
+
+
+def test_validate_kpis_tolerance_and_missing_values():
+    reference = pd.DataFrame({'KPI_NAME': ['A', 'B', 'C'], 'AVG_VALUE': [100.0, np.nan, 50.0]})
+    local = pd.DataFrame({'KPI_NAME': ['A', 'C'], 'AVG_VALUE': [100.5, 50.0]})
+    assert validate_kpis(local, reference) == (True, [])
+
+    local = pd.DataFrame({'KPI_NAME': ['A'], 'AVG_VALUE': [102.0]})
+    assert validate_kpis(local, reference) == (False, ['A', 'C'])
+
+
+def test_validation_per_shape_and_ttl(eventlog):
+    reference = pd.DataFrame({'KPI_NAME': ['SALESOFFER_TO_SALESORDER'], 'AVG_VALUE': [90.0]})
+    df_local = compute_kpis(eventlog, reference['KPI_NAME'])
+    all_customers = query_shape([], [], False)
+    one_customer = query_shape([7], [], False)
+
+    validation = KpiValidation(ttl=3600)
+    assert validation.record(all_customers, df_local, reference) is True
+    assert validation.validated_names(all_customers) == ('SALESOFFER_TO_SALESORDER',)
+    # Andere Abfrageformen sind nicht mitbestätigt
+    assert validation.status(one_customer) is None
+    assert validation.record(one_customer, df_local, reference.assign(AVG_VALUE=120.0)) is False
+    assert validation.validated_names(one_customer) is None
+
+    expired = KpiValidation(ttl=0)
+    expired.record(all_customers, df_local, reference)
+    assert expired.status(all_customers) is None
+
+
+def _recorded_cases():
+    return sorted(glob.glob(os.path.join(FIXTURE_DIR, '*', 'params.json')))
+
+
+@pytest.mark.skipif(not _recorded_cases(), reason='keine aufgezeichneten Orchestrator-Ergebnisse '
+                                                 '(tests/record_kpi_fixtures.py)')
+@pytest.mark.parametrize('params_path', _recorded_cases())
+def test_compute_kpis_matches_recorded_orchestrator_output(params_path):
+    case_dir = os.path.dirname(params_path)
+    with open(params_path, encoding='utf-8') as f:
+        params = json.load(f)
+    df_eventlog = pd.read_parquet(os.path.join(case_dir, 'eventlog.parquet'))
+    df_reference = pd.read_parquet(os.path.join(case_dir, 'kpi.parquet'))
+
+    df_range = restrict_to_aggregate_range(df_eventlog, date.fromisoformat(params['end_date']),
+                                           params['material_ids'], params['is_strict_inclusion'])
+    if df_range is None:
+        pytest.skip('strikte Inklusion mit Events am Endtag wird nicht lokal berechnet')
+    df_local = compute_kpis(df_range, df_reference['KPI_NAME'])
+    ok, mismatches = validate_kpis(df_local, df_reference)
+    assert ok, f"{os.path.basename(case_dir)} {params}: Abweichung bei {mismatches}"
+
+
+def test_kpis_end_at_midnight_of_the_end_date(eventlog):
+    # @output = 'kpi' endet am 02.01. 00:00 - die Lieferung von Fall 1 um 10:00 zählt nicht mehr
+    df_range = restrict_to_aggregate_range(eventlog, date(2025, 1, 2))
+    assert as_dict(compute_kpis(df_range, KPI_NAMES)) == pytest.approx({'SALESOFFER_TO_SALESORDER': 120.0})
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from memory_cache import MemoryResultCache, memory_cached
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({'CASE_ID': [1, 2, 3], 'Umsatz': [10.0, np.nan, 30.0]})
+
+
+@pytest.mark.parametrize('copy_on_write', [True, False])
+def test_hits_do_not_change_the_shared_entry(frame, copy_on_write):
+    cache = MemoryResultCache()
+    cache.put('key', frame)
+    with pd.option_context('mode.copy_on_write', copy_on_write):
+        first = cache.get('key')
+        first['Umsatz'] = first['Umsatz'].fillna(0)
+        first.loc[first['CASE_ID'] == 1, 'CASE_ID'] = 99
+        first['NEU'] = 1
+
+    second = cache.get('key')
+    assert list(second.columns) == ['CASE_ID', 'Umsatz']
+    assert second['CASE_ID'].tolist() == [1, 2, 3]
+    assert second['Umsatz'].isna().sum() == 1
+
+
+def test_hits_share_the_arrays_until_written(frame):
+    cache = MemoryResultCache()
+    cache.put('key', frame)
+    with pd.option_context('mode.copy_on_write', True):
+        first, second = cache.get('key'), cache.get('key')
+        assert first is not second
+        assert np.shares_memory(first['CASE_ID'].to_numpy(), second['CASE_ID'].to_numpy())
+
+
+def test_memory_cached_does_not_cache_errors_and_isolates_results(frame):
+    calls = []
+
+    @memory_cached(ttl=60)
+    def load(value, _username=None):
+        calls.append(value)
+        if value < 0:
+            raise ValueError(value)
+        return frame
+
+    with pytest.raises(ValueError):
+        load(-1)
+    with pytest.raises(ValueError):
+        load(-1)
+    # Parameter mit führendem '_' gehen nicht in den Schlüssel ein
+    first = load(1, _username='a')
+    first['CASE_ID'] = 0
+    assert load(1, _username='b')['CASE_ID'].tolist() == [1, 2, 3]
+    assert calls == [-1, -1, 1]
+    load.clear()
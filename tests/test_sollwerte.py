@@ -0,0 +1,165 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pyodbc = pytest.importorskip('pyodbc', exc_type=ImportError)
+
+from sollwerte import SET_TARGET_TIME_SQL, SollwertCache, changed_sollwerte, save_sollwerte  # noqa: E402
+
+
+ORIGINAL = pd.DataFrame({'KPI_NAME': ['A', 'B', 'C', 'D'], 'SOLL': [60.0, 120.0, 30.0, 0.0]})
+
+
+def test_changed_sollwerte_diff():
+    edited = pd.DataFrame({
+        'KPI_NAME': ['A', 'B', 'C', 'D', 'NEU'],
+        # A geändert, B nur Fließkomma-Rauschen, C geleert, D als Text eingegeben, NEU fehlt im Original
+        'SOLL': [90.0, 120.0004, np.nan, '15', 10.0],
+        'Ampel': ['', '', '', '', ''],
+    })
+    changes = changed_sollwerte(ORIGINAL, edited)
+    assert list(changes['KPI_NAME']) == ['A', 'D']
+    assert changes['SOLL'].tolist() == [90.0, 15.0]
+    assert changes['SOLL'].dtype == np.float64
+
+
+def test_changed_sollwerte_without_changes():
+    assert changed_sollwerte(ORIGINAL, ORIGINAL.copy()).empty
+    edited = ORIGINAL.assign(SOLL=[np.nan, 'abc', 30.0, 0.0005])
+    assert changed_sollwerte(ORIGINAL, edited).empty
+
+
+class RecordingConnection:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.cursor_closed = False
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            fast_executemany = False
+
+            def executemany(self, sql, rows):
+                connection.calls.append((sql, rows, self.fast_executemany))
+                if connection.fail:
+                    raise pyodbc.Error('Stored Procedure fehlgeschlagen')
+
+            def close(self):
+                connection.cursor_closed = True
+
+        return Cursor()
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def test_save_sollwerte_writes_all_changes_in_one_transaction():
+    connection = RecordingConnection()
+    changes = pd.DataFrame({'KPI_NAME': ['A', 'D'], 'SOLL': [90.0, 15.0]})
+    assert save_sollwerte(connection, changes, 'leitung') == 2
+    assert connection.calls == [(SET_TARGET_TIME_SQL, [('A', 90.0, 'leitung'), ('D', 15.0, 'leitung')], True)]
+    assert (connection.commits, connection.rollbacks, connection.cursor_closed) == (1, 0, True)
+
+
+def test_save_sollwerte_rolls_back_on_error():
+    connection = RecordingConnection(fail=True)
+    with pytest.raises(pyodbc.Error):
+        save_sollwerte(connection, pd.DataFrame({'KPI_NAME': ['A'], 'SOLL': [90.0]}), 'leitung')
+    assert (connection.commits, connection.rollbacks, connection.cursor_closed) == (0, 1, True)
+
+
+def test_save_sollwerte_without_changes_skips_the_database():
+    connection = RecordingConnection()
+    assert save_sollwerte(connection, changed_sollwerte(ORIGINAL, ORIGINAL), 'leitung') == 0
+    assert connection.calls == [] and connection.commits == 0
+
+
+class TargetTimesDb:
+    """T_PROCESS_TO_BE_TIME in SQLite (Schema 'dbo' als angehängte Datenbank)."""
+
+    def __init__(self):
+        self.connection = sqlite3.connect(':memory:', check_same_thread=False)
+        self.connection.execute("ATTACH DATABASE ':memory:' AS dbo")
+        self.connection.execute("CREATE TABLE dbo.T_PROCESS_TO_BE_TIME "
+                                "(ATTRIBUTE_NAME TEXT, TARGET_VALUE REAL, EVENT_TIME TEXT)")
+        self.connects = 0
+        self.on_connect = None
+
+    def set(self, name, value, event_time):
+        self.connection.execute("DELETE FROM dbo.T_PROCESS_TO_BE_TIME WHERE ATTRIBUTE_NAME = ?", (name,))
+        self.connection.execute("INSERT INTO dbo.T_PROCESS_TO_BE_TIME VALUES (?, ?, ?)", (name, value, event_time))
+
+    @contextmanager
+    def connect(self):
+        self.connects += 1
+        if self.on_connect is not None:
+            self.on_connect()
+        yield self.connection
+
+
+@pytest.fixture
+def db():
+    db = TargetTimesDb()
+    db.set('SALESORDER_TO_DELIVERY', 1440.0, '2025-01-01 08:00:00')
+    return db
+
+
+def test_probe_reloads_only_after_a_change(db):
+    cache = SollwertCache(probe_interval=0)
+    assert cache.get(db.connect) == {'SALESORDER_TO_DELIVERY': 1440.0}
+    assert cache.get(db.connect) == {'SALESORDER_TO_DELIVERY': 1440.0}
+    assert cache.metrics()['loads'] == 1 and cache.metrics()['probes'] == 2
+
+    db.set('SALESORDER_TO_DELIVERY', 720.0, '2025-01-02 08:00:00')
+    assert cache.get(db.connect) == {'SALESORDER_TO_DELIVERY': 720.0}
+    assert cache.metrics()['loads'] == 2
+
+
+def test_no_database_access_within_the_probe_interval(db):
+    cache = SollwertCache(probe_interval=3600)
+    cache.get(db.connect)
+    cache.get(db.connect)
+    assert db.connects == 1 and cache.metrics()['hits'] == 1
+
+
+def test_other_sessions_are_served_while_one_probes(db):
+    cache = SollwertCache(probe_interval=0)
+    cache.get(db.connect)
+
+    probing, release = threading.Event(), threading.Event()
+
+    def slow_probe():
+        probing.set()
+        release.wait(5)
+
+    db.on_connect = slow_probe
+    worker = threading.Thread(target=cache.get, args=(db.connect,))
+    worker.start()
+    assert probing.wait(5)
+    # Die Sperre ist während der Probe frei: Treffer mit den bisherigen Werten
+    assert cache.get(db.connect) == {'SALESORDER_TO_DELIVERY': 1440.0}
+    release.set()
+    worker.join(5)
+    assert cache.metrics()['hits'] == 1
+
+
+def test_clear_during_a_probe_wins(db):
+    cache = SollwertCache(probe_interval=0)
+    db.on_connect = cache.clear
+    cache.get(db.connect)
+    assert cache.metrics()['discarded'] == 1
+
+    db.on_connect = None
+    cache.get(db.connect)
+    assert cache.metrics()['loads'] == 2